@@ -6,9 +6,12 @@ import os
 import re
 from datetime import datetime, timezone
 
-import boto3
 from botocore.exceptions import ClientError
 
+from backend.lib.dynamodb import get_resource
+from backend.lib.levels import levels_after_completion
+from backend.lib.progress import save_result_and_progress
+
 logger = logging.getLogger(__name__)
 
 RESULTS_TABLE = os.environ.get("RESULTS_TABLE", "ai-levels-results")
@@ -48,19 +51,18 @@ def _validate_body(body: dict) -> str | None:
 
 
 def _get_dynamodb_resource():
-    """Return a DynamoDB resource (extracted for testability)."""
-    return boto3.resource("dynamodb", region_name="ap-northeast-1")
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
 
 
-def _save_result(dynamodb, session_id: str, body: dict, completed_at: str) -> str:
-    """Save the completion record to ai-levels-results table."""
-    table = dynamodb.Table(RESULTS_TABLE)
+def _build_result_item(session_id: str, body: dict, completed_at: str) -> dict:
+    """Build the completion record for ai-levels-results table."""
     total_score = 0
     for g in body["grades"]:
         if isinstance(g, dict) and isinstance(g.get("score"), (int, float)):
             total_score += g["score"]
 
-    table.put_item(Item={
+    return {
         "PK": f"SESSION#{session_id}",
         "SK": "RESULT#lv1",
         "session_id": session_id,
@@ -71,22 +73,7 @@ def _save_result(dynamodb, session_id: str, body: dict, completed_at: str) -> st
         "final_passed": body["final_passed"],
         "total_score": total_score,
         "completed_at": completed_at,
-    })
-
-
-def _update_progress(dynamodb, session_id: str, final_passed: bool, updated_at: str):
-    """Update the lv1_passed flag in ai-levels-progress table."""
-    table = dynamodb.Table(PROGRESS_TABLE)
-    table.put_item(Item={
-        "PK": f"SESSION#{session_id}",
-        "SK": "PROGRESS",
-        "session_id": session_id,
-        "lv1_passed": final_passed,
-        "lv2_passed": False,
-        "lv3_passed": False,
-        "lv4_passed": False,
-        "updated_at": updated_at,
-    })
+    }
 
 
 def handler(event, context):
@@ -112,9 +99,16 @@ def handler(event, context):
     now = datetime.now(timezone.utc).isoformat()
 
     try:
-        dynamodb = _get_dynamodb_resource()
-        _save_result(dynamodb, session_id, body, now)
-        _update_progress(dynamodb, session_id, body["final_passed"], now)
+        # 結果レコードと進捗フラグは1回のトランザクションで保存する（片方だけ残らない）
+        save_result_and_progress(
+            _get_dynamodb_resource(),
+            RESULTS_TABLE,
+            PROGRESS_TABLE,
+            _build_result_item(session_id, body, now),
+            level=1,
+            passed=body["final_passed"],
+            updated_at=now,
+        )
     except ClientError as e:
         logger.error("DynamoDB write failed: %s", str(e))
         return {
@@ -125,11 +119,15 @@ def handler(event, context):
             }),
         }
 
+    response_body = {
+        "saved": True,
+        "record_id": f"SESSION#{session_id}",
+        # 保存後に読み直さず、今回書き込んだ進捗からレベル状態全体を返す
+        "levels": levels_after_completion(1, body["final_passed"]),
+    }
+
     return {
         "statusCode": 200,
         "headers": {"Access-Control-Allow-Origin": "*"},
-        "body": json.dumps({
-            "saved": True,
-            "record_id": f"SESSION#{session_id}",
-        }),
+        "body": json.dumps(response_body),
     }
@@ -5,7 +5,9 @@ import logging
 import os
 import re
 
-import boto3
+from backend.lib import gate_cache
+from backend.lib.dynamodb import get_resource
+from backend.lib.levels import build_levels, levels_from_progress, progress_etag
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +20,52 @@ UUID_V4_PATTERN = re.compile(
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
+# ブラウザには毎回ETagで再検証させる（進捗はセッション固有のため共有キャッシュには載せない）
+CACHE_HEADERS = {
+    "Cache-Control": "private, no-cache",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
 
 def _get_dynamodb_resource():
-    """Return a DynamoDB resource (extracted for testability)."""
-    return boto3.resource("dynamodb", region_name="ap-northeast-1")
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
 
 
-def _build_levels(lv1_passed: bool, lv2_passed: bool, lv3_passed: bool, lv4_passed: bool) -> dict:
-    """Build the levels status dict based on progress."""
-    return {
-        "lv1": {"unlocked": True, "passed": lv1_passed},
-        "lv2": {"unlocked": lv1_passed, "passed": lv2_passed},
-        "lv3": {"unlocked": lv2_passed, "passed": lv3_passed},
-        "lv4": {"unlocked": lv3_passed, "passed": lv4_passed},
-    }
+# 既存の呼び出し元向けの別名（実装は backend.lib.levels）
+_build_levels = build_levels
+
+
+def _get_header(event: dict, name: str) -> str | None:
+    """リクエストヘッダーを大文字小文字を区別せずに取得する。"""
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def _load_progress(session_id: str, fresh: bool = False) -> dict:
+    """進捗アイテムを返す（進捗なしは {}）。TTLキャッシュにあればDynamoDBを読まない。
+
+    fresh=True の場合はキャッシュを使わずに読み直す（読んだ値はキャッシュに入れる）。
+    """
+    item = None if fresh else gate_cache.get(session_id)
+    if item is not None:
+        return item
+
+    dynamodb = _get_dynamodb_resource()
+    table = dynamodb.Table(PROGRESS_TABLE)
+    resp = table.get_item(Key={"PK": f"SESSION#{session_id}", "SK": "PROGRESS"})
+    item = resp.get("Item") or {}
+    gate_cache.put(session_id, item)
+    return item
 
 
 def handler(event, context):
@@ -47,9 +81,8 @@ def handler(event, context):
         }
 
     try:
-        dynamodb = _get_dynamodb_resource()
-        table = dynamodb.Table(PROGRESS_TABLE)
-        resp = table.get_item(Key={"PK": f"SESSION#{session_id}", "SK": "PROGRESS"})
+        # 完了直後のクライアントは fresh=1 を付ける（完了の書き込みはこのコンテナのキャッシュに届かないため）
+        item = _load_progress(session_id, fresh=params.get("fresh") == "1")
     except Exception as e:
         logger.error("DynamoDB read failed: %s", str(e))
         return {
@@ -58,14 +91,13 @@ def handler(event, context):
             "body": json.dumps({"error": "進捗データの取得に失敗しました。"}),
         }
 
-    item = resp.get("Item")
-    lv1_passed = item.get("lv1_passed", False) if item else False
-    lv2_passed = item.get("lv2_passed", False) if item else False
-    lv3_passed = item.get("lv3_passed", False) if item else False
-    lv4_passed = item.get("lv4_passed", False) if item else False
+    etag = progress_etag(item)
+    headers = {**CORS_HEADERS, **CACHE_HEADERS, "ETag": etag}
+    if _etag_matches(_get_header(event, "If-None-Match"), etag):
+        return {"statusCode": 304, "headers": headers, "body": ""}
 
     return {
         "statusCode": 200,
-        "headers": CORS_HEADERS,
-        "body": json.dumps({"levels": _build_levels(lv1_passed, lv2_passed, lv3_passed, lv4_passed)}),
+        "headers": headers,
+        "body": json.dumps({"levels": levels_from_progress(item)}),
     }
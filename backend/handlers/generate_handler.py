@@ -4,7 +4,11 @@ import json
 import logging
 import uuid
 
-from backend.lib.bedrock_client import invoke_claude, strip_code_fence
+from backend.lib.answer_key import attach_answer_key, is_enabled as is_answer_key_enabled, strip_answer_key
+from backend.lib.bedrock_client import invoke_claude, parse_json_response, response_text, set_deadline
+from backend.lib.model_config import get_call_config
+from backend.lib.question_pool import take_question_set
+from backend.lib.question_store import save_question_set
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +20,25 @@ SYSTEM_PROMPT = """AIカリキュラム「分業設計×依頼設計×品質担
 
 typeは "multiple_choice","free_text","scenario" のいずれか。stepは1から連番。"""
 
+# 解答キーを保持できる場合（設問ストア有効時）のみ正解と根拠を生成させる
+ANSWER_KEY_PROMPT = """
+multiple_choice のみ answer_index（正解の選択肢の0始まりの番号）と rationales（各選択肢が正解・不正解である理由、optionsと同じ順・同じ数）を含めること。
+例: {"step":1,"type":"multiple_choice","prompt":"設問文","options":["A","B","C","D"],"answer_index":0,"rationales":["Aの正誤の根拠","Bの正誤の根拠","Cの正誤の根拠","Dの正誤の根拠"],"context":null}"""
+
+
+def _system_prompt() -> str:
+    return SYSTEM_PROMPT + ANSWER_KEY_PROMPT if is_answer_key_enabled() else SYSTEM_PROMPT
+
 
 VALID_TYPES = {"multiple_choice", "free_text", "scenario"}
 
 
 def _parse_questions(result: dict) -> list[dict]:
     """Bedrockレスポンスからquestionsを抽出しバリデーションする。"""
-    # Claude応答のcontent[0].textからJSONを取得
-    text = result.get("content", [{}])[0].get("text", "")
-    text = strip_code_fence(text)
-
     try:
-        data = json.loads(text)
+        data = parse_json_response(result)
     except json.JSONDecodeError:
-        logger.error("Failed to parse Bedrock response as JSON: %s", text[:200])
+        logger.error("Failed to parse Bedrock response as JSON: %s", response_text(result)[:200])
         raise ValueError("Bedrock response is not valid JSON")
 
     questions = data.get("questions")
@@ -49,19 +58,32 @@ def _parse_questions(result: dict) -> list[dict]:
         if not isinstance(prompt, str) or not prompt.strip():
             raise ValueError(f"Question {i}: prompt must be a non-empty string")
 
-        validated.append({
+        question = {
             "step": step,
             "type": q_type,
             "prompt": prompt,
             "options": q.get("options") if q_type == "multiple_choice" else None,
             "context": q.get("context"),
-        })
+        }
+        if q_type == "multiple_choice":
+            # 正解と根拠は answer_key として設問ストアにのみ保持し、クライアントには返さない
+            question = attach_answer_key(question, q.get("answer_index"), q.get("rationales"))
+        validated.append(question)
 
     return validated
 
 
+def _generate_questions(session_id: str) -> list[dict]:
+    """Bedrockで設問セットを生成しバリデーションする。"""
+    user_prompt = f"セッションID: {session_id}\n新しいテスト・ドリルを生成してください。"
+    result = invoke_claude(_system_prompt(), user_prompt, **get_call_config(1, "generator"))
+    return _parse_questions(result)
+
+
 def handler(event, context):
     """Lambda handler for POST /lv1/generate."""
+    set_deadline(context)
+
     try:
         body = json.loads(event.get("body", "{}"))
     except json.JSONDecodeError:
@@ -79,11 +101,13 @@ def handler(event, context):
             "body": json.dumps({"error": "session_id is required"}),
         }
 
-    user_prompt = f"セッションID: {session_id}\n新しいテスト・ドリルを生成してください。"
-
     try:
-        result = invoke_claude(SYSTEM_PROMPT, user_prompt)
-        questions = _parse_questions(result)
+        # 事前生成プールから取得できればBedrock呼び出しを省略する
+        questions = take_question_set(level=1) or _generate_questions(session_id)
+        # 採点時に question_id で参照できるよう保存する（QUESTION_STORE_ENABLED）
+        questions = save_question_set(1, session_id, questions)
+        # 解答キーはサーバ側（設問ストア）にだけ残す
+        questions = [strip_answer_key(q) for q in questions]
     except (ValueError, Exception) as e:
         logger.error("Failed to generate questions: %s", str(e))
         return {
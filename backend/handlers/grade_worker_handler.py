@@ -0,0 +1,58 @@
+"""採点ジョブワーカー（SQSイベント / ローカルのプロセス内キュー） - 非同期の /lvN/grade を実行する"""
+
+import json
+import logging
+
+from backend.handlers import grade_handler, lv2_grade_handler, lv3_grade_handler, lv4_grade_handler
+from backend.lib.jobs import JOB_EVENT_KEY, claim_job, complete_job, fail_job, get_job
+
+logger = logging.getLogger(__name__)
+
+GRADE_HANDLERS = {
+    1: grade_handler.handler,
+    2: lv2_grade_handler.handler,
+    3: lv3_grade_handler.handler,
+    4: lv4_grade_handler.handler,
+}
+
+
+def process_message(message: dict, context=None) -> None:
+    """キューのメッセージ {"job_id"} を処理し、採点結果（またはエラー）をジョブに保存する。
+
+    採点は同期版の /lvN/grade ハンドラをそのまま呼び出すため、検証・キャッシュ・
+    question_id の解決などの挙動は同期モードと同じになる。
+    """
+    job_id = message.get("job_id")
+    job = get_job(job_id) if isinstance(job_id, str) else None
+    if job is None:
+        logger.warning("Grade job %s not found, skipping", job_id)
+        return
+    if not claim_job(job_id):
+        # SQSの重複配信など、他のワーカーが処理中・処理済み
+        logger.info("Grade job %s already claimed, skipping", job_id)
+        return
+
+    level = int(job["level"])
+    try:
+        resp = GRADE_HANDLERS[level]({"body": job["request_json"], JOB_EVENT_KEY: job_id}, context)
+        data = json.loads(resp["body"])
+    except Exception as e:
+        logger.error("Grade job %s for lv%d failed: %s", job_id, level, str(e))
+        fail_job(job_id, "採点に失敗しました。リトライしてください。")
+        return
+
+    if resp["statusCode"] == 200:
+        complete_job(job_id, data)
+    else:
+        fail_job(job_id, data.get("error", "採点に失敗しました。リトライしてください。"), resp["statusCode"])
+
+
+def handler(event, context):
+    """Lambda handler for the grade job queue (SQS event source)."""
+    for record in (event or {}).get("Records", []):
+        try:
+            message = json.loads(record.get("body") or "{}")
+        except json.JSONDecodeError:
+            logger.error("Invalid grade job message: %s", str(record.get("body"))[:200])
+            continue
+        process_message(message, context)
@@ -0,0 +1,49 @@
+"""GET /jobs/{id} - 非同期採点ジョブの状態・結果取得ハンドラ"""
+
+import json
+import logging
+
+from backend.lib.jobs import STATUS_FAILED, STATUS_SUCCEEDED, get_job
+
+logger = logging.getLogger(__name__)
+
+
+def handler(event, context):
+    """Lambda handler for GET /jobs/{id}."""
+    job_id = (event.get("pathParameters") or {}).get("id")
+    if not job_id or not isinstance(job_id, str):
+        return {
+            "statusCode": 400,
+            "headers": {"Access-Control-Allow-Origin": "*"},
+            "body": json.dumps({"error": "job id is required"}),
+        }
+
+    try:
+        job = get_job(job_id)
+    except Exception as e:
+        logger.error("Failed to read grade job %s: %s", job_id, str(e))
+        return {
+            "statusCode": 500,
+            "headers": {"Access-Control-Allow-Origin": "*"},
+            "body": json.dumps({"error": "ジョブの取得に失敗しました。"}),
+        }
+
+    if job is None:
+        return {
+            "statusCode": 404,
+            "headers": {"Access-Control-Allow-Origin": "*"},
+            "body": json.dumps({"error": "job not found"}),
+        }
+
+    payload = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == STATUS_SUCCEEDED:
+        payload["result"] = json.loads(job["result_json"])
+    elif job["status"] == STATUS_FAILED:
+        payload["error"] = job.get("error")
+        payload["status_code"] = int(job.get("status_code", 500))
+
+    return {
+        "statusCode": 200,
+        "headers": {"Access-Control-Allow-Origin": "*", "Cache-Control": "no-store"},
+        "body": json.dumps(payload, ensure_ascii=False),
+    }
@@ -3,7 +3,11 @@
 import json
 import logging
 
-from backend.lib.bedrock_client import invoke_claude, strip_code_fence
+from backend.lib.bedrock_client import invoke_claude, parse_json_response, response_text, set_deadline
+from backend.lib.model_config import get_call_config
+from backend.lib.question_pool import take_question_set
+from backend.lib.question_repair import build_step_repair_prompt, recover_questions
+from backend.lib.question_store import save_question_set
 
 logger = logging.getLogger(__name__)
 
@@ -28,19 +32,49 @@ VALID_TYPES = {"scenario", "free_text"}
 STEP_TYPE_MAP = {1: "scenario", 2: "free_text", 3: "scenario", 4: "free_text"}
 
 
+def _validate_question(i: int, q: dict) -> dict:
+    """i番目（0始まり）の設問を検証し、正規化した設問を返す。
+
+    Raises:
+        ValueError: 設問が不正な場合
+    """
+    step = q.get("step")
+    q_type = q.get("type", "").strip().lower()
+    prompt = q.get("prompt")
+    context = q.get("context") or ""
+
+    expected_step = i + 1
+    if not isinstance(step, int) or step != expected_step:
+        raise ValueError(f"Question {i}: step must be {expected_step}, got {step}")
+
+    expected_type = STEP_TYPE_MAP[expected_step]
+    if q_type != expected_type:
+        raise ValueError(
+            f"Question {i}: step {expected_step} must be type '{expected_type}', got '{q_type}'"
+        )
+
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError(f"Question {i}: prompt must be a non-empty string")
+
+    return {
+        "step": step,
+        "type": q_type,
+        "prompt": prompt,
+        "options": None,
+        "context": context,
+    }
+
+
 def _parse_questions(result: dict) -> list[dict]:
     """Bedrockレスポンスからquestionsを抽出しバリデーションする。"""
     stop_reason = result.get("stop_reason")
     if stop_reason == "max_tokens":
         logger.warning("Bedrock response was truncated due to max_tokens limit")
 
-    text = result.get("content", [{}])[0].get("text", "")
-    text = strip_code_fence(text)
-
     try:
-        data = json.loads(text)
+        data = parse_json_response(result)
     except json.JSONDecodeError:
-        logger.error("Failed to parse Bedrock response as JSON: %s", text[:200])
+        logger.error("Failed to parse Bedrock response as JSON: %s", response_text(result)[:200])
         raise ValueError("Bedrock response is not valid JSON")
 
     questions = data.get("questions")
@@ -50,39 +84,36 @@ def _parse_questions(result: dict) -> list[dict]:
             f"got {len(questions) if isinstance(questions, list) else 'none'}"
         )
 
-    validated = []
-    for i, q in enumerate(questions):
-        step = q.get("step")
-        q_type = q.get("type", "").strip().lower()
-        prompt = q.get("prompt")
-        context = q.get("context") or ""
+    return [_validate_question(i, q) for i, q in enumerate(questions)]
 
-        expected_step = i + 1
-        if not isinstance(step, int) or step != expected_step:
-            raise ValueError(f"Question {i}: step must be {expected_step}, got {step}")
 
-        expected_type = STEP_TYPE_MAP[expected_step]
-        if q_type != expected_type:
-            raise ValueError(
-                f"Question {i}: step {expected_step} must be type '{expected_type}', got '{q_type}'"
-            )
+def _build_user_prompt(session_id: str) -> str:
+    """設問セット生成のユーザープロンプト（ストリーミング生成と共通）。"""
+    return f"セッションID: {session_id}\n新しいケーススタディを生成してください。"
 
-        if not isinstance(prompt, str) or not prompt.strip():
-            raise ValueError(f"Question {i}: prompt must be a non-empty string")
 
-        validated.append({
-            "step": step,
-            "type": q_type,
-            "prompt": prompt,
-            "options": None,
-            "context": context,
-        })
+def _regenerate_steps(steps: list[int], valid_questions: list[dict]) -> dict:
+    """無効なステップだけを、有効なステップを文脈として再生成する。"""
+    user_prompt = build_step_repair_prompt(steps, valid_questions)
+    return invoke_claude(LV2_GENERATE_SYSTEM_PROMPT, user_prompt, **get_call_config(2, "generator", output="repair"))
 
-    return validated
+
+def _generate_questions(session_id: str) -> list[dict]:
+    """Bedrockで設問セットを生成しバリデーションする。"""
+    user_prompt = _build_user_prompt(session_id)
+    result = invoke_claude(LV2_GENERATE_SYSTEM_PROMPT, user_prompt, **get_call_config(2, "generator"))
+    try:
+        return _parse_questions(result)
+    except ValueError as e:
+        # 一部のステップの不備でセット全体を捨てず、ローカル補正と無効ステップの再生成で復旧する
+        logger.warning("Lv2 question set failed validation, attempting repair: %s", str(e))
+        return recover_questions(result, EXPECTED_NUM_QUESTIONS, _validate_question, _regenerate_steps)
 
 
 def handler(event, context):
     """Lambda handler for POST /lv2/generate."""
+    set_deadline(context)
+
     try:
         body = json.loads(event.get("body", "{}"))
     except json.JSONDecodeError:
@@ -100,11 +131,11 @@ def handler(event, context):
             "body": json.dumps({"error": "session_id is required"}),
         }
 
-    user_prompt = f"セッションID: {session_id}\n新しいケーススタディを生成してください。"
-
     try:
-        result = invoke_claude(LV2_GENERATE_SYSTEM_PROMPT, user_prompt, max_tokens=4096)
-        questions = _parse_questions(result)
+        # 事前生成プールから取得できればBedrock呼び出しを省略する
+        questions = take_question_set(level=2) or _generate_questions(session_id)
+        # 採点時に question_id で参照できるよう保存する（QUESTION_STORE_ENABLED）
+        questions = save_question_set(2, session_id, questions)
     except (ValueError, Exception) as e:
         logger.error("Failed to generate Lv2 questions: %s", str(e))
         return {
@@ -3,7 +3,12 @@
 import json
 import logging
 
-from backend.lib.bedrock_client import invoke_claude, strip_code_fence
+from backend.lib.bedrock_client import invoke_claude, parse_json_response, response_text, set_deadline
+from backend.lib.grade_cache import cached_grade
+from backend.lib.grading import build_grade_prompt, run_grade_pipeline, validate_grade, validate_review
+from backend.lib.jobs import create_job, should_enqueue
+from backend.lib.model_config import get_call_config
+from backend.lib.question_store import is_store_enabled, load_question, question_id_step
 from backend.lib.lv4_reviewer import generate_lv4_feedback
 from backend.lib.threshold_resolver import resolve_passed
 
@@ -27,31 +32,81 @@ LV4_GRADE_SYSTEM_PROMPT = """あなたはAIカリキュラム「組織横断AI
 
 60点以上を合格とする。"""
 
+LV4_COMBINED_SYSTEM_PROMPT = """あなたはAIカリキュラム「組織横断AI活用標準化×ガバナンス設計×持続的AI活用文化構築」の採点・レビューエージェントです。
+
+ユーザーの回答を採点し、あわせて学習者に対するフィードバックと解説を生成してください。
+
+ステップごとの採点基準:
+- ステップ1（AI活用標準化戦略）: 組織全体のAI活用状況分析が的確か、標準化方針が部門横断で適用可能か、ガイドラインが具体的か
+- ステップ2（ガバナンスフレームワーク設計）: ポリシー・ルールが包括的か、監査体制が実効的か、責任分担が明確か
+- ステップ3（組織横断AI推進体制構築）: 複数部門の課題把握が的確か、推進体制が実効的か、意思決定プロセスが明確か、コミュニケーション設計が具体的か
+- ステップ4（AI活用文化醸成プログラム）: 現状文化の分析が的確か、変革プログラムが段階的か、成功指標が測定可能か、定着化施策が具体的か
+- ステップ5（リスク管理・コンプライアンス）: リスクシナリオの特定が網羅的か、法規制・倫理基準への準拠が考慮されているか、リスク管理体制が包括的か
+- ステップ6（中長期AI活用ロードマップ）: 中長期計画が実現可能か、KPIが定量的か、評価サイクルが設計されているか、組織全体の視点があるか
+
+フィードバックでは:
+- 回答の良かった点と改善点を具体的に指摘する
+- 組織横断AI推進者としての具体的な改善アクションを含める
+- Lv4の学習目標（組織横断AI活用標準化・ガバナンス設計・持続的AI活用文化構築）に沿った助言を行う
+- ベストプラクティスや実務での応用ポイントを含める
+
+解説では:
+- 正解の考え方や背景知識を説明する
+- コンサルティング実務での組織横断ガバナンス応用例を含める
+
+出力は必ず以下のJSON形式で返してください。それ以外のテキストは含めないでください:
+{
+  "passed": true または false,
+  "score": 0〜100の整数,
+  "feedback": "フィードバック文",
+  "explanation": "解説文"
+}
+
+60点以上を合格とする。"""
+
 
 def _parse_grade_result(result: dict) -> dict:
     """Bedrockレスポンスから採点結果を抽出しバリデーションする。"""
-    text = result.get("content", [{}])[0].get("text", "")
-    text = strip_code_fence(text)
-
     try:
-        data = json.loads(text)
+        data = parse_json_response(result)
     except json.JSONDecodeError:
-        logger.error("Failed to parse Lv4 Grader response as JSON: %s", text[:200])
+        logger.error("Failed to parse Lv4 Grader response as JSON: %s", response_text(result)[:200])
         raise ValueError("Lv4 Grader response is not valid JSON")
 
-    passed = data.get("passed")
-    score = data.get("score")
+    return validate_grade(data)
+
+
+def _parse_combined_result(result: dict) -> tuple[dict, dict]:
+    """Bedrockレスポンスから採点結果とレビューを抽出しバリデーションする（combinedモード）。"""
+    try:
+        data = parse_json_response(result)
+    except json.JSONDecodeError:
+        logger.error("Failed to parse Lv4 combined Grader response as JSON: %s", response_text(result)[:200])
+        raise ValueError("Lv4 combined Grader response is not valid JSON")
+
+    return validate_grade(data), validate_review(data)
+
 
-    if not isinstance(passed, bool):
-        raise ValueError("passed must be a boolean")
-    if not isinstance(score, int) or score < 0 or score > 100:
-        raise ValueError("score must be an integer between 0 and 100")
+def _grade(user_prompt: str) -> dict:
+    """採点を実行し、閾値に基づいて合否を確定する。"""
+    grade_raw = invoke_claude(LV4_GRADE_SYSTEM_PROMPT, user_prompt, **get_call_config(4, "grader"))
+    grade_result = _parse_grade_result(grade_raw)
+    grade_result["passed"] = resolve_passed(level=4, score=grade_result["score"])
+    return grade_result
 
-    return {"passed": passed, "score": score}
+
+def _grade_and_review(user_prompt: str) -> tuple[dict, dict]:
+    """採点とレビューを1回のBedrock呼び出しで実行する（GRADE_MODE=combined）。"""
+    raw = invoke_claude(LV4_COMBINED_SYSTEM_PROMPT, user_prompt, **get_call_config(4, "combined"))
+    grade_result, review = _parse_combined_result(raw)
+    grade_result["passed"] = resolve_passed(level=4, score=grade_result["score"])
+    return grade_result, review
 
 
 def handler(event, context):
     """Lambda handler for POST /lv4/grade."""
+    set_deadline(context)
+
     try:
         body = json.loads(event.get("body", "{}"))
     except json.JSONDecodeError:
@@ -78,6 +133,29 @@ def handler(event, context):
             "headers": {"Access-Control-Allow-Origin": "*"},
             "body": json.dumps({"error": "step must be an integer between 1 and 6"}),
         }
+    if body.get("question_id") is not None:
+        if question_id_step(body["question_id"]) != step:
+            # 別のステップの設問を step として採点・記録させない
+            return {
+                "statusCode": 400,
+                "headers": {"Access-Control-Allow-Origin": "*"},
+                "body": json.dumps({"error": "question_id does not match step"}),
+            }
+        # サーバに保存済みの設問を使い、クライアントが送った question は使わない
+        question = load_question(level=4, question_id=body["question_id"], session_id=session_id)
+        if question is None:
+            return {
+                "statusCode": 404,
+                "headers": {"Access-Control-Allow-Origin": "*"},
+                "body": json.dumps({"error": "question not found"}),
+            }
+    elif is_store_enabled():
+        # 保存済みの設問でのみ採点する（クライアントが送った設問は受け付けない）
+        return {
+            "statusCode": 400,
+            "headers": {"Access-Control-Allow-Origin": "*"},
+            "body": json.dumps({"error": "question_id is required"}),
+        }
     if not isinstance(question, dict):
         return {
             "statusCode": 400,
@@ -91,20 +169,34 @@ def handler(event, context):
             "body": json.dumps({"error": "answer is required"}),
         }
 
-    user_prompt = (
-        f"設問: {json.dumps(question, ensure_ascii=False)}\n"
-        f"回答: {answer}\n\n"
-        "この回答を採点してください。"
-    )
+    if should_enqueue(event):
+        # API Gatewayの29秒制限を避けるため、ワーカーで採点して GET /jobs/{id} で結果を返す
+        try:
+            job_id = create_job(level=4, body=body)
+            return {
+                "statusCode": 202,
+                "headers": {"Access-Control-Allow-Origin": "*"},
+                "body": json.dumps({"job_id": job_id, "status": "queued"}),
+            }
+        except Exception as e:
+            logger.warning("Failed to enqueue lv4 grade job, grading synchronously: %s", str(e))
 
-    try:
-        # 1. 採点実行
-        grade_raw = invoke_claude(LV4_GRADE_SYSTEM_PROMPT, user_prompt)
-        grade_result = _parse_grade_result(grade_raw)
-        grade_result["passed"] = resolve_passed(level=4, score=grade_result["score"])
+    user_prompt = build_grade_prompt(question, answer)
 
-        # 2. レビュー（フィードバック・解説）生成
-        review = generate_lv4_feedback(question, answer, grade_result)
+    try:
+        # 採点とレビュー（フィードバック・解説）生成。実行方式は GRADE_MODE に従う
+        # 同一の設問・回答に対する結果はキャッシュから返す（GRADE_CACHE_ENABLED）
+        grade_result, review = cached_grade(
+            level=4,
+            step=step,
+            question=question,
+            answer=answer,
+            compute=lambda: run_grade_pipeline(
+                grade_fn=lambda: _grade(user_prompt),
+                review_fn=lambda grade: generate_lv4_feedback(question, answer, grade),
+                combined_fn=lambda: _grade_and_review(user_prompt),
+            ),
+        )
     except (ValueError, Exception) as e:
         logger.error("Failed to grade/review Lv4: %s", str(e))
         return {
@@ -0,0 +1,69 @@
+"""設問プール補充ハンドラ（スケジュール実行 / 非同期起動）"""
+
+import logging
+import uuid
+
+from backend.handlers import generate_handler, lv2_generate_handler, lv3_generate_handler, lv4_generate_handler
+from backend.lib.bedrock_client import set_deadline
+from backend.lib.question_pool import (
+    count_question_sets, get_target_size, is_pool_enabled, put_question_set, release_refill_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATORS = {
+    1: generate_handler._generate_questions,
+    2: lv2_generate_handler._generate_questions,
+    3: lv3_generate_handler._generate_questions,
+    4: lv4_generate_handler._generate_questions,
+}
+
+MAX_SETS_PER_RUN = 10
+# 次の1セットを生成する前に残しておくLambda実行時間（Lv4の生成時間を想定）
+MIN_REMAINING_MS = 45_000
+
+
+def _has_time_left(context) -> bool:
+    if context is None:
+        return True
+    return context.get_remaining_time_in_millis() > MIN_REMAINING_MS
+
+
+def refill_level(level: int, context=None) -> int:
+    """指定レベルのプールを目標数まで補充し、追加したセット数を返す。"""
+    missing = get_target_size() - count_question_sets(level)
+    added = 0
+
+    while added < min(missing, MAX_SETS_PER_RUN) and _has_time_left(context):
+        try:
+            questions = GENERATORS[level](str(uuid.uuid4()))
+        except Exception as e:
+            # 不正な生成結果はプールに入れず、次回の補充に任せる
+            logger.warning("Failed to generate question set for lv%d pool: %s", level, str(e))
+            break
+        put_question_set(level, questions)
+        added += 1
+
+    return added
+
+
+def handler(event, context):
+    """Refill the question pool for event["level"], or for every level on scheduled runs."""
+    if not is_pool_enabled():
+        return {"refilled": {}}
+
+    set_deadline(context)
+
+    level = (event or {}).get("level")
+    levels = [level] if level in GENERATORS else sorted(GENERATORS)
+
+    refilled = {}
+    for lv in levels:
+        try:
+            refilled[f"lv{lv}"] = refill_level(lv, context)
+        finally:
+            # 補充が終わったら次の補充要求を受け付ける（失敗時もロックの期限切れを待たない）
+            release_refill_lock(lv)
+        logger.info("Refilled lv%d question pool with %d sets", lv, refilled[f"lv{lv}"])
+
+    return {"refilled": refilled}
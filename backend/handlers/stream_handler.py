@@ -0,0 +1,434 @@
+"""POST /lvN/grade, /lvN/generate（ストリーミング版）
+
+- /lvN/grade: 採点結果を先に返し、フィードバックを逐次配信する
+- /lvN/generate（Lv2〜Lv4）: 設問をステップごとに、検証できた時点で配信する
+  （学習者は設問セット全体の生成を待たずにステップ1に回答できる）
+
+Lambda Web Adapter を介した Function URL（invokeMode: RESPONSE_STREAM）で動作し、
+レスポンスは1行1イベントのNDJSONで返す:
+
+    /lvN/grade
+    {"event": "grade", "session_id": ..., "step": ..., "passed": ..., "score": ...}
+    {"event": "delta", "field": "feedback" | "explanation", "text": "..."}
+    {"event": "result", ...通常の /lvN/grade と同じフィールド...}
+
+    /lvN/generate
+    {"event": "question", "question": {...}}  （ステップ順に1問ずつ）
+    {"event": "result", ...通常の /lvN/generate と同じフィールド...}
+
+    {"event": "error", "error": "..."}
+"""
+
+import json
+import logging
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.handlers import (
+    grade_handler,
+    lv2_generate_handler,
+    lv2_grade_handler,
+    lv3_generate_handler,
+    lv3_grade_handler,
+    lv4_generate_handler,
+    lv4_grade_handler,
+)
+from backend.lib import grade_cache, reviewer, lv2_reviewer, lv3_reviewer, lv4_reviewer
+from backend.lib.bedrock_client import invoke_claude_stream, set_deadline, strip_code_fence
+from backend.lib.grading import (
+    build_feedback_prompt,
+    build_grade_prompt,
+    build_review_prompt,
+    validate_feedback,
+    validate_review,
+)
+from backend.lib.model_config import get_call_config
+from backend.lib.parallel import submit
+from backend.lib.question_pool import take_question_set
+from backend.lib.question_repair import recover_questions
+from backend.lib.question_store import is_store_enabled, load_question, question_id_step, save_question_set
+from backend.lib.stream_json import ArrayItemStream, StringFieldStream
+
+logger = logging.getLogger(__name__)
+
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+# 関数のタイムアウト（serverless.yml の provider.timeout）。Lambda Web Adapter 経由では
+# Lambda context を受け取れないため、リクエストの受信時点からこの秒数を期限とする
+FUNCTION_TIMEOUT_SECONDS = 60
+
+GRADE_PATH_RE = re.compile(r"^/lv([1-4])/grade/?$")
+GENERATE_PATH_RE = re.compile(r"^/lv([2-4])/generate/?$")
+
+# レベルごとの採点関数・レビュープロンプト・ステップ上限（Noneは上限なし）
+# local_grade: Bedrockを呼ばずに採点できる設問（選択式）の採点関数。対象外なら None を返す
+# feedback_system_prompt / explanation: 解説を設問単位でキャッシュする場合（EXPLANATION_CACHE_ENABLED）に使う
+GRADE_LEVELS = {
+    1: {
+        "grade": grade_handler._grade,
+        "local_grade": grade_handler._grade_locally,
+        "review_system_prompt": reviewer.SYSTEM_PROMPT,
+        "feedback_system_prompt": reviewer.FEEDBACK_SYSTEM_PROMPT,
+        "explanation": reviewer.generate_explanation,
+        "max_step": None,
+    },
+    2: {
+        "grade": lv2_grade_handler._grade,
+        "review_system_prompt": lv2_reviewer.LV2_REVIEW_SYSTEM_PROMPT,
+        "feedback_system_prompt": lv2_reviewer.LV2_FEEDBACK_SYSTEM_PROMPT,
+        "explanation": lv2_reviewer.generate_lv2_explanation,
+        "max_step": 4,
+    },
+    3: {
+        "grade": lv3_grade_handler._grade,
+        "review_system_prompt": lv3_reviewer.LV3_REVIEW_SYSTEM_PROMPT,
+        "feedback_system_prompt": lv3_reviewer.LV3_FEEDBACK_SYSTEM_PROMPT,
+        "explanation": lv3_reviewer.generate_lv3_explanation,
+        "max_step": 5,
+    },
+    4: {
+        "grade": lv4_grade_handler._grade,
+        "review_system_prompt": lv4_reviewer.LV4_REVIEW_SYSTEM_PROMPT,
+        "feedback_system_prompt": lv4_reviewer.LV4_FEEDBACK_SYSTEM_PROMPT,
+        "explanation": lv4_reviewer.generate_lv4_explanation,
+        "max_step": 6,
+    },
+}
+
+REVIEW_FIELDS = ("feedback", "explanation")
+
+# レベルごとの生成プロンプト・ステップ単位の検証・無効ステップの再生成・設問数
+GENERATE_LEVELS = {
+    level: {
+        "system_prompt": system_prompt,
+        "user_prompt": module._build_user_prompt,
+        "validate": module._validate_question,
+        "regenerate": module._regenerate_steps,
+        "num_questions": module.EXPECTED_NUM_QUESTIONS,
+    }
+    for level, module, system_prompt in (
+        (2, lv2_generate_handler, lv2_generate_handler.LV2_GENERATE_SYSTEM_PROMPT),
+        (3, lv3_generate_handler, lv3_generate_handler.LV3_GENERATE_SYSTEM_PROMPT),
+        (4, lv4_generate_handler, lv4_generate_handler.LV4_GENERATE_SYSTEM_PROMPT),
+    )
+}
+
+
+def _validate_grade_body(body: dict, max_step: int | None) -> str | None:
+    """Validate grade request body. Returns error message or None if valid."""
+    session_id = body.get("session_id")
+    step = body.get("step")
+
+    if not session_id or not isinstance(session_id, str):
+        return "session_id is required"
+    if max_step is None:
+        if not isinstance(step, int) or step < 1:
+            return "step must be a positive integer"
+    elif not isinstance(step, int) or step < 1 or step > max_step:
+        return f"step must be an integer between 1 and {max_step}"
+    if body.get("question_id") is None:
+        # 設問ストア有効時は保存済みの設問でのみ採点する（クライアントが送った設問は受け付けない）
+        if is_store_enabled():
+            return "question_id is required"
+        if not isinstance(body.get("question"), dict):
+            return "question is required"
+    elif question_id_step(body["question_id"]) != step:
+        return "question_id does not match step"
+    answer = body.get("answer")
+    if not isinstance(answer, str) or not answer.strip():
+        return "answer is required"
+    return None
+
+
+def _grade_event(session_id: str, step: int, grade_result: dict) -> dict:
+    return {
+        "event": "grade",
+        "session_id": session_id,
+        "step": step,
+        "passed": grade_result["passed"],
+        "score": grade_result["score"],
+    }
+
+
+def _result_event(session_id: str, step: int, grade_result: dict, review: dict) -> dict:
+    return {
+        "event": "result",
+        "session_id": session_id,
+        "step": step,
+        "passed": grade_result["passed"],
+        "score": grade_result["score"],
+        "feedback": review["feedback"],
+        "explanation": review["explanation"],
+    }
+
+
+def stream_grade_events(level: int, body: dict):
+    """採点→レビューを実行し、NDJSONイベント（dict）を逐次返すジェネレータ。"""
+    config = GRADE_LEVELS[level]
+    session_id = body["session_id"]
+    step = body["step"]
+    question = body["question"]
+    answer = body["answer"]
+
+    local_grade = config.get("local_grade")
+    local = local_grade(question, answer) if local_grade else None
+    if local is not None:
+        grade_result, review = local
+        yield _grade_event(session_id, step, grade_result)
+        yield _result_event(session_id, step, grade_result, review)
+        return
+
+    cache_key = grade_cache.make_cache_key(level, step, question, answer)
+    cached = grade_cache.lookup(level, cache_key)
+    if cached is not None:
+        grade_result, review = cached
+        yield _grade_event(session_id, step, grade_result)
+        yield _result_event(session_id, step, grade_result, review)
+        return
+
+    # 解説は回答に依存しないため、採点・フィードバックと並行して取得（初回のみ生成）する
+    split_explanation = grade_cache.is_explanation_cache_enabled()
+    explanation = submit(lambda: config["explanation"](question)) if split_explanation else None
+
+    try:
+        # 1. 採点（出力が短いため非ストリーミング）→ スコアを即座に返す
+        grade_result = config["grade"](build_grade_prompt(question, answer))
+        yield _grade_event(session_id, step, grade_result)
+
+        # 2. レビューをストリーミングし、feedback/explanation を逐次配信
+        if split_explanation:
+            system_prompt = config["feedback_system_prompt"]
+            review_prompt = build_feedback_prompt(question, answer, grade_result)
+            call_config = get_call_config(level, "reviewer", output="feedback")
+        else:
+            system_prompt = config["review_system_prompt"]
+            review_prompt = build_review_prompt(question, answer, grade_result)
+            call_config = get_call_config(level, "reviewer")
+        # 構造化出力の場合もツール input のJSON断片が届くため、同じパーサで逐次抽出できる
+        parser = StringFieldStream()
+        chunks = []
+        for text in invoke_claude_stream(system_prompt, review_prompt, **call_config):
+            chunks.append(text)
+            for field, delta in parser.feed(text):
+                if field in REVIEW_FIELDS:
+                    yield {"event": "delta", "field": field, "text": delta}
+
+        full_text = strip_code_fence("".join(chunks))
+        try:
+            data = json.loads(full_text)
+        except json.JSONDecodeError:
+            logger.error("Failed to parse streamed Lv%d Reviewer response as JSON: %s", level, full_text[:200])
+            raise ValueError("Reviewer response is not valid JSON")
+
+        if split_explanation:
+            review = {"feedback": validate_feedback(data), "explanation": explanation.result()}
+            yield {"event": "delta", "field": "explanation", "text": review["explanation"]}
+        else:
+            review = validate_review(data)
+    except Exception as e:
+        logger.error("Failed to stream grade/review Lv%d: %s", level, str(e))
+        yield {"event": "error", "error": "採点に失敗しました。リトライしてください。"}
+        return
+
+    grade_cache.store(level, cache_key, grade_result, review)
+    yield _result_event(session_id, step, grade_result, review)
+
+
+def _question_event(question: dict) -> dict:
+    return {"event": "question", "question": question}
+
+
+def _stream_questions(level: int, session_id: str):
+    """設問セットをストリーミング生成し、検証済みの設問をステップ順に返すジェネレータ。
+
+    ステップが検証に落ちた場合は以降の逐次配信を止め、生成完了後に
+    recover_questions（ローカル補正・無効ステップの再生成）で残りを揃えて返す。
+
+    Raises:
+        ValueError: 設問セットを復旧できない場合
+    """
+    config = GENERATE_LEVELS[level]
+    num_questions = config["num_questions"]
+
+    parser = ArrayItemStream("questions")
+    chunks = []
+    questions = []
+    progressive = True
+    for text in invoke_claude_stream(
+        config["system_prompt"], config["user_prompt"](session_id), **get_call_config(level, "generator"),
+    ):
+        chunks.append(text)
+        for item in parser.feed(text):
+            if not progressive or len(questions) >= num_questions:
+                continue
+            try:
+                question = config["validate"](len(questions), item)
+            except (ValueError, AttributeError) as e:
+                logger.warning("Streamed Lv%d question failed validation, repairing after stream: %s", level, str(e))
+                progressive = False
+                continue
+            questions.append(question)
+            yield question
+
+    if len(questions) < num_questions:
+        result = {"content": [{"type": "text", "text": "".join(chunks)}]}
+        repaired = recover_questions(result, num_questions, config["validate"], config["regenerate"])
+        yield from repaired[len(questions):]
+
+
+def stream_generate_events(level: int, body: dict):
+    """設問セットを生成し、設問ごとのNDJSONイベント（dict）を逐次返すジェネレータ。"""
+    session_id = body["session_id"]
+
+    questions = []
+    try:
+        # 事前生成プールから取得できればBedrock呼び出しを省略する
+        pooled = take_question_set(level=level)
+        for question in pooled if pooled is not None else _stream_questions(level, session_id):
+            questions.append(question)
+            yield _question_event(question)
+        # 採点時に question_id で参照できるよう保存する（QUESTION_STORE_ENABLED）
+        questions = save_question_set(level, session_id, questions)
+    except Exception as e:
+        logger.error("Failed to stream Lv%d questions: %s", level, str(e))
+        yield {"event": "error", "error": "テスト生成に失敗しました。リトライしてください。"}
+        return
+
+    yield {"event": "result", "session_id": session_id, "questions": questions}
+
+
+def _parse_generate_request(raw_body: str) -> tuple[dict | None, int, str | None]:
+    """生成リクエストのボディを読み込み、(body, status, error) を返す。"""
+    try:
+        body = json.loads(raw_body or "{}")
+    except json.JSONDecodeError:
+        return None, 400, "Invalid JSON in request body"
+    if not isinstance(body, dict):
+        return None, 400, "Invalid JSON in request body"
+    session_id = body.get("session_id")
+    if not session_id or not isinstance(session_id, str):
+        return body, 400, "session_id is required"
+    return body, 200, None
+
+
+def _parse_request(level: int, raw_body: str) -> tuple[dict | None, int, str | None]:
+    """リクエストボディを読み込み、(body, status, error) を返す。
+
+    question_id が指定された場合は保存済みの設問で body["question"] を置き換える。
+    """
+    try:
+        body = json.loads(raw_body or "{}")
+    except json.JSONDecodeError:
+        return None, 400, "Invalid JSON in request body"
+    if not isinstance(body, dict):
+        return None, 400, "Invalid JSON in request body"
+    error = _validate_grade_body(body, GRADE_LEVELS[level]["max_step"])
+    if error:
+        return body, 400, error
+    if body.get("question_id") is not None:
+        question = load_question(level=level, question_id=body["question_id"], session_id=body["session_id"])
+        if question is None:
+            return body, 404, "question not found"
+        body = {**body, "question": question}
+    return body, 200, None
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def _dispatch(path: str, raw_body: str):
+    """パスに応じてリクエストを検証し、(status, error, NDJSONイベントのジェネレータ) を返す。"""
+    m = GRADE_PATH_RE.match(path)
+    if m:
+        level = int(m.group(1))
+        body, status, error = _parse_request(level, raw_body)
+        return status, error, None if error else stream_grade_events(level, body)
+
+    m = GENERATE_PATH_RE.match(path)
+    if m:
+        level = int(m.group(1))
+        body, status, error = _parse_generate_request(raw_body)
+        return status, error, None if error else stream_generate_events(level, body)
+
+    return 404, "Not found", None
+
+
+def handler(event, context):
+    """Buffered fallback for environments without response streaming (returns the full NDJSON body)."""
+    set_deadline(context, max_seconds=FUNCTION_TIMEOUT_SECONDS)
+    status, error, events = _dispatch(event.get("rawPath") or event.get("path") or "", event.get("body"))
+    if error:
+        return {
+            "statusCode": status,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"error": error}),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": {**CORS_HEADERS, "Content-Type": "application/x-ndjson"},
+        "body": "".join(_ndjson(e) for e in events),
+    }
+
+
+class StreamRequestHandler(BaseHTTPRequestHandler):
+    """Lambda Web Adapter から転送されるHTTPリクエストを処理し、chunked転送でNDJSONを返す。"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Lambda Web Adapter のレディネスチェック
+        self._send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        # リトライ・続きの生成・補正を関数のタイムアウトまでに収める（Lambdaは1コンテナで1リクエストずつ処理する）
+        set_deadline(None, max_seconds=FUNCTION_TIMEOUT_SECONDS)
+        try:
+            self._stream(self.path.split("?", 1)[0])
+        finally:
+            set_deadline(None)
+
+    def _stream(self, path: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length).decode("utf-8") if length else ""
+        status, error, events = _dispatch(path, raw_body)
+        if error:
+            self._send_json(status, {"error": error})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            self._write_chunk(_ndjson(event).encode("utf-8"))
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info(format, *args)
+
+
+def serve() -> None:
+    """Lambda Web Adapter 用のHTTPサーバを起動する（PORT環境変数、デフォルト8080）。"""
+    port = int(os.environ.get("PORT", "8080"))
+    ThreadingHTTPServer(("0.0.0.0", port), StreamRequestHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Lambda Web Adapter から起動されるストリーミング用HTTPサーバ
+exec python3 -m backend.handlers.stream_handler
@@ -0,0 +1,78 @@
+"""選択式設問の解答キー - 正解と選択肢ごとの根拠をサーバ側にだけ保持し、採点をローカルで行う。
+
+生成時に正解番号と各選択肢の根拠を設問の answer_key として付け、設問ストアに保存する。
+クライアントに返す設問からは /lv1/generate が answer_key を取り除く。採点時は
+question_id で設問ストアから引いた設問の answer_key で回答を採点するため、
+採点・レビューのBedrock呼び出しが不要になる。
+
+解答キーは設問ストア（QUESTION_STORE_ENABLED）が有効な場合のみ使う。無効時は生成で
+正解・根拠を要求せず、クライアントが送った設問の answer_key も使わない（従来どおりClaudeで採点する）。
+"""
+
+from backend.lib.question_store import is_store_enabled
+
+
+def is_enabled() -> bool:
+    """設問ストアが有効な場合に解答キーを要求・使用する（キーをクライアントに渡さずに保持できるため）。"""
+    return is_store_enabled()
+
+
+def validate_answer_key(options, answer_index, rationales) -> bool:
+    """生成結果の正解番号・根拠が選択肢と対応しているかを確認する。"""
+    if not isinstance(options, list) or not options or not all(isinstance(o, str) for o in options):
+        return False
+    if not isinstance(answer_index, int) or isinstance(answer_index, bool):
+        return False
+    if not 0 <= answer_index < len(options):
+        return False
+    if not isinstance(rationales, list) or len(rationales) != len(options):
+        return False
+    return all(isinstance(r, str) and r.strip() for r in rationales)
+
+
+def attach_answer_key(question: dict, answer_index, rationales) -> dict:
+    """解答キーが有効なら設問に answer_key を付けて返す。無効・設問ストア無効の場合はそのまま返す。"""
+    if not is_enabled() or not validate_answer_key(question.get("options"), answer_index, rationales):
+        return question
+    return {**question, "answer_key": {"answer_index": answer_index, "rationales": rationales}}
+
+
+def strip_answer_key(question: dict) -> dict:
+    """クライアントへの返却・プロンプトへの埋め込みの前に answer_key を取り除く。"""
+    if "answer_key" not in question:
+        return question
+    return {k: v for k, v in question.items() if k != "answer_key"}
+
+
+def score_choice(question: dict, answer: str) -> dict | None:
+    """解答キーで選択式の回答を採点する。
+
+    設問ストア有効時の採点対象は保存済みの設問のみ（クライアントの設問は受け付けない）のため、
+    無効時は answer_key があっても使わない。
+
+    Returns:
+        {"correct": bool, "score": 100 | 0, "feedback": str, "explanation": str}
+        解答キーがない・無効、または回答が選択肢のどれとも一致しない場合は None
+    """
+    key = question.get("answer_key")
+    if not is_enabled() or not isinstance(key, dict):
+        return None
+
+    options = question.get("options")
+    correct_index = key.get("answer_index")
+    rationales = key.get("rationales")
+    if not validate_answer_key(options, correct_index, rationales):
+        return None
+    try:
+        selected = options.index(answer.strip())
+    except ValueError:
+        return None
+
+    correct = selected == correct_index
+    verdict = "正解です。" if correct else "不正解です。"
+    return {
+        "correct": correct,
+        "score": 100 if correct else 0,
+        "feedback": f"{verdict}{rationales[selected]}",
+        "explanation": f"正解は「{options[correct_index]}」です。{rationales[correct_index]}",
+    }
@@ -1,17 +1,48 @@
 import json
+import os
+import random
 import re
 import time
 import logging
+import threading
 
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+from backend.lib.bedrock_router import DEFAULT_REGION, get_configured_endpoints, get_default_model_id, router
+from backend.lib.hedging import call_hedged
 
 logger = logging.getLogger(__name__)
 
-REGION = "ap-northeast-1"
-MODEL_ID = "global.anthropic.claude-sonnet-4-6"
+REGION = DEFAULT_REGION
+MODEL_ID = get_default_model_id()
 MAX_RETRIES = 3
 BASE_DELAY = 1  # seconds
+MAX_DELAY = 8  # seconds（フルジッターの上限）
+
+# コンテナ単位のリトライ予算（トークンバケット）。
+# リトライ1回ごとに RETRY_COST を消費し、成功1回ごとに RETRY_REFUND を回復する。
+# スロットリング中に全コンテナが一斉にリトライを重ねて負荷を増幅させないための上限。
+RETRY_BUDGET_CAPACITY = 10.0
+RETRY_COST = 1.0
+RETRY_REFUND = 0.1
+
+# Lambdaのタイムアウト直前までスリープしないための安全マージン
+DEADLINE_SAFETY_MARGIN = 2  # seconds
+
+# max_tokens で切れた応答の続きを生成する回数の上限（BEDROCK_MAX_CONTINUATIONS で変更可）
+DEFAULT_MAX_CONTINUATIONS = 2
+# 期限までの残り時間がこれ未満なら続きを生成しない
+CONTINUATION_MIN_SECONDS = 5
+# max_tokens で切れたツール呼び出しをやり直すときの出力上限の上限
+MAX_TOOL_RETRY_TOKENS = 8192
 
 RETRYABLE_ERRORS = (
     "ThrottlingException",
@@ -19,6 +50,40 @@ RETRYABLE_ERRORS = (
     "ModelTimeoutException",
 )
 
+# 接続・タイムアウトのエラーもリトライ・フェイルオーバーの対象にする（botocore 側ではリトライしないため）
+CONNECTION_ERRORS = (
+    EndpointConnectionError,
+    ConnectTimeoutError,
+    ReadTimeoutError,
+    ConnectionClosedError,
+)
+
+# ウォームコンテナ間で使い回すクライアントの接続設定。
+# リトライは _call_with_retry（ジッター・予算・期限つき）に一本化するため botocore 側では行わない。
+READ_TIMEOUT = 60
+CLIENT_CONFIG = Config(
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=READ_TIMEOUT,
+    retries={"max_attempts": 1, "mode": "standard"},
+)
+
+# 期限が設定されている場合は read_timeout を残り時間まで縮める（READ_TIMEOUT_STEP 秒刻みで切り下げ）。
+# 応答が止まった読み込みでも期限内にタイムアウトさせるため。刻むのはクライアントの数を抑えるため
+READ_TIMEOUT_STEP = 5
+MIN_READ_TIMEOUT = 5
+
+_clients: dict = {}
+_client_override = None
+_client_lock = threading.Lock()
+
+_retry_tokens = RETRY_BUDGET_CAPACITY
+_retry_lock = threading.Lock()
+
+# 現在のLambda呼び出しの期限（time.monotonic() 基準）。Noneは期限なし
+_deadline = None
+
 _CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", flags=re.DOTALL | re.IGNORECASE)
 
 
@@ -30,54 +95,503 @@ def strip_code_fence(text: str) -> str:
     return text.strip()
 
 
-def invoke_claude(system_prompt: str, user_prompt: str, max_tokens: int = 2048) -> dict:
+def response_text(result: dict) -> str:
+    """応答の最初のテキストブロックをコードフェンスを除いて返す（ログ出力・テキスト応答のパース用）。"""
+    return strip_code_fence((result.get("content") or [{}])[0].get("text", ""))
+
+
+def parse_json_response(result: dict) -> dict:
+    """応答から出力JSONを取り出す。
+
+    構造化出力（tool_use ブロック）の場合はツールの input をそのまま返し、
+    テキスト応答の場合はコードフェンスを除いて json.loads する。
+
+    Raises:
+        json.JSONDecodeError: テキスト応答がJSONとして不正な場合
+    """
+    for block in result.get("content") or []:
+        if block.get("type") == "tool_use":
+            return block.get("input") or {}
+    return json.loads(response_text(result))
+
+
+def _read_timeout() -> int:
+    """この呼び出しで使う read_timeout（期限なしなら READ_TIMEOUT）。"""
+    remaining = remaining_time()
+    if remaining is None:
+        return READ_TIMEOUT
+    stepped = int(remaining // READ_TIMEOUT_STEP) * READ_TIMEOUT_STEP
+    return min(READ_TIMEOUT, max(MIN_READ_TIMEOUT, stepped))
+
+
+def get_client(region: str = REGION):
+    """プロセス全体で共有するリージョンごとのBedrock Runtimeクライアントを返す（初回呼び出し時に生成）。
+
+    期限が設定されている場合は、残り時間に合わせた read_timeout のクライアントを返す。
+    """
+    if _client_override is not None:
+        return _client_override
+    read_timeout = _read_timeout()
+    key = (region, read_timeout)
+    client = _clients.get(key)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(key)
+            if client is None:
+                config = CLIENT_CONFIG
+                if read_timeout != READ_TIMEOUT:
+                    config = CLIENT_CONFIG.merge(Config(read_timeout=read_timeout))
+                client = _clients[key] = boto3.client(
+                    "bedrock-runtime", region_name=region, config=config,
+                )
+    return client
+
+
+def set_client(client) -> None:
+    """全リージョン共通のクライアントに差し替える（テスト用スタブの注入）。
+
+    Noneを渡すと差し替えを解除し、キャッシュ済みクライアントも破棄する。
+    """
+    global _client_override
+    with _client_lock:
+        _client_override = client
+        _clients.clear()
+
+
+def get_reviewer_fallback_model_id() -> str | None:
+    """Reviewer用のフォールバックモデル（BEDROCK_REVIEWER_FALLBACK_MODEL_ID）。未設定ならNone。"""
+    return os.environ.get("BEDROCK_REVIEWER_FALLBACK_MODEL_ID") or None
+
+
+def _candidate_endpoints(model_id: str | None, fallback_model_id: str | None) -> list[tuple[str, str]]:
+    """試行順のエンドポイント一覧を返す。
+
+    設定済みエンドポイントをルーターの順序で並べる。model_id が指定されていれば
+    設定済みのリージョン群でそのモデルを使う。fallback_model_id が指定されていれば
+    同じリージョン群でフォールバックモデルを使う候補を末尾に加える。
+    """
+    endpoints = get_configured_endpoints()
+    regions = list(dict.fromkeys(region for region, _ in endpoints))
+    if model_id:
+        endpoints = [(region, model_id) for region in regions]
+    ordered = router.order(endpoints)
+    if fallback_model_id:
+        fallbacks = [(region, fallback_model_id) for region in regions]
+        ordered += [e for e in router.order(fallbacks) if e not in ordered]
+    return ordered
+
+
+def _retryable_error_code(e: Exception) -> str | None:
+    """リトライ・フェイルオーバーの対象ならエラー名を、対象外ならNoneを返す。"""
+    if isinstance(e, ClientError):
+        code = e.response["Error"]["Code"]
+        return code if code in RETRYABLE_ERRORS else None
+    if isinstance(e, CONNECTION_ERRORS):
+        return type(e).__name__
+    return None
+
+
+def _call_with_failover(send, model_id: str | None = None, fallback_model_id: str | None = None):
+    """候補エンドポイントを順に試し、最初に成功した send(client, model_id) の結果を返す。
+
+    リトライ可能なエラー（接続・タイムアウトを含む）は次の候補へのフェイルオーバーとして扱い、
+    全候補が失敗した場合は最後のエラーを送出する（_call_with_retry がバックオフして再試行する）。
+    """
+    last_error = None
+    for endpoint in _candidate_endpoints(model_id, fallback_model_id):
+        region, endpoint_model_id = endpoint
+        started = time.monotonic()
+        try:
+            result = send(get_client(region), endpoint_model_id)
+        except (ClientError, *CONNECTION_ERRORS) as e:
+            error_code = _retryable_error_code(e)
+            if error_code is None:
+                raise
+            router.record_failure(endpoint)
+            logger.warning("Bedrock endpoint %s/%s failed with %s", region, endpoint_model_id, error_code)
+            last_error = e
+            continue
+        router.record_success(endpoint, time.monotonic() - started)
+        if last_error is not None:
+            logger.info("Bedrock call failed over to %s/%s", region, endpoint_model_id)
+        return result
+    raise last_error
+
+
+def is_prompt_cache_enabled() -> bool:
+    """環境変数 BEDROCK_PROMPT_CACHE が false 以外ならシステムプロンプトをキャッシュ対象にする。"""
+    return os.environ.get("BEDROCK_PROMPT_CACHE", "true").strip().lower() != "false"
+
+
+def _build_system(system_prompt: str):
+    """システムプロンプトを組み立てる。
+
+    システムプロンプトは呼び出し元ごとに固定のため、プロンプトキャッシュ有効時は
+    cache_control を付けたブロックとして送り、2回目以降の入力処理を省略させる。
+    （モデルの最小キャッシュ長に満たない場合はキャッシュされずに通常処理される）
+    """
+    if not is_prompt_cache_enabled():
+        return system_prompt
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def _build_request_body(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    temperature: float = 0.7,
+    tool: dict | None = None,
+    prefill: str | None = None,
+) -> str:
+    """invoke_model / invoke_model_with_response_stream 共通のリクエストボディを組み立てる。
+
+    tool を指定した場合は tool_choice でそのツールの呼び出しを強制し、出力をツールの
+    input_schema に沿ったJSONにする（構造化出力）。
+    prefill を指定した場合はアシスタントの応答の冒頭として渡し、その続きを生成させる。
     """
-    Bedrock RuntimeでClaude Opus 4.6を呼び出す共通関数。
+    messages = [{"role": "user", "content": [{"type": "text", "text": user_prompt}]}]
+    if prefill:
+        messages.append({"role": "assistant", "content": [{"type": "text", "text": prefill}]})
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "system": _build_system(system_prompt),
+        "messages": messages,
+    }
+    if tool is not None:
+        body["tools"] = [tool]
+        body["tool_choice"] = {"type": "tool", "name": tool["name"]}
+    return json.dumps(body)
+
+
+def get_cache_usage(usage: dict | None) -> dict:
+    """usage からプロンプトキャッシュの読み込み・書き込みトークン数を取り出す。"""
+    usage = usage or {}
+    return {
+        "cache_read_input_tokens": usage.get("cache_read_input_tokens", 0),
+        "cache_creation_input_tokens": usage.get("cache_creation_input_tokens", 0),
+        "input_tokens": usage.get("input_tokens", 0),
+    }
+
+
+def _log_cache_usage(cache_usage: dict) -> None:
+    logger.info(
+        "Bedrock prompt cache: read=%d created=%d uncached_input=%d",
+        cache_usage["cache_read_input_tokens"],
+        cache_usage["cache_creation_input_tokens"],
+        cache_usage["input_tokens"],
+    )
+
+
+def get_max_continuations() -> int:
+    """max_tokens で切れた応答の続きを生成する回数の上限（BEDROCK_MAX_CONTINUATIONS、0で無効）。"""
+    raw = os.environ.get("BEDROCK_MAX_CONTINUATIONS")
+    if raw is None:
+        return DEFAULT_MAX_CONTINUATIONS
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logger.warning(
+            "Invalid value for BEDROCK_MAX_CONTINUATIONS: %r, using default %d", raw, DEFAULT_MAX_CONTINUATIONS,
+        )
+        return DEFAULT_MAX_CONTINUATIONS
+
+
+def _can_continue(continuations: int) -> bool:
+    """続きの生成をもう1回行えるか（回数上限とLambdaの期限で判断する）。"""
+    if continuations >= get_max_continuations():
+        logger.warning("Bedrock response truncated by max_tokens, continuation limit reached")
+        return False
+    remaining = remaining_time()
+    if remaining is not None and remaining < CONTINUATION_MIN_SECONDS:
+        logger.warning("Bedrock response truncated by max_tokens, %.1fs left before deadline", remaining)
+        return False
+    return True
+
+
+def _continuation_prefill(text: str) -> str:
+    """続きの生成に渡すプレフィル（アシスタントの応答は末尾に空白を含められないため除く）。"""
+    return text.rstrip()
+
+
+def _merge_usage(total: dict | None, usage: dict | None) -> dict:
+    merged = dict(total or {})
+    for key, value in (usage or {}).items():
+        if isinstance(value, int):
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def set_deadline(context, max_seconds: float | None = None) -> None:
+    """Lambda context の残り実行時間から、この呼び出しの期限を設定する。
+
+    各ハンドラの先頭で呼び出す。max_seconds を指定した場合は期限をその秒数以内に縮める
+    （API Gatewayの29秒制限など）。context が None（ローカル実行・テスト、context を受け取れない
+    Lambda Web Adapter 経由のリクエスト）の場合は max_seconds を期限とし、それもなければ期限なし。
+    """
+    global _deadline
+    try:
+        remaining = float(context.get_remaining_time_in_millis()) / 1000
+    except (AttributeError, TypeError, ValueError):
+        remaining = None
+    if max_seconds is not None:
+        remaining = max_seconds if remaining is None else min(remaining, max_seconds)
+    _deadline = None if remaining is None else time.monotonic() + remaining
+
+
+def remaining_time() -> float | None:
+    """期限までの残り秒数（安全マージン控除後）を返す。期限なしの場合はNone。"""
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic() - DEADLINE_SAFETY_MARGIN
+
+
+def reset_retry_budget() -> None:
+    """リトライ予算を満タンに戻す（テスト用）。"""
+    global _retry_tokens
+    with _retry_lock:
+        _retry_tokens = RETRY_BUDGET_CAPACITY
+
+
+def _acquire_retry_token() -> bool:
+    global _retry_tokens
+    with _retry_lock:
+        if _retry_tokens < RETRY_COST:
+            return False
+        _retry_tokens -= RETRY_COST
+        return True
+
+
+def _is_retry_budget_healthy() -> bool:
+    """リトライ予算が半分以上残っているか（下回っている間はスロットリング中とみなしヘッジしない）。"""
+    with _retry_lock:
+        return _retry_tokens >= RETRY_BUDGET_CAPACITY / 2
+
+
+def _refund_retry_token() -> None:
+    global _retry_tokens
+    with _retry_lock:
+        _retry_tokens = min(RETRY_BUDGET_CAPACITY, _retry_tokens + RETRY_REFUND)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """フルジッター: 0〜min(MAX_DELAY, BASE_DELAY * 2^attempt) の一様乱数。"""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * (2 ** attempt)))
+
+
+def _call_with_retry(call):
+    """リトライ可能なエラー（スロットリング等と接続・タイムアウト）に対して call() を再実行する。
+
+    - 待ち時間はフルジッター付き指数バックオフ
+    - コンテナ単位のリトライ予算が尽きている場合はリトライしない
+    - Lambdaの期限（set_deadline）を超えてスリープする場合はリトライしない
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            result = call()
+            _refund_retry_token()
+            return result
+        except (ClientError, *CONNECTION_ERRORS) as e:
+            error_code = _retryable_error_code(e)
+            if error_code is None or attempt >= MAX_RETRIES - 1:
+                raise
+
+            delay = _backoff_delay(attempt)
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning(
+                    "Bedrock call failed with %s, not retrying: %.1fs left before deadline",
+                    error_code, remaining,
+                )
+                raise
+            if not _acquire_retry_token():
+                logger.warning("Bedrock call failed with %s, retry budget exhausted", error_code)
+                raise
+
+            logger.warning(
+                "Bedrock call failed with %s, retrying in %.2fs (attempt %d/%d)",
+                error_code, delay, attempt + 1, MAX_RETRIES,
+            )
+            time.sleep(delay)
+
+
+def invoke_claude(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int = 2048,
+    model_id: str | None = None,
+    temperature: float = 0.7,
+    fallback_model_id: str | None = None,
+    call_site: str | None = None,
+    tool: dict | None = None,
+) -> dict:
+    """
+    Bedrock RuntimeでClaudeを呼び出す共通関数。
+
+    呼び出し先はルーター（bedrock_router）が健全かつ最速のエンドポイントを選び、
+    スロットリング時は次の候補へフェイルオーバーする。
 
     Args:
         system_prompt: システムプロンプト
         user_prompt: ユーザープロンプト
         max_tokens: 最大出力トークン数（デフォルト: 2048）
+        model_id: 使用するモデル（省略時は BEDROCK_ENDPOINTS / BEDROCK_MODEL_ID の設定どおり）
+        temperature: サンプリング温度（デフォルト: 0.7）
+        fallback_model_id: 全エンドポイントが失敗した場合に試すモデル（省略時はなし）
+        call_site: 呼び出し箇所（例: "lv3.grader"）。レイテンシの記録とヘッジ（hedging）に使う
+        tool: 構造化出力のツール定義（output_schemas.get_tool）。指定時は出力がツールの
+            input として返る（parse_json_response で取り出す）
 
     Returns:
-        Bedrockレスポンスをパースしたdict
+        Bedrockレスポンスをパースしたdict（プロンプトキャッシュのヒット状況は
+        "usage" に含まれ、get_cache_usage で取り出せる）。
+        テキスト応答が max_tokens で切れた場合は、切れた出力をプレフィルとして続きを
+        生成し（最大 BEDROCK_MAX_CONTINUATIONS 回）、つなぎ合わせた1つのテキストブロックと
+        合算した usage、続きの生成回数 "continuations" を返す。
+        ツール呼び出しが切れた場合は出力上限を2倍（最大 MAX_TOOL_RETRY_TOKENS）にして1回やり直す
 
     Raises:
         ClientError: リトライ上限超過後のBedrock呼び出しエラー
     """
-    client = boto3.client("bedrock-runtime", region_name=REGION)
+    def call(prefill=None, tokens=max_tokens):
+        body = _build_request_body(system_prompt, user_prompt, tokens, temperature, tool, prefill)
 
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "temperature": 0.7,
-        "system": system_prompt,
-        "messages": [{"role": "user", "content": [{"type": "text", "text": user_prompt}]}],
-    })
-
-    last_exception = None
-
-    for attempt in range(MAX_RETRIES):
-        try:
+        def send(client, model_id):
             response = client.invoke_model(
-                modelId=MODEL_ID,
+                modelId=model_id,
                 contentType="application/json",
                 accept="application/json",
                 body=body,
             )
-            result = json.loads(response["body"].read())
+            return json.loads(response["body"].read())
+
+        result = _call_with_retry(lambda: call_hedged(
+            call_site,
+            lambda: _call_with_failover(send, model_id, fallback_model_id),
+            allow_hedge=_is_retry_budget_healthy(),
+        ))
+        if isinstance(result, dict) and "usage" in result:
+            _log_cache_usage(get_cache_usage(result["usage"]))
+        return result
+
+    result = call()
+    if not isinstance(result, dict) or result.get("stop_reason") != "max_tokens":
+        return result
+    if tool is not None:
+        # ツール呼び出しの途中の input はプレフィルで続けられないため、出力上限を広げて1回だけやり直す
+        if max_tokens >= MAX_TOOL_RETRY_TOKENS or not _can_continue(0):
             return result
-        except ClientError as e:
-            error_code = e.response["Error"]["Code"]
-            if error_code in RETRYABLE_ERRORS and attempt < MAX_RETRIES - 1:
-                delay = BASE_DELAY * (2 ** attempt)
-                logger.warning(
-                    "Bedrock call failed with %s, retrying in %ss (attempt %d/%d)",
-                    error_code, delay, attempt + 1, MAX_RETRIES,
-                )
-                time.sleep(delay)
-                last_exception = e
-            else:
-                raise
+        retry_tokens = min(max_tokens * 2, MAX_TOOL_RETRY_TOKENS)
+        logger.warning("Bedrock tool call truncated by max_tokens, retrying with max_tokens=%d", retry_tokens)
+        return call(tokens=retry_tokens)
+
+    # 切れた応答をプレフィルとして渡し、続きを生成してつなぎ合わせる
+    text = (result.get("content") or [{}])[0].get("text", "")
+    usage = result.get("usage")
+    continuations = 0
+    while result.get("stop_reason") == "max_tokens" and _can_continue(continuations):
+        prefill = _continuation_prefill(text)
+        if not prefill:
+            break
+        continuations += 1
+        logger.info("Bedrock response truncated by max_tokens, continuing (%d)", continuations)
+        result = call(prefill)
+        text = prefill + (result.get("content") or [{}])[0].get("text", "")
+        usage = _merge_usage(usage, result.get("usage"))
+
+    if not continuations:
+        return result
+    return {
+        **result,
+        "content": [{"type": "text", "text": text}],
+        "usage": usage,
+        "continuations": continuations,
+    }
+
+
+def invoke_claude_stream(
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int = 2048,
+    model_id: str | None = None,
+    temperature: float = 0.7,
+    fallback_model_id: str | None = None,
+    call_site: str | None = None,
+    tool: dict | None = None,
+):
+    """
+    invoke_model_with_response_stream でClaudeを呼び出し、生成テキストを逐次返すジェネレータ。
+
+    ストリーム開始前のリトライ可能なエラーは invoke_claude と同じ方針でリトライする。
+    ストリーム途中のエラーはそのまま送出する（部分出力を二重に返さないため）。
+
+    Args:
+        system_prompt: システムプロンプト
+        user_prompt: ユーザープロンプト
+        max_tokens: 最大出力トークン数（デフォルト: 2048）
+        model_id: 使用するモデル（省略時は BEDROCK_ENDPOINTS / BEDROCK_MODEL_ID の設定どおり）
+        temperature: サンプリング温度（デフォルト: 0.7）
+        fallback_model_id: 全エンドポイントが失敗した場合に試すモデル（省略時はなし）
+        call_site: 呼び出し箇所。ストリーミングではヘッジしない（get_call_config との互換のため受け取る）
+        tool: 構造化出力のツール定義。指定時はツール input のJSON断片（input_json_delta）を返す
+
+    Yields:
+        テキスト（またはツール input のJSON）の差分（str）。テキスト応答が max_tokens で
+        切れた場合は invoke_claude と同様に続きを生成し、その差分を続けて返す
+
+    Raises:
+        ClientError: リトライ上限超過後、またはストリーム途中のBedrock呼び出しエラー
+    """
+    # 返した出力（emitted）は続きの生成のプレフィルにそのまま使う。プレフィルは末尾に空白を
+    # 含められないため、テキストの末尾の空白は次の文字が届くまで返さずに保留する
+    text = ""
+    emitted = ""
+    continuations = 0
+    prefill = None
+    while True:
+        body = _build_request_body(system_prompt, user_prompt, max_tokens, temperature, tool, prefill)
+
+        def send(client, model_id, body=body):
+            return client.invoke_model_with_response_stream(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=body,
+            )
+
+        response = _call_with_retry(lambda: _call_with_failover(send, model_id, fallback_model_id))
+
+        stop_reason = None
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            data = json.loads(chunk["bytes"])
+            if data.get("type") == "message_start":
+                _log_cache_usage(get_cache_usage(data.get("message", {}).get("usage")))
+                continue
+            if data.get("type") == "message_delta":
+                stop_reason = data.get("delta", {}).get("stop_reason")
+                continue
+            if data.get("type") != "content_block_delta":
+                continue
+            delta = data.get("delta", {})
+            if delta.get("type") == "text_delta" and delta.get("text"):
+                text += delta["text"]
+                visible = text.rstrip()
+                if len(visible) > len(emitted):
+                    yield visible[len(emitted):]
+                    emitted = visible
+            elif delta.get("type") == "input_json_delta" and delta.get("partial_json"):
+                yield delta["partial_json"]
 
-    raise last_exception
+        if stop_reason != "max_tokens" or tool is not None or not emitted or not _can_continue(continuations):
+            if len(text) > len(emitted):
+                yield text[len(emitted):]
+            return
+        # 返した出力だけをプレフィルとして、その続きを生成させる（保留した空白は続きの生成に任せる）
+        prefill = emitted
+        text = emitted
+        continuations += 1
+        logger.info("Bedrock stream truncated by max_tokens, continuing (%d)", continuations)
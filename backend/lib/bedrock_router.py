@@ -0,0 +1,139 @@
+"""Bedrockエンドポイントルーター - リージョン/モデルの候補から健全で最速のものを選ぶ。
+
+エンドポイントは環境変数 BEDROCK_ENDPOINTS に優先順で "region:model_id" をカンマ区切りで指定する
+（例: "ap-northeast-1:global.anthropic.claude-sonnet-4-6,us-east-1:us.anthropic.claude-sonnet-4-6"）。
+未指定の場合は REGION と BEDROCK_MODEL_ID の1件のみを使う。
+
+- 成功時のレイテンシをEWMAで記録し、計測済みのエンドポイントは速い順に試す
+- スロットリング等が FAILURE_THRESHOLD 回連続したエンドポイントは COOLDOWN_SECONDS の間
+  サーキットを開いて候補から外す（期間経過後は1件ずつ試行を許すハーフオープン）
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = "ap-northeast-1"
+DEFAULT_MODEL_ID = "global.anthropic.claude-sonnet-4-6"
+
+EWMA_ALPHA = 0.3
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30
+
+
+def get_default_model_id() -> str:
+    """環境変数 BEDROCK_MODEL_ID（未設定時は Sonnet 4.6）を返す。"""
+    return os.environ.get("BEDROCK_MODEL_ID") or DEFAULT_MODEL_ID
+
+
+def parse_endpoints(raw: str | None) -> list[tuple[str, str]]:
+    """ "region:model_id,..." を [(region, model_id), ...] に変換する。
+
+    モデルIDには ":" が含まれ得る（例: "...-v1:0"）ため、最初の ":" でのみ分割する。
+    model_id を省略した要素（"us-east-1"）は既定モデルを使う。
+    """
+    endpoints = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        region, _, model_id = item.partition(":")
+        endpoints.append((region.strip(), model_id.strip() or get_default_model_id()))
+    return endpoints
+
+
+def get_configured_endpoints() -> list[tuple[str, str]]:
+    """BEDROCK_ENDPOINTS を読み込む。未指定・不正な場合は既定の1件を返す。"""
+    endpoints = parse_endpoints(os.environ.get("BEDROCK_ENDPOINTS"))
+    return endpoints or [(DEFAULT_REGION, get_default_model_id())]
+
+
+class EndpointStats:
+    """エンドポイント1件分のレイテンシ（EWMA）とサーキットブレーカーの状態。"""
+
+    def __init__(self):
+        self.ewma_latency = None
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+
+class EndpointRouter:
+    """呼び出しごとに試行順のエンドポイント一覧を返し、結果を記録する。"""
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, endpoint: tuple[str, str]) -> EndpointStats:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = EndpointStats()
+        return stats
+
+    def order(self, endpoints: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """試行順に並べたエンドポイントを返す。
+
+        健全なエンドポイントを先に（計測済みはレイテンシ順、未計測は設定順で後ろに）、
+        サーキットが開いているものはクールダウン終了が近い順に最後に並べる。
+        全件が開いていても呼び出し自体は行う（リトライ側のバックオフに任せる）。
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy, tripped = [], []
+            for index, endpoint in enumerate(endpoints):
+                stats = self._get_stats(endpoint)
+                if stats.is_open(now):
+                    tripped.append((stats.open_until, index, endpoint))
+                else:
+                    measured = stats.ewma_latency is not None
+                    healthy.append((not measured, stats.ewma_latency or 0.0, index, endpoint))
+        healthy.sort()
+        tripped.sort()
+        return [e[-1] for e in healthy] + [e[-1] for e in tripped]
+
+    def record_success(self, endpoint: tuple[str, str], latency: float) -> None:
+        with self._lock:
+            stats = self._get_stats(endpoint)
+            if stats.ewma_latency is None:
+                stats.ewma_latency = latency
+            else:
+                stats.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stats.ewma_latency
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+
+    def record_failure(self, endpoint: tuple[str, str]) -> None:
+        with self._lock:
+            stats = self._get_stats(endpoint)
+            stats.consecutive_failures += 1
+            if stats.consecutive_failures >= FAILURE_THRESHOLD:
+                stats.open_until = time.monotonic() + COOLDOWN_SECONDS
+                logger.warning(
+                    "Bedrock endpoint %s/%s tripped after %d failures, skipping for %ds",
+                    endpoint[0], endpoint[1], stats.consecutive_failures, COOLDOWN_SECONDS,
+                )
+
+    def snapshot(self) -> dict:
+        """エンドポイントごとの状態を返す（ログ・テスト用）。"""
+        with self._lock:
+            return {
+                endpoint: {
+                    "ewma_latency": stats.ewma_latency,
+                    "consecutive_failures": stats.consecutive_failures,
+                    "open_until": stats.open_until,
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        """記録をすべて破棄する（テスト用）。"""
+        with self._lock:
+            self._stats.clear()
+
+
+router = EndpointRouter()
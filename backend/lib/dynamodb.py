@@ -0,0 +1,65 @@
+"""プロセス全体で共有するDynamoDBリソース
+
+ウォームコンテナではリソースの生成（セッション・エンドポイント解決・HTTP接続）を
+呼び出しごとに繰り返さないよう、初回利用時に生成したものを使い回す。
+Table() の結果もテーブル名ごとにキャッシュする。
+"""
+
+import threading
+
+import boto3
+from botocore.config import Config
+
+REGION = "ap-northeast-1"
+
+# API Gatewayの29秒以内に確実に失敗を返せるよう、タイムアウトは短めにする
+CLIENT_CONFIG = Config(
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+    retries={"max_attempts": 3, "mode": "standard"},
+)
+
+_resource = None
+_lock = threading.Lock()
+
+
+class CachedTableResource:
+    """DynamoDBリソースのラッパー。Table() をテーブル名ごとにキャッシュし、それ以外は委譲する。"""
+
+    def __init__(self, resource):
+        self._resource = resource
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    def Table(self, name: str):
+        table = self._tables.get(name)
+        if table is None:
+            with self._tables_lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = self._tables[name] = self._resource.Table(name)
+        return table
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+
+def get_resource() -> CachedTableResource:
+    """共有のDynamoDBリソースを返す（初回呼び出し時に生成）。"""
+    global _resource
+    if _resource is None:
+        with _lock:
+            if _resource is None:
+                _resource = CachedTableResource(
+                    boto3.resource("dynamodb", region_name=REGION, config=CLIENT_CONFIG)
+                )
+    return _resource
+
+
+def reset_resource() -> None:
+    """共有リソースを破棄する（テスト用）。次回の get_resource() で再生成する。"""
+    global _resource
+    with _lock:
+        _resource = None
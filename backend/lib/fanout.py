@@ -0,0 +1,148 @@
+"""ステップの並行生成 - シナリオ骨子を先に作り、各ステップの設問を同時に生成する。
+
+Lv3/Lv4 は5〜6ステップの長いシナリオを1回の呼び出しで順に書かせるため、生成時間が
+出力長に比例して伸びる。GENERATE_FANOUT_ENABLED=true のときは2段階で生成する:
+
+1. 短い呼び出しで全ステップ共通のシナリオ骨子（組織・登場人物・数値など）を作る
+2. ステップごとに骨子と設問形式を渡して並行に呼び出し、結果をステップ順に組み立てて検証する
+
+所要時間は「骨子の生成 + 最も遅いステップ」に縮むが、呼び出し回数は1回から 1+ステップ数
+（Lv3で6回、Lv4で7回。再生成があればさらに増える）になり、入力トークンと費用も増える。
+そのため既定は無効とし、生成時間を優先する場合だけ有効にする。
+
+骨子・ステップの呼び出しには専用のシステムプロンプトを使う。レベルの出題用システムプロンプトは
+設問セット全体（questions に全ステップ）を出力させる指示のため、設問セットの仕様として
+ユーザープロンプトに含めるだけにする。検証に落ちたステップは1回だけ個別に再生成し、
+それでも揃わなければ ValueError を送出する（呼び出し元は1回での生成に戻す）。
+
+骨子・ステップ再生成・1回での生成と段階的に戻るため、合計がAPI Gatewayの29秒を超えうる。
+次の段階に必要な時間が期限（set_deadline）までに残っていなければ GenerationDeadlineError を
+送出し、ハンドラは再試行可能なエラー（503）を返す。
+"""
+
+import logging
+import os
+
+from backend.lib.bedrock_client import invoke_claude, remaining_time
+from backend.lib.model_config import get_call_config
+from backend.lib.parallel import run_parallel
+from backend.lib.question_repair import collect_valid_steps, load_response
+
+logger = logging.getLogger(__name__)
+
+API_GATEWAY_TIMEOUT_SECONDS = 29
+# 各段階の開始に必要な残り時間の目安（秒）
+STEP_RETRY_MIN_SECONDS = 8
+SINGLE_CALL_MIN_SECONDS = 20
+
+
+class GenerationDeadlineError(Exception):
+    """期限までに次の生成段階を終えられない場合に送出する（クライアントは再試行できる）。"""
+
+
+def ensure_time_left(seconds: float, stage: str) -> None:
+    """期限までの残り時間が seconds 未満なら GenerationDeadlineError を送出する（期限なしなら何もしない）。"""
+    remaining = remaining_time()
+    if remaining is not None and remaining < seconds:
+        raise GenerationDeadlineError(f"{remaining:.1f}s left before deadline, not enough for {stage}")
+
+
+def is_fanout_enabled() -> bool:
+    """環境変数 GENERATE_FANOUT_ENABLED が true の場合にステップを並行生成する。"""
+    return os.environ.get("GENERATE_FANOUT_ENABLED", "false").strip().lower() == "true"
+
+
+SKELETON_SYSTEM_PROMPT = """AIカリキュラムのシナリオ設計エージェント。
+ユーザーが示す設問セットの仕様に沿って、全ステップで共有する新しい組織シナリオの骨子だけを作成せよ。設問は作成しないこと。
+組織の概要、関係者、現状の課題、各ステップで使う具体的な数値・事実を簡潔にまとめること。
+毎回異なる組織シナリオを使うこと。
+
+出力JSON形式（これ以外のテキスト禁止）:
+{"scenario":"シナリオ骨子"}"""
+
+STEP_SYSTEM_PROMPT = """AIカリキュラムの出題エージェント。
+ユーザーが示す設問セットの仕様とシナリオ骨子に基づき、指定された1ステップの設問だけを生成せよ。
+仕様の出力JSON形式は設問セット全体のものなので従わず、以下の形式で指定ステップのみを出力すること。
+
+出力JSON形式（これ以外のテキスト禁止）:
+{"questions":[{"step":ステップ番号,"type":"指定された形式","prompt":"設問文","options":null,"context":"このステップの文脈説明"}]}
+
+contextは必ず含め、骨子の組織・数値と矛盾させないこと。"""
+
+
+def build_skeleton_prompt(set_spec: str, session_id: str) -> str:
+    """シナリオ骨子だけを生成させるユーザープロンプト。"""
+    return (
+        f"設問セットの仕様:\n{set_spec}\n\n"
+        f"セッションID: {session_id}\n"
+        "この仕様の全ステップで使う新しいシナリオの骨子を作成してください。"
+    )
+
+
+def build_step_prompt(set_spec: str, scenario: str, step: int, q_type: str) -> str:
+    """骨子に基づいて1ステップ分の設問を生成させるユーザープロンプト。"""
+    return (
+        f"設問セットの仕様:\n{set_spec}\n\n"
+        f"シナリオ骨子:\n{scenario}\n\n"
+        f"この骨子に基づき、ステップ{step}の設問のみを生成してください。"
+        f'stepは{step}、typeは"{q_type}"とすること。'
+    )
+
+
+def _generate_skeleton(level: int, set_spec: str, session_id: str) -> str:
+    result = invoke_claude(
+        SKELETON_SYSTEM_PROMPT, build_skeleton_prompt(set_spec, session_id),
+        **get_call_config(level, "generator", output="skeleton"),
+    )
+    scenario = load_response(result).get("scenario")
+    if not isinstance(scenario, str) or not scenario.strip():
+        raise ValueError("Scenario skeleton must be a non-empty string")
+    return scenario
+
+
+def _generate_steps(level, set_spec, scenario, steps, step_type_map, validate_question) -> dict[int, dict]:
+    """指定ステップを並行に生成し、検証を通ったものを {step: 設問} で返す。"""
+    config = get_call_config(level, "generator", output="repair")
+
+    def generate(step):
+        result = invoke_claude(STEP_SYSTEM_PROMPT, build_step_prompt(set_spec, scenario, step, step_type_map[step]), **config)
+        try:
+            return collect_valid_steps(load_response(result), [step], validate_question)
+        except ValueError as e:
+            logger.info("Step %d response could not be parsed: %s", step, str(e))
+            return {}
+
+    valid = {}
+    for generated in run_parallel(*[lambda step=step: generate(step) for step in steps]):
+        valid.update(generated)
+    return valid
+
+
+def generate_fanout(level: int, set_spec: str, session_id: str, step_type_map: dict, validate_question) -> list[dict]:
+    """シナリオ骨子を生成してから各ステップを並行に生成し、ステップ順の検証済み設問リストを返す。
+
+    Args:
+        level: レベル番号
+        set_spec: そのレベルの出題用システムプロンプト（設問セットの仕様としてユーザープロンプトに含める）
+        session_id: セッションID
+        step_type_map: {step: 設問形式}
+        validate_question: (index, 設問dict) を受け取り検証済みの設問を返す関数（不正なら ValueError）
+
+    Raises:
+        ValueError: 骨子が得られない、または再生成後も揃わないステップがある場合
+        GenerationDeadlineError: ステップを再生成する時間が残っていない場合
+    """
+    scenario = _generate_skeleton(level, set_spec, session_id)
+    steps = sorted(step_type_map)
+
+    valid = _generate_steps(level, set_spec, scenario, steps, step_type_map, validate_question)
+    invalid = [s for s in steps if s not in valid]
+    if invalid:
+        logger.warning("Lv%d fan-out steps %s failed validation, retrying", level, invalid)
+        ensure_time_left(STEP_RETRY_MIN_SECONDS, "fan-out step retry")
+        valid.update(_generate_steps(level, set_spec, scenario, invalid, step_type_map, validate_question))
+        invalid = [s for s in steps if s not in valid]
+        if invalid:
+            raise ValueError(f"Steps {invalid} are still invalid after fan-out retry")
+
+    return [valid[s] for s in steps]
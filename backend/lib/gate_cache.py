@@ -0,0 +1,63 @@
+"""進捗アイテムのプロセス内TTLキャッシュ（GET /levels/status 用）
+
+同じセッションのゲート状態はページ表示のたびに繰り返し取得されるため、短時間だけ
+コンテナ内に保持してDynamoDBの読み込みを省く。完了レコードは別の関数（/lvN/complete）が
+書き込むためこのキャッシュは破棄できず、更新が反映されるまでの遅れはTTLが上限になる。
+完了直後のクライアントは fresh=1 を付けてキャッシュを迂回する（gate_handler）。
+
+GATE_CACHE_TTL_SECONDS が 0（デフォルト）の場合はキャッシュしない。
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 1024
+
+_entries: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_ttl_seconds() -> float:
+    """キャッシュの有効期間（GATE_CACHE_TTL_SECONDS）。"""
+    raw = os.environ.get("GATE_CACHE_TTL_SECONDS", "0")
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.warning("Invalid value for GATE_CACHE_TTL_SECONDS: %r, disabling gate cache", raw)
+        return 0.0
+
+
+def get(session_id: str) -> dict | None:
+    """キャッシュ済みの進捗アイテムを返す（進捗なしは {}）。ミス・期限切れの場合はNone。"""
+    with _lock:
+        entry = _entries.get(session_id)
+        if entry is None:
+            return None
+        expires_at, item = entry
+        if expires_at <= time.monotonic():
+            del _entries[session_id]
+            return None
+        return item
+
+
+def put(session_id: str, item: dict | None) -> None:
+    """進捗アイテムを保存する。"""
+    ttl = get_ttl_seconds()
+    if ttl <= 0:
+        return
+    with _lock:
+        _entries[session_id] = (time.monotonic() + ttl, item or {})
+        _entries.move_to_end(session_id)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear() -> None:
+    """すべてのキャッシュを破棄する（テスト用）。"""
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,247 @@
+"""採点結果キャッシュ - 同一の (レベル, ステップ, 設問, 回答) に対する採点・レビューを再利用する。
+
+キーは設問JSONと回答を正規化したsha256ハッシュ。ブラウザのリトライや二重送信で
+同じ回答が届いた場合、Bedrockを呼ばずに保存済みの score / feedback / explanation を返す。
+passed は保存せず、ヒット時に resolve_passed で現在の閾値から再計算する。
+
+- プロセス内LRU: GRADE_CACHE_ENABLED=true のとき使用
+- DynamoDB（TTL付き）: さらに GRADE_CACHE_DYNAMODB=true のとき使用（ウォームコンテナ間で共有）
+
+解説（explanation）は回答に依存しないため、EXPLANATION_CACHE_ENABLED=true のときは
+設問単位のキーで別に保持し、初回の採点時に生成したものをすべての回答で使い回す。
+ミス時は採点・フィードバック・解説の3回の呼び出しになるため、同じ設問に多数の回答が
+届く場合（共有の設問セットなど）にのみ有効にする。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.lib.answer_key import strip_answer_key
+from backend.lib.dynamodb import get_resource
+from backend.lib.threshold_resolver import resolve_passed
+
+logger = logging.getLogger(__name__)
+
+GRADE_CACHE_TABLE = os.environ.get("GRADE_CACHE_TABLE", "ai-levels-grade-cache")
+
+# キーの形式や採点プロンプトを変えた場合は上げて古いエントリを無効にする
+CACHE_KEY_VERSION = 1
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+_lru: OrderedDict = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def is_cache_enabled() -> bool:
+    """環境変数 GRADE_CACHE_ENABLED が true の場合に採点結果をキャッシュする。"""
+    return os.environ.get("GRADE_CACHE_ENABLED", "false").strip().lower() == "true"
+
+
+def is_dynamodb_tier_enabled() -> bool:
+    """環境変数 GRADE_CACHE_DYNAMODB が true の場合にDynamoDBの共有キャッシュも使う。"""
+    return os.environ.get("GRADE_CACHE_DYNAMODB", "false").strip().lower() == "true"
+
+
+def is_explanation_cache_enabled() -> bool:
+    """環境変数 EXPLANATION_CACHE_ENABLED が true の場合に解説を設問単位で生成・再利用する。"""
+    return os.environ.get("EXPLANATION_CACHE_ENABLED", "false").strip().lower() == "true"
+
+
+def _get_int_env(key: str, default: int) -> int:
+    raw = os.environ.get(key)
+    if raw is None:
+        return default
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using default %d", key, raw, default)
+        return default
+
+
+def get_max_entries() -> int:
+    """プロセス内LRUの最大件数（GRADE_CACHE_MAX_ENTRIES）。"""
+    return _get_int_env("GRADE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+
+
+def get_ttl_seconds() -> int:
+    """DynamoDBエントリの有効期間（GRADE_CACHE_TTL_SECONDS）。"""
+    return _get_int_env("GRADE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+
+
+def _get_dynamodb_resource():
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
+
+
+def make_cache_key(level: int, step: int, question: dict, answer: str) -> str:
+    """レベル・ステップ・設問・回答から正規化したキャッシュキーを作る。"""
+    canonical = json.dumps(
+        {"v": CACHE_KEY_VERSION, "level": level, "step": step, "question": question, "answer": answer},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_explanation_key(level: int, question: dict) -> str:
+    """レベルと設問から解説キャッシュのキーを作る（answer_key は除く）。"""
+    canonical = json.dumps(
+        {"v": CACHE_KEY_VERSION, "kind": "explanation", "level": level, "question": strip_answer_key(question)},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def clear_cache() -> None:
+    """プロセス内LRUを空にする（テスト用）。"""
+    with _lru_lock:
+        _lru.clear()
+
+
+def _lru_get(key: str) -> dict | None:
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is not None:
+            _lru.move_to_end(key)
+        return entry
+
+
+def _lru_put(key: str, entry: dict) -> None:
+    max_entries = get_max_entries()
+    with _lru_lock:
+        _lru[key] = entry
+        _lru.move_to_end(key)
+        while len(_lru) > max_entries:
+            _lru.popitem(last=False)
+
+
+def _dynamodb_get(key: str) -> dict | None:
+    table = _get_dynamodb_resource().Table(GRADE_CACHE_TABLE)
+    item = table.get_item(Key={"PK": f"GRADE#{key}"}).get("Item")
+    # TTLによる削除は遅延するため、期限切れは読み取り時にも除外する
+    if not item or int(item.get("expires_at", 0)) <= int(time.time()):
+        return None
+    return {"score": int(item["score"]), "feedback": item["feedback"], "explanation": item["explanation"]}
+
+
+def _dynamodb_put(key: str, entry: dict) -> None:
+    table = _get_dynamodb_resource().Table(GRADE_CACHE_TABLE)
+    table.put_item(Item={
+        "PK": f"GRADE#{key}",
+        **entry,
+        "expires_at": int(time.time()) + get_ttl_seconds(),
+    })
+
+
+def _dynamodb_get_explanation(key: str) -> str | None:
+    table = _get_dynamodb_resource().Table(GRADE_CACHE_TABLE)
+    item = table.get_item(Key={"PK": f"EXPLANATION#{key}"}).get("Item")
+    if not item or int(item.get("expires_at", 0)) <= int(time.time()):
+        return None
+    return item["explanation"]
+
+
+def _dynamodb_put_explanation(key: str, explanation: str) -> None:
+    table = _get_dynamodb_resource().Table(GRADE_CACHE_TABLE)
+    table.put_item(Item={
+        "PK": f"EXPLANATION#{key}",
+        "explanation": explanation,
+        "expires_at": int(time.time()) + get_ttl_seconds(),
+    })
+
+
+def lookup(level: int, key: str) -> tuple[dict, dict] | None:
+    """キャッシュを引き、ヒットすれば (grade_result, review) を返す。無効・ミス・取得失敗時はNone。"""
+    if not is_cache_enabled():
+        return None
+
+    entry = _lru_get(key)
+    if entry is None and is_dynamodb_tier_enabled():
+        try:
+            entry = _dynamodb_get(key)
+        except Exception as e:
+            logger.warning("Grade cache lookup failed for lv%d: %s", level, str(e))
+            entry = None
+        if entry is not None:
+            _lru_put(key, entry)
+    if entry is None:
+        return None
+
+    logger.info("Grade cache hit for lv%d", level)
+    grade_result = {"passed": resolve_passed(level=level, score=entry["score"]), "score": entry["score"]}
+    review = {"feedback": entry["feedback"], "explanation": entry["explanation"]}
+    return grade_result, review
+
+
+def store(level: int, key: str, grade_result: dict, review: dict) -> None:
+    """採点・レビュー結果を保存する。保存に失敗してもリクエスト処理は継続する。"""
+    if not is_cache_enabled():
+        return
+
+    entry = {
+        "score": grade_result["score"],
+        "feedback": review["feedback"],
+        "explanation": review["explanation"],
+    }
+    _lru_put(key, entry)
+    if is_dynamodb_tier_enabled():
+        try:
+            _dynamodb_put(key, entry)
+        except Exception as e:
+            logger.warning("Failed to store grade cache entry for lv%d: %s", level, str(e))
+
+
+def cached_grade(level: int, step: int, question: dict, answer: str, compute) -> tuple[dict, dict]:
+    """キャッシュにあればそれを返し、なければ compute() の結果 (grade_result, review) を保存して返す。"""
+    key = make_cache_key(level, step, question, answer)
+    cached = lookup(level, key)
+    if cached is not None:
+        return cached
+
+    grade_result, review = compute()
+    store(level, key, grade_result, review)
+    return grade_result, review
+
+
+def cached_explanation(level: int, question: dict, compute) -> str:
+    """設問の解説をキャッシュから返し、なければ compute() で生成して保存する。
+
+    キャッシュが無効（EXPLANATION_CACHE_ENABLED!=true）の場合は毎回 compute() を呼ぶ。
+    同じ設問への初回採点が同時に届いた場合はそれぞれ生成し、後から保存した方が残る。
+    """
+    if not is_explanation_cache_enabled():
+        return compute()
+
+    key = make_explanation_key(level, question)
+    lru_key = f"EXPLANATION#{key}"
+    entry = _lru_get(lru_key)
+    if entry is None and is_dynamodb_tier_enabled():
+        try:
+            explanation = _dynamodb_get_explanation(key)
+        except Exception as e:
+            logger.warning("Explanation cache lookup failed for lv%d: %s", level, str(e))
+            explanation = None
+        if explanation is not None:
+            entry = {"explanation": explanation}
+            _lru_put(lru_key, entry)
+    if entry is not None:
+        logger.info("Explanation cache hit for lv%d", level)
+        return entry["explanation"]
+
+    explanation = compute()
+    _lru_put(lru_key, {"explanation": explanation})
+    if is_dynamodb_tier_enabled():
+        try:
+            _dynamodb_put_explanation(key, explanation)
+        except Exception as e:
+            logger.warning("Failed to store explanation cache entry for lv%d: %s", level, str(e))
+    return explanation
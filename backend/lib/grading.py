@@ -0,0 +1,157 @@
+"""採点パイプライン - 採点エージェントとレビューエージェントの実行方式を制御する。"""
+
+import os
+import json
+import logging
+
+from backend.lib.answer_key import strip_answer_key
+from backend.lib.parallel import run_parallel
+
+logger = logging.getLogger(__name__)
+
+GRADE_MODE_SERIAL = "serial"
+GRADE_MODE_PARALLEL = "parallel"
+GRADE_MODE_COMBINED = "combined"
+VALID_GRADE_MODES = (GRADE_MODE_SERIAL, GRADE_MODE_PARALLEL, GRADE_MODE_COMBINED)
+DEFAULT_GRADE_MODE = GRADE_MODE_SERIAL
+
+
+def get_grade_mode() -> str:
+    """採点モードを環境変数 GRADE_MODE から取得する。
+
+    Returns:
+        "serial"（採点→レビューを順に実行）、
+        "parallel"（採点とスコア非依存のレビューを同時に実行）または
+        "combined"（採点とレビューを1回のBedrock呼び出しで実行）
+
+    未設定または不正な値の場合はデフォルト（serial）を返す。
+    """
+    raw = os.environ.get("GRADE_MODE")
+    if raw is None:
+        return DEFAULT_GRADE_MODE
+
+    mode = raw.strip().lower()
+    if mode not in VALID_GRADE_MODES:
+        logger.warning(
+            "Invalid GRADE_MODE value: %r, using default %s",
+            raw, DEFAULT_GRADE_MODE,
+        )
+        return DEFAULT_GRADE_MODE
+
+    return mode
+
+
+def build_grade_prompt(question: dict, answer: str) -> str:
+    """採点エージェントへのユーザープロンプトを組み立てる。"""
+    return (
+        f"設問: {json.dumps(strip_answer_key(question), ensure_ascii=False)}\n"
+        f"回答: {answer}\n\n"
+        "この回答を採点してください。"
+    )
+
+
+def build_review_prompt(
+    question: dict,
+    answer: str,
+    grade_result: dict | None,
+    instruction: str = "この回答に対するフィードバックと解説を生成してください。",
+) -> str:
+    """レビューエージェントへのユーザープロンプトを組み立てる。
+
+    grade_result が None の場合（採点と並行してレビューする場合）は、
+    合否・スコアに言及しないよう指示する。
+    """
+    if grade_result is None:
+        grade_line = "採点結果: 未確定（採点と並行してレビューしています。合否やスコアには言及しないでください）"
+    else:
+        grade_line = f"採点結果: {json.dumps(grade_result, ensure_ascii=False)}"
+
+    return (
+        f"設問: {json.dumps(strip_answer_key(question), ensure_ascii=False)}\n"
+        f"回答: {answer}\n"
+        f"{grade_line}\n\n"
+        f"{instruction}"
+    )
+
+
+def build_feedback_prompt(question: dict, answer: str, grade_result: dict | None) -> str:
+    """フィードバックのみを生成させるレビュープロンプトを組み立てる（解説は設問単位で別に生成する）。"""
+    return build_review_prompt(question, answer, grade_result, instruction="この回答に対するフィードバックを生成してください。")
+
+
+def build_explanation_prompt(question: dict) -> str:
+    """設問の解説を生成させるプロンプトを組み立てる（回答に依存しないため設問ごとに1回だけ呼ぶ）。"""
+    return (
+        f"設問: {json.dumps(strip_answer_key(question), ensure_ascii=False)}\n\n"
+        "この設問の解説を生成してください。"
+    )
+
+
+def validate_grade(data: dict) -> dict:
+    """採点結果のフィールドをバリデーションし {"passed", "score"} を返す。"""
+    passed = data.get("passed")
+    score = data.get("score")
+
+    if not isinstance(passed, bool):
+        raise ValueError("passed must be a boolean")
+    if not isinstance(score, int) or score < 0 or score > 100:
+        raise ValueError("score must be an integer between 0 and 100")
+
+    return {"passed": passed, "score": score}
+
+
+def validate_review(data: dict) -> dict:
+    """レビュー結果のフィールドをバリデーションし {"feedback", "explanation"} を返す。"""
+    feedback = data.get("feedback")
+    explanation = data.get("explanation")
+
+    if not isinstance(feedback, str) or not feedback.strip():
+        raise ValueError("feedback must be a non-empty string")
+    if not isinstance(explanation, str) or not explanation.strip():
+        raise ValueError("explanation must be a non-empty string")
+
+    return {"feedback": feedback, "explanation": explanation}
+
+
+def validate_feedback(data: dict) -> str:
+    """フィードバックのみのレビュー結果をバリデーションし feedback を返す。"""
+    feedback = data.get("feedback")
+    if not isinstance(feedback, str) or not feedback.strip():
+        raise ValueError("feedback must be a non-empty string")
+    return feedback
+
+
+def validate_explanation(data: dict) -> str:
+    """解説の生成結果をバリデーションし explanation を返す。"""
+    explanation = data.get("explanation")
+    if not isinstance(explanation, str) or not explanation.strip():
+        raise ValueError("explanation must be a non-empty string")
+    return explanation
+
+
+def run_grade_pipeline(grade_fn, review_fn, combined_fn=None) -> tuple[dict, dict]:
+    """採点とレビューを実行し、(grade_result, review) を返す。
+
+    Args:
+        grade_fn: 採点を実行し {"passed": bool, "score": int} を返す関数
+        review_fn: 採点結果（parallelモードではNone）を受け取り
+            {"feedback": str, "explanation": str} を返す関数
+        combined_fn: 採点とレビューを1回の呼び出しで実行し
+            (grade_result, review) を返す関数（combinedモードで使用）
+
+    parallelモードではレビューは採点結果を待たずに開始されるため、
+    合否・スコアに言及しないフィードバックを生成させ、両方の完了後に
+    確定したスコアと組み合わせて返す。
+    """
+    mode = get_grade_mode()
+
+    if mode == GRADE_MODE_COMBINED and combined_fn is not None:
+        return combined_fn()
+
+    if mode == GRADE_MODE_PARALLEL:
+        grade_result, review = run_parallel(grade_fn, lambda: review_fn(None))
+        return grade_result, review
+
+    grade_result = grade_fn()
+    review = review_fn(grade_result)
+    return grade_result, review
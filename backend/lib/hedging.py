@@ -0,0 +1,148 @@
+"""ヘッジリクエスト - 遅い呼び出しに対して同一リクエストをもう1本投げ、先に返った方を使う。
+
+呼び出し箇所（call_site、例: "lv3.grader"）ごとに直近のレイテンシを記録し、
+最初の呼び出しがそのパーセンタイル（BEDROCK_HEDGE_PERCENTILE）を超えても戻らなければ
+2本目を投げる。負けた方の呼び出しは中断できないため結果を破棄する。
+
+- 対象は BEDROCK_HEDGE_CALL_SITES に列挙した呼び出し箇所のみ（空なら無効）
+- 直近 HEDGE_WINDOW 回に占めるヘッジの割合が BEDROCK_HEDGE_MAX_RATE を超える場合はヘッジしない
+  （スロットリング中に負荷を増幅させないための上限）
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MAX_RATE = 0.1
+LATENCY_WINDOW = 200
+HEDGE_WINDOW = 100
+MIN_SAMPLES = 20
+
+# grade/review の並列実行（backend.lib.parallel）の中から投げるため専用のプールを使う
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="bedrock-hedge")
+
+_lock = threading.Lock()
+_latencies: dict[str, deque] = {}
+_hedge_history: dict[str, deque] = {}
+
+
+def get_hedge_call_sites() -> set[str]:
+    """ヘッジを有効にする呼び出し箇所（BEDROCK_HEDGE_CALL_SITES、カンマ区切り）。"""
+    raw = os.environ.get("BEDROCK_HEDGE_CALL_SITES", "")
+    return {site.strip() for site in raw.split(",") if site.strip()}
+
+
+def _get_float_env(key: str, default: float) -> float:
+    raw = os.environ.get(key)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using default %s", key, raw, default)
+        return default
+
+
+def get_percentile() -> float:
+    """ヘッジを投げるまでの待ち時間に使うパーセンタイル（BEDROCK_HEDGE_PERCENTILE）。"""
+    return min(100.0, max(0.0, _get_float_env("BEDROCK_HEDGE_PERCENTILE", DEFAULT_PERCENTILE)))
+
+
+def get_max_rate() -> float:
+    """ヘッジ率の上限（BEDROCK_HEDGE_MAX_RATE）。"""
+    return min(1.0, max(0.0, _get_float_env("BEDROCK_HEDGE_MAX_RATE", DEFAULT_MAX_RATE)))
+
+
+def reset() -> None:
+    """記録したレイテンシとヘッジ履歴を破棄する（テスト用）。"""
+    with _lock:
+        _latencies.clear()
+        _hedge_history.clear()
+
+
+def record_latency(call_site: str, seconds: float) -> None:
+    with _lock:
+        _latencies.setdefault(call_site, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def hedge_delay(call_site: str) -> float | None:
+    """ヘッジまでの待ち時間（秒）を返す。サンプル不足の場合はNone。"""
+    with _lock:
+        samples = sorted(_latencies.get(call_site, ()))
+    if len(samples) < MIN_SAMPLES:
+        return None
+    index = max(0, math.ceil(get_percentile() / 100 * len(samples)) - 1)
+    return samples[index]
+
+
+def _record_decision(call_site: str, hedge: bool) -> bool:
+    """ヘッジ率の上限を確認して今回の判断を記録し、ヘッジしてよければTrueを返す。"""
+    with _lock:
+        history = _hedge_history.setdefault(call_site, deque(maxlen=HEDGE_WINDOW))
+        if hedge and (sum(history) + 1) / (len(history) + 1) > get_max_rate():
+            hedge = False
+        history.append(hedge)
+        return hedge
+
+
+def _timed(call):
+    started = time.monotonic()
+    result = call()
+    return result, time.monotonic() - started
+
+
+def call_hedged(call_site: str | None, call, allow_hedge: bool = True):
+    """call() を実行し、必要に応じてヘッジする。レイテンシは call_site ごとに記録する。
+
+    Args:
+        call_site: 呼び出し箇所。Noneの場合は記録もヘッジもしない
+        call: 引数なしで呼び出す関数（スレッドから同時に2回呼ばれ得る）
+        allow_hedge: Falseの場合はヘッジしない（呼び出し側がスロットリングを検知している場合など）
+    """
+    if call_site is None:
+        return call()
+
+    delay = hedge_delay(call_site) if call_site in get_hedge_call_sites() else None
+    if delay is None:
+        result, elapsed = _timed(call)
+        record_latency(call_site, elapsed)
+        return result
+
+    # ヘッジが勝った場合もヘッジまでの待ち時間を含めた呼び出し全体の時間を記録する
+    # （2本目単体の時間を記録するとパーセンタイルが実際より短くなっていく）
+    started = time.monotonic()
+    primary = _executor.submit(_timed, call)
+    try:
+        result, elapsed = primary.result(timeout=delay)
+        _record_decision(call_site, False)
+        record_latency(call_site, elapsed)
+        return result
+    except FuturesTimeoutError:
+        pass
+
+    if not _record_decision(call_site, allow_hedge):
+        result, elapsed = primary.result()
+        record_latency(call_site, elapsed)
+        return result
+
+    logger.info("Hedging Bedrock call for %s after %.2fs", call_site, delay)
+    pending = {primary, _executor.submit(_timed, call)}
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result, _ = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            record_latency(call_site, time.monotonic() - started)
+            return result
+    raise last_error
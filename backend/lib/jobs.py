@@ -0,0 +1,245 @@
+"""非同期採点ジョブ - /lvN/grade をキューに積み、ワーカーLambdaで採点して結果を保存する。
+
+API Gateway（REST）の統合タイムアウトは29秒のため、リトライを含むLv4の採点などは
+Lambdaが処理を続けていてもクライアントにはタイムアウトが返り、Bedrockの処理が無駄になる。
+GRADE_ASYNC_ENABLED=true のとき、/lvN/grade は検証後にジョブを登録して 202 と job_id を返し、
+クライアントは GET /jobs/{id} で状態と結果を取得する。
+
+- キュー: GRADE_JOBS_QUEUE_URL（SQS）
+- ジョブ: JOBS_TABLE（DynamoDB、TTL付き）
+
+GRADE_JOBS_QUEUE_URL が空の場合（ローカル実行）は、プロセス内のキューとジョブストアで代用し、
+ジョブはバックグラウンドスレッドで処理する。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import boto3
+from botocore.exceptions import ClientError
+
+from backend.lib.dynamodb import get_resource
+from backend.lib.parallel import submit
+
+logger = logging.getLogger(__name__)
+
+JOBS_TABLE = os.environ.get("JOBS_TABLE", "ai-levels-jobs")
+GRADE_JOBS_QUEUE_URL = os.environ.get("GRADE_JOBS_QUEUE_URL", "")
+
+# ワーカーが呼び出すイベントに付けるキー（付いていればキューに積まず同期で採点する）
+JOB_EVENT_KEY = "grade_job_id"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+JOB_TTL_SECONDS = 24 * 60 * 60
+# ワーカーが途中で終了した場合に、SQSの再配信で同じジョブを再実行できるまでの時間
+STALE_RUNNING_SECONDS = 180
+
+
+def is_async_enabled() -> bool:
+    """環境変数 GRADE_ASYNC_ENABLED が true の場合に採点をジョブとして非同期実行する。"""
+    return os.environ.get("GRADE_ASYNC_ENABLED", "false").strip().lower() == "true"
+
+
+def should_enqueue(event: dict) -> bool:
+    """この採点リクエストをキューに積むべきか（ワーカーからの呼び出しは同期で処理する）。"""
+    return is_async_enabled() and not (event or {}).get(JOB_EVENT_KEY)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _get_dynamodb_resource():
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
+
+
+def _get_sqs_client():
+    """Return an SQS client (extracted for testability)."""
+    return boto3.client("sqs", region_name="ap-northeast-1")
+
+
+class DynamoDBJobStore:
+    """ジョブをDynamoDBに保存する。"""
+
+    def put(self, job: dict) -> None:
+        _get_dynamodb_resource().Table(JOBS_TABLE).put_item(Item={"PK": f"JOB#{job['job_id']}", **job})
+
+    def get(self, job_id: str) -> dict | None:
+        item = _get_dynamodb_resource().Table(JOBS_TABLE).get_item(
+            Key={"PK": f"JOB#{job_id}"}, ConsistentRead=True,
+        ).get("Item")
+        if not item:
+            return None
+        item.pop("PK", None)
+        return item
+
+    def claim(self, job_id: str, started_at: float) -> bool:
+        """queued（または停止したrunning）のジョブを running にする。取得できなければFalse。"""
+        try:
+            _get_dynamodb_resource().Table(JOBS_TABLE).update_item(
+                Key={"PK": f"JOB#{job_id}"},
+                UpdateExpression="SET #status = :running, started_at = :started_at, updated_at = :updated_at",
+                ConditionExpression="#status = :queued OR (#status = :running AND started_at < :stale)",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":running": STATUS_RUNNING,
+                    ":queued": STATUS_QUEUED,
+                    ":started_at": int(started_at),
+                    ":stale": int(started_at) - STALE_RUNNING_SECONDS,
+                    ":updated_at": _now(),
+                },
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def finish(self, job_id: str, status: str, fields: dict) -> None:
+        names = {"#status": "status"}
+        values = {":status": status, ":updated_at": _now()}
+        assignments = ["#status = :status", "updated_at = :updated_at"]
+        for i, (key, value) in enumerate(fields.items()):
+            names[f"#f{i}"] = key
+            values[f":f{i}"] = value
+            assignments.append(f"#f{i} = :f{i}")
+        _get_dynamodb_resource().Table(JOBS_TABLE).update_item(
+            Key={"PK": f"JOB#{job_id}"},
+            UpdateExpression="SET " + ", ".join(assignments),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+
+class InMemoryJobStore:
+    """ローカル実行用のプロセス内ジョブストア。"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def put(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, job_id: str, started_at: float) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != STATUS_QUEUED:
+                return False
+            job.update(status=STATUS_RUNNING, started_at=int(started_at), updated_at=_now())
+            return True
+
+    def finish(self, job_id: str, status: str, fields: dict) -> None:
+        with self._lock:
+            self._jobs[job_id].update(status=status, updated_at=_now(), **fields)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jobs.clear()
+
+
+class SqsQueue:
+    """SQSにジョブIDを送る。ワーカーLambdaはSQSイベントで起動する。"""
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+
+    def send(self, message: dict) -> None:
+        _get_sqs_client().send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+
+class InMemoryQueue:
+    """ローカル実行用のキュー。送信されたメッセージをバックグラウンドスレッドで処理する。"""
+
+    def __init__(self):
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def send(self, message: dict) -> None:
+        from backend.handlers.grade_worker_handler import process_message
+
+        future = submit(lambda: process_message(message))
+        with self._lock:
+            self._pending.append(future)
+
+    def drain(self, timeout: float | None = None) -> None:
+        """送信済みメッセージの処理完了を待つ（テスト・ローカル実行用）。"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result(timeout=timeout)
+
+
+local_store = InMemoryJobStore()
+local_queue = InMemoryQueue()
+
+
+def get_store():
+    """キューURLが未設定（ローカル実行）ならプロセス内ストアを返す。"""
+    return DynamoDBJobStore() if GRADE_JOBS_QUEUE_URL else local_store
+
+
+def get_queue():
+    """キューURLが未設定（ローカル実行）ならプロセス内キューを返す。"""
+    return SqsQueue(GRADE_JOBS_QUEUE_URL) if GRADE_JOBS_QUEUE_URL else local_queue
+
+
+def create_job(level: int, body: dict) -> str:
+    """採点ジョブを登録してキューに積み、job_id を返す。
+
+    Raises:
+        Exception: ジョブの保存またはキューへの送信に失敗した場合
+    """
+    job_id = uuid.uuid4().hex
+    now = _now()
+    get_store().put({
+        "job_id": job_id,
+        "status": STATUS_QUEUED,
+        "level": level,
+        # 数値をDecimalに変換させないためJSON文字列で保持する
+        "request_json": json.dumps(body, ensure_ascii=False),
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": int(time.time()) + JOB_TTL_SECONDS,
+    })
+    get_queue().send({"job_id": job_id})
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    """ジョブを返す（存在しない・期限切れの場合はNone）。"""
+    job = get_store().get(job_id)
+    if job is None or int(job.get("expires_at", 0)) <= int(time.time()):
+        return None
+    return job
+
+
+def claim_job(job_id: str) -> bool:
+    """ワーカーがジョブの実行権を取得する（重複配信では False）。"""
+    return get_store().claim(job_id, time.time())
+
+
+def complete_job(job_id: str, result: dict) -> None:
+    """採点結果を保存してジョブを完了にする。"""
+    get_store().finish(job_id, STATUS_SUCCEEDED, {"result_json": json.dumps(result, ensure_ascii=False)})
+
+
+def fail_job(job_id: str, error: str, status_code: int = 500) -> None:
+    """ジョブを失敗にする。"""
+    get_store().finish(job_id, STATUS_FAILED, {"error": error, "status_code": status_code})
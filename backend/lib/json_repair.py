@@ -0,0 +1,127 @@
+"""寛容なJSON抽出 - LLM出力から最も外側のJSONオブジェクトを取り出し、よくある崩れを補正する。
+
+厳密な json.loads が失敗した応答の復旧に使う。対応する崩れ:
+- JSONの前後の文章・コードフェンス
+- 文字列中の生の改行・タブなどの制御文字
+- 閉じ括弧直前の余分なカンマ
+- Python表記の True / False / None
+"""
+
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def find_outermost_object(text: str) -> str:
+    """最初の "{" から対応する "}" までを返す（文字列中の括弧は数えない）。
+
+    Raises:
+        ValueError: オブジェクトが見つからない、または閉じていない（出力が途中で切れた）場合
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found in response")
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    raise ValueError("JSON object in response is not closed")
+
+
+def _repair(candidate: str) -> str:
+    """文字列の内外を区別しながら、制御文字のエスケープとPython表記の置換を行う。"""
+    out = []
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(candidate):
+        ch = candidate[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch in _CONTROL_ESCAPES:
+                ch = _CONTROL_ESCAPES[ch]
+            elif ord(ch) < 0x20:
+                ch = f"\\u{ord(ch):04x}"
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch.isalpha():
+            m = re.match(r"[A-Za-z]+", candidate[i:])
+            word = m.group(0)
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(ch)
+        i += 1
+
+    return _remove_trailing_commas("".join(out))
+
+
+def _remove_trailing_commas(text: str) -> str:
+    """文字列の外にある閉じ括弧直前のカンマを取り除く。"""
+    out = []
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "," and _TRAILING_COMMA_RE.match(text, i):
+            continue
+        out.append(ch)
+    return "".join(out)
+
+
+def extract_json_object(text: str) -> dict:
+    """テキストから最も外側のJSONオブジェクトを取り出してパースする（必要なら補正する）。
+
+    Raises:
+        ValueError: オブジェクトが見つからない・閉じていない・補正してもパースできない場合
+    """
+    candidate = find_outermost_object(text)
+    try:
+        data = json.loads(candidate)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(_repair(candidate))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Could not repair JSON object: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("JSON value is not an object")
+    return data
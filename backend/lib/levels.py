@@ -0,0 +1,44 @@
+"""レベルのゲーティング状態 - 進捗アイテムから各レベルの解放・合格状態を組み立てる。
+
+GET /levels/status と /lvN/complete のレスポンスで使う。
+"""
+
+import hashlib
+import json
+
+LEVEL_FLAGS = ("lv1_passed", "lv2_passed", "lv3_passed", "lv4_passed")
+
+
+def build_levels(lv1_passed: bool, lv2_passed: bool, lv3_passed: bool, lv4_passed: bool) -> dict:
+    """Build the levels status dict based on progress."""
+    return {
+        "lv1": {"unlocked": True, "passed": lv1_passed},
+        "lv2": {"unlocked": lv1_passed, "passed": lv2_passed},
+        "lv3": {"unlocked": lv2_passed, "passed": lv3_passed},
+        "lv4": {"unlocked": lv3_passed, "passed": lv4_passed},
+    }
+
+
+def levels_from_progress(item: dict | None) -> dict:
+    """進捗アイテム（未作成ならNone / {}）からレベル状態を組み立てる。"""
+    item = item or {}
+    return build_levels(*(bool(item.get(flag, False)) for flag in LEVEL_FLAGS))
+
+
+def levels_after_completion(level: int, passed: bool) -> dict:
+    """/lvN/complete で書き込んだ進捗から、保存後のレベル状態全体を組み立てる（読み直しは不要）。
+
+    lvN は lv1〜lvN-1 の合格後にしか解放されないため、それらは合格済みとして扱い、lvN は今回の結果を使う。
+    合格フラグは取り消されない（build_progress_update）ため、これは保存後の状態の下限になる。
+    再受験などで lvN 以降に既存の合格がある場合は、クライアントが手元の状態と重ねる。
+    """
+    return build_levels(*(index < level or (index == level and passed) for index in range(1, len(LEVEL_FLAGS) + 1)))
+
+
+def progress_etag(item: dict | None) -> str:
+    """進捗アイテムの updated_at と合格フラグからETagを作る。"""
+    item = item or {}
+    state = {flag: bool(item.get(flag, False)) for flag in LEVEL_FLAGS}
+    state["updated_at"] = item.get("updated_at")
+    digest = hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
@@ -3,7 +3,18 @@
 import json
 import logging
 
-from backend.lib.bedrock_client import invoke_claude, strip_code_fence
+from backend.lib.bedrock_client import invoke_claude, parse_json_response, response_text
+from backend.lib.grade_cache import cached_explanation, is_explanation_cache_enabled
+from backend.lib.grading import (
+    build_explanation_prompt,
+    build_feedback_prompt,
+    build_review_prompt,
+    validate_explanation,
+    validate_feedback,
+    validate_review,
+)
+from backend.lib.model_config import get_call_config
+from backend.lib.parallel import submit
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +37,73 @@ LV2_REVIEW_SYSTEM_PROMPT = """あなたはAIカリキュラム「業務プロセ
   "explanation": "解説文"
 }"""
 
+LV2_FEEDBACK_SYSTEM_PROMPT = """あなたはAIカリキュラム「業務プロセス設計×AI実行指示×成果物検証×改善サイクル」のレビューエージェントです。
 
-def generate_lv2_feedback(question: dict, answer: str, grade_result: dict) -> dict:
+採点結果をもとに、学習者の回答に対するフィードバックを生成してください。
+設問の解説は別途すべての学習者に共通で表示されるため、フィードバックには含めないでください。
+
+フィードバックでは:
+- 回答の良かった点と改善点を具体的に指摘する
+- 実務での具体的な改善アクションを含める
+- Lv2の学習目標（業務プロセス設計・AI実行指示・成果物検証・改善サイクル）に沿った助言を行う
+
+出力は必ず以下のJSON形式で返してください。それ以外のテキストは含めないでください:
+{
+  "feedback": "フィードバック文"
+}"""
+
+LV2_EXPLANATION_SYSTEM_PROMPT = """あなたはAIカリキュラム「業務プロセス設計×AI実行指示×成果物検証×改善サイクル」の解説エージェントです。
+
+設問に対する解説を生成してください。解説はこの設問に回答したすべての学習者に共通で表示されるため、
+特定の回答には言及しないでください。
+
+解説では:
+- 正解の考え方や背景知識を説明する
+- コンサルティング実務での応用例を含める
+
+出力は必ず以下のJSON形式で返してください。それ以外のテキストは含めないでください:
+{
+  "explanation": "解説文"
+}"""
+
+
+def _invoke_reviewer(system_prompt: str, user_prompt: str, output: str = "reviewer") -> dict:
+    """レビュー用のBedrock呼び出しを行い、応答JSONを返す（output は構造化出力のスキーマ）。"""
+    result = invoke_claude(system_prompt, user_prompt, **get_call_config(2, "reviewer", output=output))
+
+    try:
+        return parse_json_response(result)
+    except json.JSONDecodeError:
+        logger.error("Failed to parse Lv2 Reviewer response as JSON: %s", response_text(result)[:200])
+        raise ValueError("Lv2 Reviewer response is not valid JSON")
+
+
+def generate_lv2_explanation(question: dict) -> str:
+    """
+    設問の解説を返す。回答に依存しないため、EXPLANATION_CACHE_ENABLED=true のときは
+    設問ごとに初回のみ生成し、以降はキャッシュを使う。
+
+    Raises:
+        ValueError: Bedrockレスポンスのパースに失敗した場合
+    """
+    return cached_explanation(
+        2,
+        question,
+        lambda: validate_explanation(
+            _invoke_reviewer(LV2_EXPLANATION_SYSTEM_PROMPT, build_explanation_prompt(question), "explanation")
+        ),
+    )
+
+
+def generate_lv2_feedback(question: dict, answer: str, grade_result: dict | None = None) -> dict:
     """
     Lv2採点結果をもとにフィードバック・解説を生成する。
 
     Args:
         question: 設問データ
         answer: ユーザーの回答
-        grade_result: 採点結果 {"passed": bool, "score": int}
+        grade_result: 採点結果 {"passed": bool, "score": int}。
+            採点と並行してレビューする場合はNone（スコアに言及しないフィードバックを生成する）
 
     Returns:
         {"feedback": str, "explanation": str}
@@ -42,30 +111,15 @@ def generate_lv2_feedback(question: dict, answer: str, grade_result: dict) -> di
     Raises:
         ValueError: Bedrockレスポンスのパースに失敗した場合
     """
-    user_prompt = (
-        f"設問: {json.dumps(question, ensure_ascii=False)}\n"
-        f"回答: {answer}\n"
-        f"採点結果: {json.dumps(grade_result, ensure_ascii=False)}\n\n"
-        "この回答に対するフィードバックと解説を生成してください。"
-    )
-
-    result = invoke_claude(LV2_REVIEW_SYSTEM_PROMPT, user_prompt)
-
-    text = result.get("content", [{}])[0].get("text", "")
-    text = strip_code_fence(text)
-
-    try:
-        data = json.loads(text)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse Lv2 Reviewer response as JSON: %s", text[:200])
-        raise ValueError("Lv2 Reviewer response is not valid JSON")
-
-    feedback = data.get("feedback")
-    explanation = data.get("explanation")
-
-    if not isinstance(feedback, str) or not feedback.strip():
-        raise ValueError("feedback must be a non-empty string")
-    if not isinstance(explanation, str) or not explanation.strip():
-        raise ValueError("explanation must be a non-empty string")
-
-    return {"feedback": feedback, "explanation": explanation}
+    if is_explanation_cache_enabled():
+        # 解説は設問単位でキャッシュし、回答ごとの呼び出しは短いフィードバックのみにする
+        explanation = submit(lambda: generate_lv2_explanation(question))
+        feedback = validate_feedback(
+            _invoke_reviewer(
+                LV2_FEEDBACK_SYSTEM_PROMPT, build_feedback_prompt(question, answer, grade_result), "feedback",
+            )
+        )
+        return {"feedback": feedback, "explanation": explanation.result()}
+
+    data = _invoke_reviewer(LV2_REVIEW_SYSTEM_PROMPT, build_review_prompt(question, answer, grade_result))
+    return validate_review(data)
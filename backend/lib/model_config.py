@@ -0,0 +1,106 @@
+"""呼び出し箇所ごとのモデル設定 - レベル×ロールで model_id / max_tokens / temperature を決める。
+
+ロール:
+    generator: 設問生成
+    grader:    採点（{"passed", "score"} のみを返すため小さなモデル・出力上限で十分）
+    reviewer:  フィードバック・解説の生成
+    combined:  採点とレビューを1回で行う combined モード
+
+環境変数で上書きできる（レベル指定が優先）:
+    BEDROCK_LV{N}_{ROLE}_MODEL_ID / _MAX_TOKENS / _TEMPERATURE
+    BEDROCK_{ROLE}_MODEL_ID / _MAX_TOKENS / _TEMPERATURE
+    例: BEDROCK_GRADER_MODEL_ID, BEDROCK_LV4_GENERATOR_MAX_TOKENS
+
+BEDROCK_STRUCTURED_OUTPUT=true の場合は、出力スキーマのツール定義（"tool"）も返す。
+generator ロールは BEDROCK_STRUCTURED_OUTPUT_GENERATOR=true の場合のみ対象とする。
+設問セットは出力が長く max_tokens で切れやすいが、ツール呼び出しは途中から続きを生成できない
+（テキスト応答ならプレフィルで続きを生成できる）ため。設問は各パーサの検証・復旧で扱う。
+"""
+
+import logging
+import os
+
+from backend.lib.bedrock_client import get_reviewer_fallback_model_id
+from backend.lib.bedrock_router import get_default_model_id
+from backend.lib.output_schemas import get_tool
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("generator", "grader", "reviewer", "combined")
+
+# ロールごとの既定値（model_id が None の場合は BEDROCK_ENDPOINTS / BEDROCK_MODEL_ID の設定どおり）
+ROLE_DEFAULTS = {
+    "generator": {"model_id": None, "max_tokens": 2048, "temperature": 0.7},
+    "grader": {"model_id": None, "max_tokens": 128, "temperature": 0.0},
+    "reviewer": {"model_id": None, "max_tokens": 2048, "temperature": 0.7},
+    "combined": {"model_id": None, "max_tokens": 2048, "temperature": 0.7},
+}
+
+# レベル固有の既定値（Lv2の設問はケース文が長いため出力上限を広げる）
+LEVEL_DEFAULTS = {
+    (2, "generator"): {"max_tokens": 4096},
+}
+
+
+def _env(level: int, role: str, name: str) -> str | None:
+    for key in (f"BEDROCK_LV{level}_{role.upper()}_{name}", f"BEDROCK_{role.upper()}_{name}"):
+        value = os.environ.get(key)
+        if value:
+            return value
+    return None
+
+
+def _env_number(level: int, role: str, name: str, cast, default):
+    raw = _env(level, role, name)
+    if raw is None:
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        logger.warning("Invalid value for %s of lv%d %s: %r, using default %s", name, level, role, raw, default)
+        return default
+
+
+def is_structured_output_enabled() -> bool:
+    """環境変数 BEDROCK_STRUCTURED_OUTPUT が true の場合にツール呼び出しで出力形式を強制する。"""
+    return os.environ.get("BEDROCK_STRUCTURED_OUTPUT", "false").strip().lower() == "true"
+
+
+def is_structured_generator_enabled() -> bool:
+    """環境変数 BEDROCK_STRUCTURED_OUTPUT_GENERATOR が true の場合に設問生成もツール呼び出しにする。"""
+    return os.environ.get("BEDROCK_STRUCTURED_OUTPUT_GENERATOR", "false").strip().lower() == "true"
+
+
+def get_call_config(level: int, role: str, output: str | None = None) -> dict:
+    """invoke_claude / invoke_claude_stream にそのまま渡せるキーワード引数を返す。
+
+    Args:
+        level: レベル番号
+        role: ロール（generator / grader / reviewer / combined）
+        output: 構造化出力のスキーマ（省略時はロールと同じ）。reviewer ロールで
+            フィードバックのみ・解説のみを出力させる場合に "feedback" / "explanation" を指定する
+
+    Returns:
+        {"model_id": str | None, "max_tokens": int, "temperature": float, "call_site": "lv{N}.{role}"}
+        model_id は MODEL_ID の上書きがある場合のみ設定し、なければ None（エンドポイントごとのモデルを使う）
+        reviewer ロールのみ、設定があれば "fallback_model_id" を含む
+        構造化出力が有効な場合は "tool" を含む（generator は BEDROCK_STRUCTURED_OUTPUT_GENERATOR も必要）
+    """
+    if role not in ROLE_DEFAULTS:
+        raise ValueError(f"Unknown role: {role}")
+
+    defaults = {**ROLE_DEFAULTS[role], **LEVEL_DEFAULTS.get((level, role), {})}
+    config = {
+        # 明示的な上書きがなければ None のまま渡し、BEDROCK_ENDPOINTS のエンドポイントごとのモデルを使わせる
+        "model_id": _env(level, role, "MODEL_ID") or defaults["model_id"],
+        "max_tokens": _env_number(level, role, "MAX_TOKENS", int, defaults["max_tokens"]),
+        "temperature": _env_number(level, role, "TEMPERATURE", float, defaults["temperature"]),
+        "call_site": f"lv{level}.{role}",
+    }
+    if role == "reviewer":
+        fallback_model_id = get_reviewer_fallback_model_id()
+        if fallback_model_id and fallback_model_id != (config["model_id"] or get_default_model_id()):
+            config["fallback_model_id"] = fallback_model_id
+    if is_structured_output_enabled() and (role != "generator" or is_structured_generator_enabled()):
+        config["tool"] = get_tool(level, output or role)
+    return config
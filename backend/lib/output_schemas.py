@@ -0,0 +1,114 @@
+"""構造化出力のスキーマ - ロールごとの出力をツール定義（JSON Schema）として強制する。
+
+BEDROCK_STRUCTURED_OUTPUT=true のとき、get_call_config がここで定義したツールを付け、
+invoke_claude は tool_choice でそのツールの呼び出しを強制する。応答はテキストではなく
+tool_use ブロックの input（JSON）として返るため、コードフェンスや前置きの文章による
+パース失敗が起きない。フィールドの値の検証（step の並び、型の組み合わせなど）は
+従来どおり各パーサで行う。
+"""
+
+QUESTION_TYPES = ("multiple_choice", "free_text", "scenario")
+
+# レベルごとの設問数（Lv1は固定しない）
+QUESTION_COUNTS = {2: 4, 3: 5, 4: 6}
+
+
+def _question_set_schema(level: int, fixed_count: bool = True) -> dict:
+    question = {
+        "type": "object",
+        "properties": {
+            "step": {"type": "integer", "minimum": 1},
+            "type": {"type": "string", "enum": list(QUESTION_TYPES if level == 1 else QUESTION_TYPES[1:])},
+            "prompt": {"type": "string"},
+            "options": {"type": ["array", "null"], "items": {"type": "string"}},
+            "context": {"type": ["string", "null"]},
+        },
+        "required": ["step", "type", "prompt", "options", "context"],
+    }
+    if level == 1:
+        question["properties"]["answer_index"] = {"type": ["integer", "null"], "minimum": 0}
+        question["properties"]["rationales"] = {"type": ["array", "null"], "items": {"type": "string"}}
+
+    questions = {"type": "array", "items": question, "minItems": 1}
+    if fixed_count and level in QUESTION_COUNTS:
+        questions["minItems"] = questions["maxItems"] = QUESTION_COUNTS[level]
+
+    return {"type": "object", "properties": {"questions": questions}, "required": ["questions"]}
+
+
+GRADE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "passed": {"type": "boolean"},
+        "score": {"type": "integer", "minimum": 0, "maximum": 100},
+    },
+    "required": ["passed", "score"],
+}
+
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {"type": "string"},
+        "explanation": {"type": "string"},
+    },
+    "required": ["feedback", "explanation"],
+}
+
+FEEDBACK_SCHEMA = {
+    "type": "object",
+    "properties": {"feedback": {"type": "string"}},
+    "required": ["feedback"],
+}
+
+EXPLANATION_SCHEMA = {
+    "type": "object",
+    "properties": {"explanation": {"type": "string"}},
+    "required": ["explanation"],
+}
+
+SKELETON_SCHEMA = {
+    "type": "object",
+    "properties": {"scenario": {"type": "string"}},
+    "required": ["scenario"],
+}
+
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {**GRADE_SCHEMA["properties"], **REVIEW_SCHEMA["properties"]},
+    "required": GRADE_SCHEMA["required"] + REVIEW_SCHEMA["required"],
+}
+
+# 出力の種類 → (ツール名, 説明)
+TOOLS = {
+    "generator": ("submit_questions", "生成した設問セットを提出する"),
+    # 無効なステップだけを再生成する呼び出し（設問数を固定しない）
+    "repair": ("submit_questions", "再生成したステップを提出する"),
+    # ステップを並行生成する前に作る共通のシナリオ骨子
+    "skeleton": ("submit_scenario", "全ステップで共有するシナリオ骨子を提出する"),
+    "grader": ("submit_grade", "採点結果を提出する"),
+    "reviewer": ("submit_review", "フィードバックと解説を提出する"),
+    "feedback": ("submit_feedback", "フィードバックを提出する"),
+    "explanation": ("submit_explanation", "設問の解説を提出する"),
+    "combined": ("submit_grade_and_review", "採点結果とフィードバック・解説を提出する"),
+}
+
+SCHEMAS = {
+    "skeleton": SKELETON_SCHEMA,
+    "grader": GRADE_SCHEMA,
+    "reviewer": REVIEW_SCHEMA,
+    "feedback": FEEDBACK_SCHEMA,
+    "explanation": EXPLANATION_SCHEMA,
+    "combined": COMBINED_SCHEMA,
+}
+
+
+def get_tool(level: int, output: str) -> dict:
+    """出力の種類（ロール名、または "feedback" / "explanation"）に対応するツール定義を返す。"""
+    if output not in TOOLS:
+        raise ValueError(f"Unknown output: {output}")
+    name, description = TOOLS[output]
+    if output in ("generator", "repair"):
+        schema = _question_set_schema(level, fixed_count=output == "generator")
+    else:
+        schema = SCHEMAS[output]
+    return {"name": name, "description": description, "input_schema": schema}
@@ -0,0 +1,69 @@
+"""並行実行ユーティリティ - 独立したBedrock呼び出しをスレッドプールで同時に実行する。
+
+プールのスレッド上で実行中の関数がさらに submit / run_parallel して結果を待つと、
+待っている側がワーカーを占有したまま同じプールの空きを待つためデッドロックしうる。
+そのため入れ子の処理は専用のプールで実行し、さらに入れ子になった処理はその場で実行する。
+入れ子のプールのワーカーは他のプールを待たないため、必ず処理が進む。
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+MAX_WORKERS = 8
+
+# ウォームコンテナ間でスレッドを使い回すためモジュールスコープで保持する
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ai-levels")
+_nested_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ai-levels-nested")
+
+# 現在のスレッドがどの深さのプールのワーカーか（0: プール外）
+_local = threading.local()
+
+
+def _depth() -> int:
+    return getattr(_local, "depth", 0)
+
+
+def _run_at(depth: int, func):
+    _local.depth = depth
+    try:
+        return func()
+    finally:
+        _local.depth = 0
+
+
+def _submit(func) -> Future:
+    depth = _depth()
+    if depth == 0:
+        return _executor.submit(_run_at, 1, func)
+    if depth == 1:
+        return _nested_executor.submit(_run_at, 2, func)
+
+    # 入れ子のプール上ではその場で実行する
+    future = Future()
+    try:
+        future.set_result(func())
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def run_parallel(*funcs):
+    """
+    引数なしの関数群を並行実行し、結果を引数と同じ順序のリストで返す。
+
+    Args:
+        funcs: 引数なしで呼び出せる関数
+
+    Returns:
+        各関数の戻り値のリスト
+
+    Raises:
+        Exception: いずれかの関数が送出した例外（引数順で最初のもの）
+    """
+    futures = [_submit(f) for f in funcs]
+    return [f.result() for f in futures]
+
+
+def submit(func) -> Future:
+    """引数なしの関数をバックグラウンドで実行し、Future を返す（呼び出し元は並行して別の処理を進める）。"""
+    return _submit(func)
@@ -0,0 +1,101 @@
+"""完了時の書き込みヘルパー - 結果レコードと進捗フラグを1回のトランザクションで保存する。"""
+
+import logging
+import random
+import time
+import uuid
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_MAX_ATTEMPTS = 3
+TRANSACTION_BASE_DELAY = 0.05  # seconds
+
+_serializer = TypeSerializer()
+
+
+def progress_key(session_id: str) -> dict:
+    return {"PK": f"SESSION#{session_id}", "SK": "PROGRESS"}
+
+
+def build_progress_update(session_id: str, level: int, passed: bool, updated_at: str) -> dict:
+    """lvN_passed と updated_at だけを更新する UpdateItem の引数を組み立てる。
+
+    他レベルのフラグには触れないため、読み込み不要で同時更新による上書きも起きない。
+    不合格の記録は if_not_exists で既存の値を優先し、合格済みのフラグを取り消さない。
+    （条件式で弾くとトランザクション全体が取り消されるため、条件ではなく更新式で表現する）
+    """
+    flag_value = ":passed" if passed else "if_not_exists(#flag, :passed)"
+    return {
+        "Key": progress_key(session_id),
+        "UpdateExpression": f"SET #flag = {flag_value}, session_id = :session_id, updated_at = :updated_at",
+        "ExpressionAttributeNames": {"#flag": f"lv{level}_passed"},
+        "ExpressionAttributeValues": {
+            ":passed": passed,
+            ":session_id": session_id,
+            ":updated_at": updated_at,
+        },
+    }
+
+
+def _serialize(item: dict) -> dict:
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+
+def build_transact_items(
+    results_table: str, progress_table: str, result_item: dict, level: int, passed: bool, updated_at: str,
+) -> list[dict]:
+    """結果レコードの Put と進捗フラグの Update からなる TransactItems を組み立てる。"""
+    update = build_progress_update(result_item["session_id"], level, passed, updated_at)
+    return [
+        {"Put": {"TableName": results_table, "Item": _serialize(result_item)}},
+        {"Update": {
+            "TableName": progress_table,
+            "Key": _serialize(update["Key"]),
+            "UpdateExpression": update["UpdateExpression"],
+            "ExpressionAttributeNames": update["ExpressionAttributeNames"],
+            "ExpressionAttributeValues": _serialize(update["ExpressionAttributeValues"]),
+        }},
+    ]
+
+
+def _is_retryable_transaction_error(e: ClientError) -> bool:
+    code = e.response["Error"]["Code"]
+    if code == "TransactionInProgressException":
+        return True
+    if code == "TransactionCanceledException":
+        reasons = e.response.get("CancellationReasons") or []
+        return any(r.get("Code") == "TransactionConflict" for r in reasons)
+    return False
+
+
+def save_result_and_progress(
+    dynamodb, results_table: str, progress_table: str, result_item: dict, level: int, passed: bool, updated_at: str,
+) -> None:
+    """結果レコードと lvN_passed を TransactWriteItems で同時に保存する。
+
+    同じセッションへの同時書き込みと衝突した場合（TransactionConflict / TransactionInProgress）は
+    フルジッター付きで最大 TRANSACTION_MAX_ATTEMPTS 回まで再試行する。再試行は同じ
+    ClientRequestToken を使うため、先の試行が実は成功していても二重に書き込まれない。
+
+    Raises:
+        ClientError: 再試行しても保存できなかった場合、または再試行対象外のエラー
+    """
+    transact_items = build_transact_items(results_table, progress_table, result_item, level, passed, updated_at)
+    token = str(uuid.uuid4())
+
+    for attempt in range(TRANSACTION_MAX_ATTEMPTS):
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items, ClientRequestToken=token)
+            return
+        except ClientError as e:
+            if not _is_retryable_transaction_error(e) or attempt >= TRANSACTION_MAX_ATTEMPTS - 1:
+                raise
+            delay = random.uniform(0, TRANSACTION_BASE_DELAY * (2 ** attempt))
+            logger.warning(
+                "Completion transaction for lv%d conflicted, retrying in %.3fs (attempt %d/%d)",
+                level, delay, attempt + 1, TRANSACTION_MAX_ATTEMPTS,
+            )
+            time.sleep(delay)
@@ -0,0 +1,224 @@
+"""設問プール - 事前生成した設問セットをDynamoDBに保持し、/lvN/generate から即座に払い出す。
+
+プールは QUESTION_POOL_ENABLED=true のときのみ使用する。無効時や取得失敗時は
+None を返し、呼び出し側は従来どおりBedrockで同期生成する。
+
+補充要求はレベルごとのロック項目（条件付き書き込み・期限付き）で重複を防ぐ。
+同時に多数の払い出しが閾値を下回っても、補充Lambdaの起動は1回になる。
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import boto3
+from botocore.exceptions import ClientError
+
+from backend.lib.dynamodb import get_resource
+
+logger = logging.getLogger(__name__)
+
+QUESTION_POOL_TABLE = os.environ.get("QUESTION_POOL_TABLE", "ai-levels-question-pool")
+POOL_REFILL_FUNCTION = os.environ.get("POOL_REFILL_FUNCTION", "")
+
+DEFAULT_LOW_WATER_MARK = 5
+DEFAULT_TARGET_SIZE = 20
+SET_TTL_SECONDS = 7 * 24 * 60 * 60  # 古い設問セットは7日で失効させる
+MAX_CLAIM_CANDIDATES = 5
+# 補充中ロックの有効期間（補充Lambdaのタイムアウトに合わせる）
+REFILL_LOCK_SECONDS = 300
+SET_PREFIX = "SET#"
+REFILL_LOCK_SK = "REFILL_LOCK"
+
+
+def is_pool_enabled() -> bool:
+    """環境変数 QUESTION_POOL_ENABLED が true の場合にプールを使用する。"""
+    return os.environ.get("QUESTION_POOL_ENABLED", "false").strip().lower() == "true"
+
+
+def _get_int_env(key: str, default: int) -> int:
+    raw = os.environ.get(key)
+    if raw is None:
+        return default
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using default %d", key, raw, default)
+        return default
+
+
+def get_low_water_mark() -> int:
+    """残数がこの値以下になったら補充を要求する（QUESTION_POOL_LOW_WATER）。"""
+    return _get_int_env("QUESTION_POOL_LOW_WATER", DEFAULT_LOW_WATER_MARK)
+
+
+def get_target_size() -> int:
+    """補充時の目標保持数（QUESTION_POOL_TARGET_SIZE）。"""
+    return _get_int_env("QUESTION_POOL_TARGET_SIZE", DEFAULT_TARGET_SIZE)
+
+
+def _get_dynamodb_resource():
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
+
+
+def _get_lambda_client():
+    """Return a Lambda client (extracted for testability)."""
+    return boto3.client("lambda", region_name="ap-northeast-1")
+
+
+def _pool_key(level: int) -> str:
+    return f"LEVEL#lv{level}"
+
+
+def _set_key_condition(level: int) -> dict:
+    """設問セットだけを対象にするQuery条件（ロック項目を除く）。"""
+    return {
+        "KeyConditionExpression": "PK = :pk AND begins_with(SK, :prefix)",
+        "ExpressionAttributeValues": {":pk": _pool_key(level), ":prefix": SET_PREFIX},
+    }
+
+
+def _is_live(item: dict, now: int) -> bool:
+    """TTLの削除は遅延するため、期限切れの設問セットは読み取り時にも除外する。"""
+    expires_at = item.get("expires_at")
+    return expires_at is None or int(expires_at) > now
+
+
+def put_question_set(level: int, questions: list[dict]) -> None:
+    """バリデーション済みの設問セットをプールに追加する。"""
+    table = _get_dynamodb_resource().Table(QUESTION_POOL_TABLE)
+    created_at = datetime.now(timezone.utc).isoformat()
+    table.put_item(Item={
+        "PK": _pool_key(level),
+        "SK": f"{SET_PREFIX}{created_at}#{uuid.uuid4()}",
+        "level": f"lv{level}",
+        # 数値をDecimalに変換させないためJSON文字列で保持する
+        "questions_json": json.dumps(questions, ensure_ascii=False),
+        "created_at": created_at,
+        "expires_at": int(time.time()) + SET_TTL_SECONDS,
+    })
+
+
+def count_question_sets(level: int) -> int:
+    """プール内の有効な（期限切れでない）設問セット数を返す。補充時のみ使う。"""
+    table = _get_dynamodb_resource().Table(QUESTION_POOL_TABLE)
+    now = int(time.time())
+    resp = table.query(
+        **_set_key_condition(level),
+        ProjectionExpression="expires_at",
+    )
+    return sum(1 for item in resp.get("Items", []) if _is_live(item, now))
+
+
+def pop_question_set(level: int) -> tuple[list[dict] | None, int]:
+    """最も古い有効な設問セットを1件取り出して削除する。
+
+    条件付き削除で払い出しを確定させるため、同時リクエストが同じセットを受け取ることはない。
+    残数は払い出し候補の取得結果から見積もる（件数確認のための追加Queryはしない）。
+    候補は低水位線より多く読むため、見積もりが低水位線以下なら実際の残数も低水位線以下である。
+
+    Returns:
+        (設問リスト, 残数の見積もり)。有効な設問セットがなければ設問リストは None
+    """
+    table = _get_dynamodb_resource().Table(QUESTION_POOL_TABLE)
+    wanted = max(MAX_CLAIM_CANDIDATES, get_low_water_mark() + 2)
+    query = _set_key_condition(level)
+    # TTLの削除は遅延するため期限切れのセットはクエリで除外する。Limit はフィルタ前の件数に
+    # 適用されるため、期限切れが先頭に溜まっていても有効な候補が揃うまで続きを読む
+    query["FilterExpression"] = "attribute_not_exists(expires_at) OR expires_at > :now"
+    query["ExpressionAttributeValues"] = {**query["ExpressionAttributeValues"], ":now": int(time.time())}
+    candidates = []
+    while len(candidates) < wanted:
+        resp = table.query(**query, Limit=wanted)
+        candidates.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        query["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    candidates = candidates[:wanted]
+
+    for i, item in enumerate(candidates):
+        try:
+            deleted = table.delete_item(
+                Key={"PK": item["PK"], "SK": item["SK"]},
+                ConditionExpression="attribute_exists(PK)",
+                ReturnValues="ALL_OLD",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                # 他のリクエストが先に取得した
+                continue
+            raise
+        attrs = deleted.get("Attributes")
+        if attrs:
+            return json.loads(attrs["questions_json"]), len(candidates) - i - 1
+
+    return None, 0
+
+
+def _acquire_refill_lock(level: int) -> bool:
+    """補充中ロックを取得する。他のリクエストが取得済み（期限内）なら False を返す。"""
+    table = _get_dynamodb_resource().Table(QUESTION_POOL_TABLE)
+    now = int(time.time())
+    try:
+        table.put_item(
+            Item={"PK": _pool_key(level), "SK": REFILL_LOCK_SK, "expires_at": now + REFILL_LOCK_SECONDS},
+            ConditionExpression="attribute_not_exists(PK) OR expires_at < :now",
+            ExpressionAttributeValues={":now": now},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def release_refill_lock(level: int) -> None:
+    """補充中ロックを解放する（補充の完了時に呼ぶ）。"""
+    table = _get_dynamodb_resource().Table(QUESTION_POOL_TABLE)
+    table.delete_item(Key={"PK": _pool_key(level), "SK": REFILL_LOCK_SK})
+
+
+def request_refill(level: int) -> None:
+    """補充用Lambdaを非同期（Event）で起動する。失敗してもリクエスト処理は継続する。
+
+    補充中ロックを取得できた場合のみ起動するため、補充要求が重なっても起動は1回になる。
+    """
+    if not POOL_REFILL_FUNCTION:
+        return
+    try:
+        if not _acquire_refill_lock(level):
+            return
+        _get_lambda_client().invoke(
+            FunctionName=POOL_REFILL_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps({"level": level}).encode("utf-8"),
+        )
+    except Exception as e:
+        logger.warning("Failed to request question pool refill for lv%d: %s", level, str(e))
+
+
+def take_question_set(level: int) -> list[dict] | None:
+    """プールから設問セットを払い出す。残数が少なければ補充を要求する。
+
+    Returns:
+        設問リスト。プール無効・空・取得失敗の場合はNone（呼び出し側で同期生成する）
+    """
+    if not is_pool_enabled():
+        return None
+
+    try:
+        questions, remaining = pop_question_set(level)
+        if questions is None:
+            logger.info("Question pool for lv%d is empty", level)
+            request_refill(level)
+            return None
+        if remaining <= get_low_water_mark():
+            request_refill(level)
+        return questions
+    except Exception as e:
+        logger.warning("Question pool unavailable for lv%d: %s", level, str(e))
+        return None
@@ -0,0 +1,98 @@
+"""設問セットの復旧 - 厳密な検証に落ちた生成結果を、作り直さずに修復する。
+
+1. 寛容な抽出（json_repair）でJSONを取り出し、ステップごとに検証する
+2. 無効・欠落したステップだけを、有効なステップを文脈として渡して再生成する
+
+Lv4の全体再生成（約20秒）より、ローカル修復や数ステップの再生成の方が安い。
+無効なステップが半数を超える場合は部分修復せず失敗とする（全体再生成と変わらないため）。
+"""
+
+import json
+import logging
+
+from backend.lib.bedrock_client import parse_json_response, response_text
+from backend.lib.json_repair import extract_json_object
+
+logger = logging.getLogger(__name__)
+
+
+def load_response(result: dict) -> dict:
+    """応答から出力JSONを取り出す（厳密なパースに失敗した場合は寛容な抽出を試す）。
+
+    Raises:
+        ValueError: JSONオブジェクトを取り出せない場合
+    """
+    try:
+        data = parse_json_response(result)
+    except json.JSONDecodeError:
+        data = extract_json_object(response_text(result))
+    if not isinstance(data, dict):
+        raise ValueError("Response JSON is not an object")
+    return data
+
+
+def collect_valid_steps(data: dict, steps: list[int], validate_question) -> dict[int, dict]:
+    """questions から指定ステップの有効な設問を {step: 設問} で返す（無効なものは含めない）。"""
+    valid = {}
+    questions = data.get("questions")
+    if not isinstance(questions, list):
+        return valid
+    for q in questions:
+        if not isinstance(q, dict):
+            continue
+        step = q.get("step")
+        if step not in steps or step in valid:
+            continue
+        try:
+            valid[step] = validate_question(step - 1, q)
+        except (ValueError, AttributeError) as e:
+            logger.info("Step %s failed validation: %s", step, str(e))
+    return valid
+
+
+def build_step_repair_prompt(steps: list[int], valid_questions: list[dict]) -> str:
+    """無効なステップだけを再生成させるユーザープロンプトを組み立てる。"""
+    step_list = "、".join(str(s) for s in steps)
+    return (
+        "以下は同じシナリオで生成済みの有効なステップです:\n"
+        f"{json.dumps({'questions': valid_questions}, ensure_ascii=False)}\n\n"
+        f"ステップ {step_list} のみを、上記と同じシナリオ・一貫性を保って再生成してください。"
+        "出力JSON形式は同じで、questions には再生成したステップだけを含めること。"
+    )
+
+
+def recover_questions(result: dict, expected_count: int, validate_question, regenerate) -> list[dict]:
+    """厳密なパースに失敗した応答から設問セットを復旧する。
+
+    Args:
+        result: 生成時のBedrockレスポンス
+        expected_count: 設問数（ステップは 1..expected_count）
+        validate_question: (index, 設問dict) を受け取り検証済みの設問を返す関数（不正なら ValueError）
+        regenerate: (無効なステップのリスト, 有効な設問のリスト) を受け取り、
+            それらのステップだけを再生成したBedrockレスポンスを返す関数
+
+    Returns:
+        ステップ順の検証済み設問リスト
+
+    Raises:
+        ValueError: 復旧できない場合
+    """
+    steps = list(range(1, expected_count + 1))
+    valid = collect_valid_steps(load_response(result), steps, validate_question)
+    invalid = [s for s in steps if s not in valid]
+    if not invalid:
+        logger.info("Recovered question set locally")
+        return [valid[s] for s in steps]
+
+    if len(invalid) * 2 > expected_count:
+        raise ValueError(f"Too many invalid steps to repair: {invalid}")
+
+    logger.warning("Regenerating invalid steps %s", invalid)
+    result = regenerate(invalid, [valid[s] for s in steps if s in valid])
+    repaired = collect_valid_steps(load_response(result), invalid, validate_question)
+    still_invalid = [s for s in invalid if s not in repaired]
+    if still_invalid:
+        raise ValueError(f"Steps {still_invalid} are still invalid after regeneration")
+
+    valid.update(repaired)
+    return [valid[s] for s in steps]
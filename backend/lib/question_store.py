@@ -0,0 +1,174 @@
+"""設問ストア - 払い出した設問セットをサーバ発行のIDで保持し、採点時にIDから設問を引く。
+
+/lvN/generate で設問セットを保存し、各設問に question_id（"{set_id}.{step}"）を付けて返す。
+/lvN/grade は question の代わりに question_id を受け取るため、長いシナリオを毎回送らずに済む。
+
+QUESTION_STORE_ENABLED=true のときのみ使用する（DynamoDB、TTL付き）。有効時の採点は
+question_id 必須で、クライアントが送った question は受け付けない（設問の書き換えを防ぐ）。
+そのため生成時に保存できなかった場合は生成自体を失敗にする。無効時は question_id を付けず、
+クライアントは従来どおり question を送る。採点側では取得した設問をプロセス内LRUにも保持し、
+同じセットの後続ステップではDynamoDBを読まない。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from backend.lib.dynamodb import get_resource
+
+logger = logging.getLogger(__name__)
+
+QUESTION_STORE_TABLE = os.environ.get("QUESTION_STORE_TABLE", "ai-levels-question-store")
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+MAX_CACHED_SETS = 256
+
+_sets: OrderedDict = OrderedDict()
+_sets_lock = threading.Lock()
+
+
+def is_store_enabled() -> bool:
+    """環境変数 QUESTION_STORE_ENABLED が true の場合に設問セットを保存する。"""
+    return os.environ.get("QUESTION_STORE_ENABLED", "false").strip().lower() == "true"
+
+
+def get_ttl_seconds() -> int:
+    """設問セットの保持期間（QUESTION_STORE_TTL_SECONDS）。"""
+    raw = os.environ.get("QUESTION_STORE_TTL_SECONDS")
+    if raw is None:
+        return DEFAULT_TTL_SECONDS
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        logger.warning("Invalid value for QUESTION_STORE_TTL_SECONDS: %r, using default %d", raw, DEFAULT_TTL_SECONDS)
+        return DEFAULT_TTL_SECONDS
+
+
+def _get_dynamodb_resource():
+    """Return the shared DynamoDB resource (extracted for testability)."""
+    return get_resource()
+
+
+def clear_cache() -> None:
+    """プロセス内キャッシュを空にする（テスト用）。"""
+    with _sets_lock:
+        _sets.clear()
+
+
+def _cache_put(set_id: str, entry: dict) -> None:
+    with _sets_lock:
+        _sets[set_id] = entry
+        _sets.move_to_end(set_id)
+        while len(_sets) > MAX_CACHED_SETS:
+            _sets.popitem(last=False)
+
+
+def _cache_get(set_id: str) -> dict | None:
+    with _sets_lock:
+        entry = _sets.get(set_id)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= int(time.time()):
+            del _sets[set_id]
+            return None
+        _sets.move_to_end(set_id)
+        return entry
+
+
+def _parse_question_id(question_id: str) -> tuple[str, int] | None:
+    set_id, _, step = question_id.rpartition(".")
+    if not set_id or not step.isdigit():
+        return None
+    return set_id, int(step)
+
+
+def question_id_step(question_id) -> int | None:
+    """question_id（"{set_id}.{step}"）が指すステップ番号を返す。形式不正の場合は None。"""
+    if not isinstance(question_id, str):
+        return None
+    parsed = _parse_question_id(question_id)
+    return parsed[1] if parsed else None
+
+
+def save_question_set(level: int, session_id: str, questions: list[dict]) -> list[dict]:
+    """設問セットを保存し、question_id を付けた設問リストを返す。
+
+    無効時は question_id なしでそのまま返す。
+
+    Raises:
+        Exception: 保存に失敗した場合（有効時は question_id なしでは採点できないため）
+    """
+    if not is_store_enabled():
+        return questions
+
+    set_id = uuid.uuid4().hex
+    entry = {
+        "level": level,
+        "session_id": session_id,
+        "questions": questions,
+        "expires_at": int(time.time()) + get_ttl_seconds(),
+    }
+    table = _get_dynamodb_resource().Table(QUESTION_STORE_TABLE)
+    table.put_item(Item={
+        "PK": f"QSET#{set_id}",
+        "level": f"lv{level}",
+        "session_id": session_id,
+        # 数値をDecimalに変換させないためJSON文字列で保持する
+        "questions_json": json.dumps(questions, ensure_ascii=False),
+        "expires_at": entry["expires_at"],
+    })
+
+    _cache_put(set_id, entry)
+    return [{**q, "question_id": f"{set_id}.{q['step']}"} for q in questions]
+
+
+def _load_set(set_id: str) -> dict | None:
+    entry = _cache_get(set_id)
+    if entry is not None:
+        return entry
+
+    table = _get_dynamodb_resource().Table(QUESTION_STORE_TABLE)
+    # 生成直後に別のLambdaから読むため強整合性読み込みにする
+    item = table.get_item(Key={"PK": f"QSET#{set_id}"}, ConsistentRead=True).get("Item")
+    # TTLによる削除は遅延するため、期限切れは読み取り時にも除外する
+    if not item or int(item.get("expires_at", 0)) <= int(time.time()):
+        return None
+
+    entry = {
+        "level": int(str(item["level"]).removeprefix("lv")),
+        "session_id": item["session_id"],
+        "questions": json.loads(item["questions_json"]),
+        "expires_at": int(item["expires_at"]),
+    }
+    _cache_put(set_id, entry)
+    return entry
+
+
+def load_question(level: int, question_id, session_id: str) -> dict | None:
+    """question_id から保存済みの設問を返す。
+
+    無効時、IDの形式不正、期限切れ、レベル・セッションの不一致、取得失敗の場合は None。
+    """
+    if not is_store_enabled() or not isinstance(question_id, str):
+        return None
+    parsed = _parse_question_id(question_id)
+    if parsed is None:
+        return None
+    set_id, step = parsed
+
+    try:
+        entry = _load_set(set_id)
+    except Exception as e:
+        logger.warning("Failed to load lv%d question set %s: %s", level, set_id, str(e))
+        return None
+    if entry is None or entry["level"] != level or entry["session_id"] != session_id:
+        return None
+
+    for question in entry["questions"]:
+        if question.get("step") == step:
+            return question
+    return None
@@ -0,0 +1,210 @@
+"""ストリーミングJSONパーサ - Bedrockのストリーム出力から値を逐次取り出す。"""
+
+import json
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+_END_OF_STRING = object()
+
+
+class StringFieldStream:
+    """トップレベルJSONオブジェクトの文字列値を、閉じる前から逐次デコードして返す。
+
+    例: '{"feedback": "良い' → [("feedback", "良い")]
+        '回答です", "explanation": "' → [("feedback", "回答です")]
+
+    JSON開始前のテキスト（コードフェンス等）は読み飛ばす。ネストした値は対象外。
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = None  # None, "" (直前がバックスラッシュ), or "uXXXX" の途中
+        self._is_key = False
+        self._expect_key = False
+        self._key_chars: list[str] = []
+        self._current_key = None
+        self._pending_high_surrogate = None
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """chunkを読み込み、確定した (フィールド名, テキスト差分) のリストを返す。"""
+        out: list[tuple[str, str]] = []
+        buf: list[str] = []
+
+        for ch in chunk:
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                decoded = self._decode_string_char(ch)
+                if decoded is _END_OF_STRING:
+                    self._in_string = False
+                    if self._is_key:
+                        self._current_key = "".join(self._key_chars)
+                        self._key_chars = []
+                    else:
+                        self._flush(buf, out)
+                    continue
+                if decoded is None:
+                    continue
+                if self._is_key:
+                    self._key_chars.append(decoded)
+                elif self._depth == 1:
+                    buf.append(decoded)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+                self._expect_key = False
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._current_key = None
+
+        self._flush(buf, out)
+        return out
+
+    def _flush(self, buf: list[str], out: list[tuple[str, str]]) -> None:
+        if buf and self._current_key is not None:
+            out.append((self._current_key, "".join(buf)))
+        buf.clear()
+
+    def _decode_string_char(self, ch: str):
+        """文字列内の1文字を処理し、デコード結果（str）、None（保留）、または終端マーカーを返す。"""
+        if self._escape is None:
+            if ch == "\\":
+                self._escape = ""
+                return None
+            if ch == '"':
+                return _END_OF_STRING
+            return ch
+
+        if self._escape == "":
+            if ch == "u":
+                self._escape = "u"
+                return None
+            self._escape = None
+            return _SIMPLE_ESCAPES.get(ch, ch)
+
+        # \\uXXXX の16進部分を収集する
+        self._escape += ch
+        if len(self._escape) < 5:
+            return None
+        hex_digits = self._escape[1:]
+        self._escape = None
+        try:
+            code = int(hex_digits, 16)
+        except ValueError:
+            return None
+
+        if 0xD800 <= code <= 0xDBFF:
+            self._pending_high_surrogate = code
+            return None
+        if 0xDC00 <= code <= 0xDFFF and self._pending_high_surrogate is not None:
+            high = self._pending_high_surrogate
+            self._pending_high_surrogate = None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return chr(code)
+
+
+class ArrayItemStream:
+    """トップレベルJSONオブジェクトの配列フィールドの要素（オブジェクト）を、閉じた時点で逐次返す。
+
+    例: ArrayItemStream("questions")
+        '{"questions": [{"step": 1}, {"st' → [{"step": 1}]
+        'ep": 2}]}' → [{"step": 2}]
+
+    JSON開始前のテキスト（コードフェンス等）は読み飛ばす。パースできない要素は返さない。
+    """
+
+    def __init__(self, field: str):
+        self._field = field
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._is_key = False
+        self._expect_key = False
+        self._key_chars: list[str] = []
+        self._current_key = None
+        self._in_field = False
+        self._item: list[str] | None = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        """chunkを読み込み、閉じた要素（dict）のリストを返す。"""
+        out: list[dict] = []
+
+        for ch in chunk:
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    if self._is_key:
+                        self._key_chars.append(_SIMPLE_ESCAPES.get(ch, ch))
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._is_key:
+                        self._current_key = "".join(self._key_chars)
+                        self._key_chars = []
+                elif self._is_key:
+                    self._key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+                self._expect_key = False
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2:
+                    self._in_field = ch == "[" and self._current_key == self._field
+                elif self._depth == 3 and ch == "{" and self._in_field:
+                    self._item = ["{"]
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._item is not None:
+                    text = "".join(self._item)
+                    self._item = None
+                    try:
+                        # 文字列中の生の改行などは許容する
+                        value = json.loads(text, strict=False)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(value, dict):
+                        out.append(value)
+                elif self._depth == 1:
+                    self._in_field = False
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._current_key = None
+
+        return out
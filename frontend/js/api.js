@@ -5,6 +5,8 @@
 const ApiClient = (() => {
   // API Gateway のベースURL（デプロイ後に設定）
   const BASE_URL = window.API_BASE_URL || "";
+  // ストリーミング採点・設問生成用 Function URL（未設定時は通常APIにフォールバック）
+  const STREAM_BASE_URL = window.STREAM_BASE_URL || "";
 
   /**
    * 共通 fetch ラッパー
@@ -45,6 +47,62 @@ const ApiClient = (() => {
     });
   }
 
+  /**
+   * 採点リクエストのボディ - サーバ保存済みの設問（question_id あり）はIDだけを送る
+   * @param {string} sessionId
+   * @param {number} step
+   * @param {object} question
+   * @param {string} answer
+   * @returns {string}
+   */
+  function gradeBody(sessionId, step, question, answer) {
+    if (question.question_id) {
+      return JSON.stringify({ session_id: sessionId, step, question_id: question.question_id, answer });
+    }
+    return JSON.stringify({ session_id: sessionId, step, question, answer });
+  }
+
+  /**
+   * POST /lvN/grade 共通処理 - 保存済みの設問は question_id で送る
+   * （サーバは保存済みの設問でのみ採点するため、404 の場合も設問本体は送り直さない）
+   * @param {string} path
+   * @param {string} sessionId
+   * @param {number} step
+   * @param {object} question
+   * @param {string} answer
+   * @returns {Promise<object>}
+   */
+  async function postGrade(path, sessionId, step, question, answer) {
+    const data = await request(path, { method: "POST", body: gradeBody(sessionId, step, question, answer) });
+    // 非同期モード（202 + job_id）ではジョブの完了を待って結果を返す
+    return data.job_id ? waitForJob(data.job_id) : data;
+  }
+
+  // 非同期採点ジョブのポーリング間隔と上限（ワーカーのタイムアウト120秒に余裕を持たせる）
+  const JOB_POLL_INTERVAL_MS = 1000;
+  const JOB_POLL_TIMEOUT_MS = 150000;
+
+  /**
+   * GET /jobs/{id} - 非同期採点ジョブが終わるまでポーリングし、採点結果を返す
+   * @param {string} jobId
+   * @returns {Promise<object>} 同期版 /lvN/grade と同じ採点結果
+   */
+  async function waitForJob(jobId) {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const job = await request(`/jobs/${encodeURIComponent(jobId)}`, { method: "GET" });
+      if (job.status === "succeeded") return job.result;
+      if (job.status === "failed") {
+        const err = new Error(job.error || "採点に失敗しました。リトライしてください。");
+        err.status = job.status_code;
+        err.data = job;
+        throw err;
+      }
+    }
+    throw new Error("採点がタイムアウトしました。リトライしてください。");
+  }
+
   /**
    * POST /lv1/grade - 回答採点+レビュー
    * @param {string} sessionId
@@ -54,31 +112,240 @@ const ApiClient = (() => {
    * @returns {Promise<{session_id: string, step: number, passed: boolean, score: number, feedback: string, explanation: string}>}
    */
   function grade(sessionId, step, question, answer) {
-    return request("/lv1/grade", {
+    return postGrade("/lv1/grade", sessionId, step, question, answer);
+  }
+
+  /**
+   * POST /lvN/complete 共通処理 - 返ってきた保存後のレベル状態でキャッシュを置き換える
+   * （直後の /levels/status 呼び出しを省略できる）
+   * @param {string} path
+   * @param {object} payload - { session_id, questions, answers, grades, final_passed }
+   * @returns {Promise<{saved: boolean, record_id: string, levels: object}>}
+   */
+  async function completeLevel(path, payload) {
+    const data = await request(path, {
       method: "POST",
-      body: JSON.stringify({ session_id: sessionId, step, question, answer }),
+      body: JSON.stringify(payload),
     });
+    const cached = getCachedLevels(payload.session_id);
+    const levels = {};
+    for (const [key, info] of Object.entries(data.levels)) {
+      // 合格・解放は取り消されないため、手元にある既存の合格（再受験時の上位レベルなど）も残す
+      const known = (cached && cached.levels[key]) || {};
+      levels[key] = {
+        unlocked: !!(info.unlocked || known.unlocked),
+        passed: !!(info.passed || known.passed),
+      };
+    }
+    // 更新後のETagは分からないため、この状態を使った後の取得は条件なしで行う
+    cacheLevels(payload.session_id, levels, null, true, true);
+    return data;
   }
 
   /**
    * POST /lv1/complete - 完了レコード保存
    * @param {object} payload - { session_id, questions, answers, grades, final_passed }
-   * @returns {Promise<{saved: boolean, record_id: string}>}
+   * @returns {Promise<{saved: boolean, record_id: string, levels: object}>}
    */
   function complete(payload) {
-    return request("/lv1/complete", {
-      method: "POST",
-      body: JSON.stringify(payload),
-    });
+    return completeLevel("/lv1/complete", payload);
+  }
+
+  // レベル状態のキャッシュ（sessionStorage）。ETagとともに保持し、条件付きGETに使う
+  const LEVELS_CACHE_KEY = "ai_levels_gate_cache";
+
+  /**
+   * キャッシュ済みのレベル状態を取得する
+   * @param {string} sessionId
+   * @returns {{levels: object, etag: string|null, fresh: boolean, bypass: boolean}|null}
+   */
+  function getCachedLevels(sessionId) {
+    try {
+      const raw = sessionStorage.getItem(LEVELS_CACHE_KEY);
+      if (!raw) return null;
+      const data = JSON.parse(raw);
+      if (data.session_id !== sessionId || !data.levels) return null;
+      return { levels: data.levels, etag: data.etag || null, fresh: !!data.fresh, bypass: !!data.bypass };
+    } catch {
+      return null;
+    }
+  }
+
+  /**
+   * レベル状態をキャッシュする
+   * @param {string} sessionId
+   * @param {object} levels
+   * @param {string|null} etag - 不明な場合はnull（次回は無条件で取得する）
+   * @param {boolean} fresh - true の場合、次回の getLevelsStatus は通信せずにこの値を返す
+   *   （/lvN/complete のレスポンスで受け取った直後の状態）
+   * @param {boolean} bypass - true の場合、次に通信するときはサーバ側のキャッシュを迂回する（fresh=1）
+   *   （完了の書き込みは /levels/status のコンテナ内キャッシュに反映されないため）
+   */
+  function cacheLevels(sessionId, levels, etag = null, fresh = false, bypass = false) {
+    try {
+      sessionStorage.setItem(LEVELS_CACHE_KEY, JSON.stringify({ session_id: sessionId, levels, etag, fresh, bypass }));
+    } catch {
+      // sessionStorage が使えない環境ではキャッシュしない
+    }
   }
 
   /**
    * GET /levels/status - レベル合格状態取得
+   * キャッシュ済みのETagがあれば If-None-Match を付け、304の場合はキャッシュを返す
    * @param {string} sessionId
    * @returns {Promise<{levels: object}>}
    */
-  function getLevelsStatus(sessionId) {
-    return request(`/levels/status?session_id=${encodeURIComponent(sessionId)}`);
+  async function getLevelsStatus(sessionId) {
+    const cached = getCachedLevels(sessionId);
+    if (cached && cached.fresh) {
+      cacheLevels(sessionId, cached.levels, cached.etag, false, cached.bypass);
+      return { levels: cached.levels };
+    }
+    const headers = cached && cached.etag ? { "If-None-Match": cached.etag } : {};
+    const fresh = cached && cached.bypass ? "&fresh=1" : "";
+
+    const res = await fetch(`${BASE_URL}/levels/status?session_id=${encodeURIComponent(sessionId)}${fresh}`, {
+      headers,
+      cache: "no-cache",
+    });
+
+    if (res.status === 304 && cached) {
+      return { levels: cached.levels };
+    }
+
+    const data = await res.json();
+    if (!res.ok) {
+      const err = new Error(data.error || `HTTP ${res.status}`);
+      err.status = res.status;
+      err.data = data;
+      throw err;
+    }
+
+    cacheLevels(sessionId, data.levels, res.headers.get("ETag"));
+    return data;
+  }
+
+  /**
+   * POST /lvN/grade（ストリーミング）- スコアを先に受け取り、フィードバックを逐次受信する
+   * STREAM_BASE_URL 未設定時は通常の /lvN/grade を呼び出す（コールバックは呼ばれない）
+   * @param {number} level - レベル番号 (1-4)
+   * @param {string} sessionId
+   * @param {number} step
+   * @param {object} question
+   * @param {string} answer
+   * @param {{onGrade?: Function, onDelta?: Function}} handlers
+   *   onGrade({passed, score}) - 採点結果の確定時
+   *   onDelta(field, text) - feedback / explanation の差分受信時
+   * @returns {Promise<{session_id: string, step: number, passed: boolean, score: number, feedback: string, explanation: string}>}
+   */
+  async function gradeStream(level, sessionId, step, question, answer, handlers = {}) {
+    if (!STREAM_BASE_URL || typeof TextDecoder === "undefined") {
+      return postGrade(`/lv${level}/grade`, sessionId, step, question, answer);
+    }
+
+    const res = await fetch(`${STREAM_BASE_URL}/lv${level}/grade`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: gradeBody(sessionId, step, question, answer),
+    });
+
+    if (!res.ok || !res.body) await throwStreamError(res);
+
+    let result = null;
+    await readNdjson(res, (ev) => {
+      if (ev.event === "grade" && handlers.onGrade) {
+        handlers.onGrade({ passed: ev.passed, score: ev.score });
+      } else if (ev.event === "delta" && handlers.onDelta) {
+        handlers.onDelta(ev.field, ev.text);
+      } else if (ev.event === "result") {
+        const { event, ...data } = ev;
+        result = data;
+      } else if (ev.event === "error") {
+        throw new Error(ev.error);
+      }
+    });
+
+    if (!result) throw new Error("採点結果を受信できませんでした");
+    return result;
+  }
+
+  /**
+   * ストリーミングレスポンスの異常終了（4xx/5xx）をエラーにする
+   * @param {Response} res
+   */
+  async function throwStreamError(res) {
+    let data = {};
+    try { data = await res.json(); } catch { /* ignore */ }
+    const err = new Error(data.error || `HTTP ${res.status}`);
+    err.status = res.status;
+    err.data = data;
+    throw err;
+  }
+
+  /**
+   * NDJSONレスポンスを1行ずつ読み、イベントごとに onEvent を呼ぶ
+   * @param {Response} res
+   * @param {Function} onEvent - onEvent(event)
+   */
+  async function readNdjson(res, onEvent) {
+    const handleLine = (line) => {
+      if (line.trim()) onEvent(JSON.parse(line));
+    };
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      let idx;
+      while ((idx = buffered.indexOf("\n")) >= 0) {
+        handleLine(buffered.slice(0, idx));
+        buffered = buffered.slice(idx + 1);
+      }
+    }
+    handleLine(buffered + decoder.decode());
+  }
+
+  /**
+   * POST /lvN/generate（ストリーミング）- 設問をステップごとに受信する（Lv2〜Lv4）
+   * STREAM_BASE_URL 未設定時は通常の /lvN/generate を呼び出し、受信した設問ごとに onQuestion を呼ぶ
+   * @param {number} level - レベル番号 (2-4)
+   * @param {string} sessionId
+   * @param {{onQuestion?: Function}} handlers
+   *   onQuestion(question) - 設問を1問受信するたびに（ステップ順）
+   * @returns {Promise<{session_id: string, questions: Array}>} 確定した設問セット（question_id 付きの場合あり）
+   */
+  async function generateStream(level, sessionId, handlers = {}) {
+    const body = JSON.stringify({ session_id: sessionId });
+    if (!STREAM_BASE_URL || typeof TextDecoder === "undefined") {
+      const data = await request(`/lv${level}/generate`, { method: "POST", body });
+      if (handlers.onQuestion) (data.questions || []).forEach((q) => handlers.onQuestion(q));
+      return data;
+    }
+
+    const res = await fetch(`${STREAM_BASE_URL}/lv${level}/generate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body,
+    });
+    if (!res.ok || !res.body) await throwStreamError(res);
+
+    let result = null;
+    await readNdjson(res, (ev) => {
+      if (ev.event === "question" && handlers.onQuestion) {
+        handlers.onQuestion(ev.question);
+      } else if (ev.event === "result") {
+        const { event, ...data } = ev;
+        result = data;
+      } else if (ev.event === "error") {
+        throw new Error(ev.error);
+      }
+    });
+
+    if (!result) throw new Error("設問を受信できませんでした");
+    return result;
   }
 
   /**
@@ -135,22 +402,16 @@ const ApiClient = (() => {
    * @returns {Promise<{session_id: string, step: number, passed: boolean, score: number, feedback: string, explanation: string}>}
    */
   function lv2Grade(sessionId, step, question, answer) {
-    return request("/lv2/grade", {
-      method: "POST",
-      body: JSON.stringify({ session_id: sessionId, step, question, answer }),
-    });
+    return postGrade("/lv2/grade", sessionId, step, question, answer);
   }
 
   /**
    * POST /lv2/complete - Lv2完了レコード保存
    * @param {object} payload - { session_id, questions, answers, grades, final_passed }
-   * @returns {Promise<{saved: boolean, record_id: string}>}
+   * @returns {Promise<{saved: boolean, record_id: string, levels: object}>}
    */
   function lv2Complete(payload) {
-    return request("/lv2/complete", {
-      method: "POST",
-      body: JSON.stringify(payload),
-    });
+    return completeLevel("/lv2/complete", payload);
   }
 
   /**
@@ -174,22 +435,16 @@ const ApiClient = (() => {
    * @returns {Promise<{session_id: string, step: number, passed: boolean, score: number, feedback: string, explanation: string}>}
    */
   function lv3Grade(sessionId, step, question, answer) {
-    return request("/lv3/grade", {
-      method: "POST",
-      body: JSON.stringify({ session_id: sessionId, step, question, answer }),
-    });
+    return postGrade("/lv3/grade", sessionId, step, question, answer);
   }
 
   /**
    * POST /lv3/complete - Lv3完了レコード保存
    * @param {object} payload - { session_id, questions, answers, grades, final_passed }
-   * @returns {Promise<{saved: boolean, record_id: string}>}
+   * @returns {Promise<{saved: boolean, record_id: string, levels: object}>}
    */
   function lv3Complete(payload) {
-    return request("/lv3/complete", {
-      method: "POST",
-      body: JSON.stringify(payload),
-    });
+    return completeLevel("/lv3/complete", payload);
   }
 
   /**
@@ -213,23 +468,17 @@ const ApiClient = (() => {
    * @returns {Promise<{session_id: string, step: number, passed: boolean, score: number, feedback: string, explanation: string}>}
    */
   function lv4Grade(sessionId, step, question, answer) {
-    return request("/lv4/grade", {
-      method: "POST",
-      body: JSON.stringify({ session_id: sessionId, step, question, answer }),
-    });
+    return postGrade("/lv4/grade", sessionId, step, question, answer);
   }
 
   /**
    * POST /lv4/complete - Lv4完了レコード保存
    * @param {object} payload - { session_id, questions, answers, grades, final_passed }
-   * @returns {Promise<{saved: boolean, record_id: string}>}
+   * @returns {Promise<{saved: boolean, record_id: string, levels: object}>}
    */
   function lv4Complete(payload) {
-    return request("/lv4/complete", {
-      method: "POST",
-      body: JSON.stringify(payload),
-    });
+    return completeLevel("/lv4/complete", payload);
   }
 
-  return { generate, grade, complete, getLevelsStatus, lv2Generate, lv2Grade, lv2Complete, lv3Generate, lv3Grade, lv3Complete, lv4Generate, lv4Grade, lv4Complete, showError, hideError };
+  return { generate, grade, gradeStream, generateStream, complete, getLevelsStatus, getCachedLevels, cacheLevels, lv2Generate, lv2Grade, lv2Complete, lv3Generate, lv3Grade, lv3Complete, lv4Generate, lv4Grade, lv4Complete, showError, hideError };
 })();
@@ -178,6 +178,17 @@ const Lv1App = (() => {
     showSection("result");
   }
 
+  /** ストリーミング採点: スコア確定時点で結果カードを表示し、フィードバックは逐次追記する */
+  function renderStreamingResult(grade) {
+    renderResult({ ...grade, feedback: "", explanation: "" });
+    els.btnNext.disabled = true;
+  }
+
+  function appendResultText(field, text) {
+    const el = field === "feedback" ? els.resultFeedback : els.resultExplanation;
+    el.textContent += text;
+  }
+
   // --- 最終結果表示 ---
 
   function renderFinal(session) {
@@ -265,19 +276,20 @@ const Lv1App = (() => {
 
     try {
       ApiClient.hideError();
-      const result = await ApiClient.grade(
-        session.session_id,
-        question.step,
-        question,
-        answer
-      );
+      const result = await ApiClient.gradeStream(1, session.session_id, question.step, question, answer, {
+        onGrade: renderStreamingResult,
+        onDelta: appendResultText,
+      });
 
       session.answers.push(answer);
       session.grades.push(result);
       saveSession(session);
 
       renderResult(result);
+      els.btnNext.disabled = false;
     } catch (err) {
+      els.btnNext.disabled = false;
+      showSection("question");
       els.btnSubmit.disabled = false;
       els.btnSubmit.textContent = "回答を送信";
       ApiClient.showError(
@@ -2,3 +2,9 @@
  * アプリケーション設定
  */
 window.API_BASE_URL = "https://ssfhgynym7.execute-api.ap-northeast-1.amazonaws.com/prod";
+
+/**
+ * ストリーミング採点・設問生成用 Function URL（末尾スラッシュなし）
+ * 空文字の場合は通常の採点・生成APIを使用する
+ */
+window.STREAM_BASE_URL = "";
@@ -96,13 +96,19 @@ const Gate = (() => {
       return;
     }
 
+    // キャッシュがあれば先に表示し、サーバーには変更の有無だけを確認する
+    const cached = ApiClient.getCachedLevels(sessionId);
+    if (cached) {
+      updateLevelCards(cached.levels);
+    }
+
     try {
       ApiClient.hideError();
       const data = await ApiClient.getLevelsStatus(sessionId);
       updateLevelCards(data.levels);
     } catch (err) {
-      // API失敗時はデフォルト状態（Lv1のみ表示）にフォールバック
-      applyDefaultState();
+      // API失敗時はキャッシュ、なければデフォルト状態（Lv1のみ表示）にフォールバック
+      if (!cached) applyDefaultState();
       ApiClient.showError(
         "レベル状態の取得に失敗しました。",
         () => loadLevelStatus()
@@ -152,6 +152,17 @@ const Lv2App = (() => {
     showSection("result");
   }
 
+  /** ストリーミング採点: スコア確定時点で結果カードを表示し、フィードバックは逐次追記する */
+  function renderStreamingResult(grade) {
+    renderResult({ ...grade, feedback: "", explanation: "" });
+    els.btnNext.disabled = true;
+  }
+
+  function appendResultText(field, text) {
+    const el = field === "feedback" ? els.resultFeedback : els.resultExplanation;
+    el.textContent += text;
+  }
+
   function renderFinal(session) {
     const passedCount = session.grades.filter((g) => g.passed).length;
     const totalSteps = session.questions.length;
@@ -185,11 +196,28 @@ const Lv2App = (() => {
 
   let session = null;
 
+  const TOTAL_STEPS = Object.keys(STEP_LABELS).length;
+  // ストリーミング受信中の設問セット（まだ届いていないステップへ進んだ場合に完了を待つ）
+  let generation = null;
+
+  function resetProgress(s) {
+    s.questions = [];
+    s.answers = [];
+    s.grades = [];
+    s.current_step = 0;
+  }
+
   async function start() {
     cacheDom();
     setupInputListeners();
     session = getSession();
 
+    // 設問セットの受信途中で中断したセッションは最初からやり直す
+    if (session.questions.length > 0 && session.questions.length < TOTAL_STEPS) {
+      resetProgress(session);
+      saveSession(session);
+    }
+
     if (session.questions.length > 0 && session.current_step < session.questions.length) {
       renderQuestion(session.questions[session.current_step], session.current_step, session.questions.length);
       return;
@@ -202,17 +230,28 @@ const Lv2App = (() => {
     showSection("loading");
     try {
       ApiClient.hideError();
-      const data = await ApiClient.lv2Generate(session.session_id);
+      resetProgress(session);
+      // ステップ1を受信した時点で回答を始められるようにし、残りは回答中に受信する
+      generation = ApiClient.generateStream(2, session.session_id, {
+        onQuestion: (question) => {
+          session.questions.push(question);
+          if (session.questions.length === 1) renderQuestion(question, 0, TOTAL_STEPS);
+        },
+      });
+      const data = await generation;
+      const streamed = session.questions.length > 0;
+      // 確定した設問セット（question_id 付きの場合あり）で置き換える
       session.questions = data.questions || [];
-      session.current_step = 0;
       saveSession(session);
 
       if (session.questions.length === 0) {
         ApiClient.showError("設問の生成に失敗しました。", () => start());
         return;
       }
-      renderQuestion(session.questions[0], 0, session.questions.length);
+      if (!streamed) renderQuestion(session.questions[0], 0, session.questions.length);
     } catch (err) {
+      resetProgress(session);
+      saveSession(session);
       showSection("question");
       if (err.status && err.status >= 500) {
         ApiClient.showError("サーバーエラーが発生しました。しばらく待ってからリトライしてください。", () => start());
@@ -221,25 +260,47 @@ const Lv2App = (() => {
       } else {
         ApiClient.showError("ネットワーク接続を確認してください。", () => start());
       }
+    } finally {
+      generation = null;
     }
   }
 
   async function submitAnswer() {
-    const question = session.questions[session.current_step];
     const answer = els.answerText.value.trim();
     if (!answer) return;
 
     els.btnSubmit.disabled = true;
     els.btnSubmit.textContent = "採点中...";
 
+    // question_id（設問ストア有効時）は生成完了時の result でのみ届くため、受信中は完了を待ってから採点する
+    if (generation) {
+      try {
+        await generation;
+      } catch {
+        // エラー表示は start() で行う
+      }
+    }
+    const question = session.questions[session.current_step];
+    if (!question) {
+      els.btnSubmit.disabled = false;
+      els.btnSubmit.textContent = "回答を送信";
+      return;
+    }
+
     try {
       ApiClient.hideError();
-      const result = await ApiClient.lv2Grade(session.session_id, question.step, question, answer);
+      const result = await ApiClient.gradeStream(2, session.session_id, question.step, question, answer, {
+        onGrade: renderStreamingResult,
+        onDelta: appendResultText,
+      });
       session.answers.push(answer);
       session.grades.push(result);
       saveSession(session);
       renderResult(result);
+      els.btnNext.disabled = false;
     } catch (err) {
+      els.btnNext.disabled = false;
+      showSection("question");
       els.btnSubmit.disabled = false;
       els.btnSubmit.textContent = "回答を送信";
       ApiClient.showError("採点に失敗しました。もう一度お試しください。", () => submitAnswer());
@@ -250,11 +311,20 @@ const Lv2App = (() => {
     session.current_step += 1;
     saveSession(session);
 
+    if (generation && session.current_step >= session.questions.length) {
+      showSection("loading");
+      try {
+        await generation;
+      } catch {
+        return; // エラー表示は start() で行う
+      }
+    }
+
     if (session.current_step >= session.questions.length) {
       await completeSession();
     } else {
       els.btnSubmit.textContent = "回答を送信";
-      renderQuestion(session.questions[session.current_step], session.current_step, session.questions.length);
+      renderQuestion(session.questions[session.current_step], session.current_step, TOTAL_STEPS);
     }
   }
 
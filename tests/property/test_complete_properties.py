@@ -9,11 +9,14 @@ import json
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+from boto3.dynamodb.types import TypeDeserializer
 from hypothesis import given, settings
 from hypothesis import strategies as st
 
 from backend.handlers.complete_handler import handler
 
+_deserializer = TypeDeserializer()
+
 
 def _uuid_v4_strategy():
     """Generate valid UUID v4 strings."""
@@ -64,28 +67,23 @@ def test_complete_record_completeness(session_id, questions, answers, grades, fi
     }
 
     # Capture what gets written to DynamoDB
-    results_items = []
-    progress_items = []
-
-    mock_results_table = MagicMock()
-    mock_results_table.put_item.side_effect = lambda Item: results_items.append(Item)
-
-    mock_progress_table = MagicMock()
-    mock_progress_table.put_item.side_effect = lambda Item: progress_items.append(Item)
-
     mock_dynamodb = MagicMock()
-    mock_dynamodb.Table.side_effect = lambda name: (
-        mock_results_table if name == "ai-levels-results" else mock_progress_table
-    )
 
     with patch("backend.handlers.complete_handler._get_dynamodb_resource", return_value=mock_dynamodb):
         resp = handler(event, None)
 
     assert resp["statusCode"] == 200
 
+    # Result and progress are written in a single transaction
+    assert mock_dynamodb.meta.client.transact_write_items.call_count == 1
+    transact_items = mock_dynamodb.meta.client.transact_write_items.call_args[1]["TransactItems"]
+    puts = [i["Put"] for i in transact_items if "Put" in i]
+    updates = [i["Update"] for i in transact_items if "Update" in i]
+
     # Verify results table record completeness
-    assert len(results_items) == 1
-    record = results_items[0]
+    assert len(puts) == 1
+    assert puts[0]["TableName"] == "ai-levels-results"
+    record = {k: _deserializer.deserialize(v) for k, v in puts[0]["Item"].items()}
 
     assert record["session_id"] == session_id
     assert record["questions"] == questions
@@ -102,7 +100,11 @@ def test_complete_record_completeness(session_id, questions, answers, grades, fi
     assert record["SK"] == "RESULT#lv1"
 
     # Verify progress table record
-    assert len(progress_items) == 1
-    progress = progress_items[0]
-    assert progress["session_id"] == session_id
-    assert progress["lv1_passed"] == final_passed
+    assert len(updates) == 1
+    progress = updates[0]
+    values = {k: _deserializer.deserialize(v) for k, v in progress["ExpressionAttributeValues"].items()}
+    assert progress["TableName"] == "ai-levels-progress"
+    assert progress["Key"] == {"PK": {"S": f"SESSION#{session_id}"}, "SK": {"S": "PROGRESS"}}
+    assert progress["ExpressionAttributeNames"] == {"#flag": "lv1_passed"}
+    assert values[":session_id"] == session_id
+    assert values[":passed"] == final_passed
@@ -0,0 +1,84 @@
+"""Unit tests for backend/lib/answer_key.py"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from backend.lib import answer_key
+
+QUESTION = {
+    "step": 1,
+    "type": "multiple_choice",
+    "prompt": "Q1?",
+    "options": ["A", "B", "C"],
+    "context": None,
+}
+RATIONALES = ["Aの根拠", "Bの根拠", "Cの根拠"]
+
+
+@pytest.fixture(autouse=True)
+def store_enabled():
+    with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "true"}):
+        yield
+
+
+class TestAttachAnswerKey:
+    def test_attaches_key_for_the_question_store(self):
+        question = answer_key.attach_answer_key(QUESTION, 1, RATIONALES)
+
+        assert question["answer_key"] == {"answer_index": 1, "rationales": RATIONALES}
+        assert answer_key.strip_answer_key(question) == QUESTION
+
+    def test_disabled_without_question_store(self):
+        with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "false"}):
+            assert answer_key.attach_answer_key(QUESTION, 1, RATIONALES) == QUESTION
+
+    @pytest.mark.parametrize("index, rationales", [
+        (3, RATIONALES),
+        (True, RATIONALES),
+        ("1", RATIONALES),
+        (1, RATIONALES[:2]),
+        (1, ["ok", "", "ok"]),
+        (1, None),
+    ])
+    def test_invalid_key_is_not_attached(self, index, rationales):
+        assert "answer_key" not in answer_key.attach_answer_key(QUESTION, index, rationales)
+
+
+class TestScoreChoice:
+    def test_correct_answer(self):
+        question = answer_key.attach_answer_key(QUESTION, 1, RATIONALES)
+
+        scored = answer_key.score_choice(question, "B")
+
+        assert scored["correct"] is True
+        assert scored["score"] == 100
+        assert "Bの根拠" in scored["feedback"]
+        assert "「B」" in scored["explanation"]
+
+    def test_wrong_answer_explains_correct_option(self):
+        question = answer_key.attach_answer_key(QUESTION, 1, RATIONALES)
+
+        scored = answer_key.score_choice(question, "C")
+
+        assert scored["correct"] is False
+        assert scored["score"] == 0
+        assert "Cの根拠" in scored["feedback"]
+        assert "Bの根拠" in scored["explanation"]
+
+    def test_answer_not_in_options_returns_none(self):
+        question = answer_key.attach_answer_key(QUESTION, 1, RATIONALES)
+        assert answer_key.score_choice(question, "Z") is None
+
+    def test_without_key_returns_none(self):
+        assert answer_key.score_choice(QUESTION, "B") is None
+
+    @pytest.mark.parametrize("key", ["v1.token", {"answer_index": 5, "rationales": RATIONALES}, {}])
+    def test_malformed_key_returns_none(self, key):
+        assert answer_key.score_choice({**QUESTION, "answer_key": key}, "B") is None
+
+    def test_client_supplied_key_is_ignored_without_question_store(self):
+        question = answer_key.attach_answer_key(QUESTION, 1, RATIONALES)
+        with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "false"}):
+            assert answer_key.score_choice(question, "B") is None
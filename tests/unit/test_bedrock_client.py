@@ -2,12 +2,33 @@
 
 import io
 import json
+import os
 from unittest.mock import patch, MagicMock
 
 import pytest
-from botocore.exceptions import ClientError
-
-from backend.lib.bedrock_client import invoke_claude, REGION, MODEL_ID, MAX_RETRIES
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from backend.lib.bedrock_client import (
+    invoke_claude, invoke_claude_stream, get_client, get_cache_usage, set_client, set_deadline, reset_retry_budget,
+    parse_json_response,
+    CLIENT_CONFIG, REGION, MODEL_ID, MAX_RETRIES, MAX_DELAY, RETRY_BUDGET_CAPACITY, MAX_TOOL_RETRY_TOKENS,
+)
+from backend.lib.model_config import get_call_config
+from backend.lib.bedrock_router import router
+
+
+@pytest.fixture(autouse=True)
+def _reset_client():
+    """Each test starts without a cached Bedrock client, a full retry budget and no deadline."""
+    set_client(None)
+    reset_retry_budget()
+    set_deadline(None)
+    router.reset()
+    yield
+    set_client(None)
+    reset_retry_budget()
+    set_deadline(None)
+    router.reset()
 
 
 def _make_bedrock_response(content: dict) -> dict:
@@ -35,7 +56,9 @@ class TestInvokeClaudeRegionAndModel:
 
             invoke_claude("sys", "user")
 
-            mock_boto3.client.assert_called_once_with("bedrock-runtime", region_name="ap-northeast-1")
+            mock_boto3.client.assert_called_once_with(
+                "bedrock-runtime", region_name="ap-northeast-1", config=CLIENT_CONFIG,
+            )
 
     def test_calls_invoke_model_with_correct_model_id(self):
         with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
@@ -58,12 +81,85 @@ class TestInvokeClaudeRegionAndModel:
 
             call_kwargs = mock_client.invoke_model.call_args[1]
             body = json.loads(call_kwargs["body"])
-            assert body["system"] == "my system prompt"
+            assert body["system"] == [{
+                "type": "text",
+                "text": "my system prompt",
+                "cache_control": {"type": "ephemeral"},
+            }]
             assert body["messages"] == [{"role": "user", "content": [{"type": "text", "text": "my user prompt"}]}]
             assert body["anthropic_version"] == "bedrock-2023-05-31"
             assert body["max_tokens"] == 2048
 
 
+class TestClientReuse:
+    """The Bedrock client is created once per process and reused."""
+
+    def test_client_created_once_across_invocations(self):
+        with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
+            mock_client = MagicMock()
+            mock_boto3.client.return_value = mock_client
+            mock_client.invoke_model.return_value = _make_bedrock_response({"ok": True})
+
+            invoke_claude("sys", "user")
+            invoke_claude("sys", "user")
+
+            assert mock_boto3.client.call_count == 1
+            assert mock_client.invoke_model.call_count == 2
+
+    def test_set_client_injects_stub(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({"stub": True})
+        set_client(stub)
+
+        with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
+            result = invoke_claude("sys", "user")
+
+            mock_boto3.client.assert_not_called()
+        assert result == {"stub": True}
+        assert get_client() is stub
+
+    def test_client_config_enables_keepalive_and_pooling(self):
+        assert CLIENT_CONFIG.tcp_keepalive is True
+        assert CLIENT_CONFIG.max_pool_connections >= 10
+
+
+class TestPromptCaching:
+    """System prompts are sent as cacheable blocks and cache usage is surfaced."""
+
+    def test_cache_can_be_disabled(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({"ok": True})
+        set_client(stub)
+
+        with patch.dict(os.environ, {"BEDROCK_PROMPT_CACHE": "false"}):
+            invoke_claude("sys", "user")
+
+        body = json.loads(stub.invoke_model.call_args[1]["body"])
+        assert body["system"] == "sys"
+
+    def test_get_cache_usage_reads_usage_block(self):
+        usage = {"input_tokens": 12, "cache_read_input_tokens": 900, "output_tokens": 30}
+        assert get_cache_usage(usage) == {
+            "cache_read_input_tokens": 900,
+            "cache_creation_input_tokens": 0,
+            "input_tokens": 12,
+        }
+
+    def test_cache_usage_is_logged(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({
+            "content": [], "usage": {"input_tokens": 5, "cache_read_input_tokens": 1200},
+        })
+        set_client(stub)
+
+        with patch("backend.lib.bedrock_client.logger") as mock_logger:
+            invoke_claude("sys", "user")
+
+        args = mock_logger.info.call_args[0]
+        assert "cache" in args[0]
+        assert 1200 in args
+
+
 class TestInvokeClaudeMaxTokens:
     """max_tokens parameterization: default 2048 and custom values."""
 
@@ -92,11 +188,17 @@ class TestInvokeClaudeMaxTokens:
             assert body["max_tokens"] == 4096
 
 
+def _max_jitter(a, b):
+    """Make full-jitter backoff deterministic by always picking the upper bound."""
+    return b
+
+
 class TestRetryLogic:
     """Requirement 9.3, 9.4: exponential backoff retry on retryable errors."""
 
+    @patch("backend.lib.bedrock_client.random.uniform", side_effect=_max_jitter)
     @patch("backend.lib.bedrock_client.time.sleep")
-    def test_retries_on_throttling_then_succeeds(self, mock_sleep):
+    def test_retries_on_throttling_then_succeeds(self, mock_sleep, _mock_uniform):
         with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
             mock_client = MagicMock()
             mock_boto3.client.return_value = mock_client
@@ -128,8 +230,9 @@ class TestRetryLogic:
             assert exc_info.value.response["Error"]["Code"] == "ThrottlingException"
             assert mock_client.invoke_model.call_count == MAX_RETRIES
 
+    @patch("backend.lib.bedrock_client.random.uniform", side_effect=_max_jitter)
     @patch("backend.lib.bedrock_client.time.sleep")
-    def test_exponential_backoff_delays(self, mock_sleep):
+    def test_exponential_backoff_delays(self, mock_sleep, _mock_uniform):
         with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
             mock_client = MagicMock()
             mock_boto3.client.return_value = mock_client
@@ -156,3 +259,511 @@ class TestRetryLogic:
 
             assert exc_info.value.response["Error"]["Code"] == "ValidationException"
             assert mock_client.invoke_model.call_count == 1
+
+
+class TestRetryJitterBudgetDeadline:
+    """Full-jitter backoff, per-container retry budget and Lambda deadline propagation."""
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_sleep_uses_full_jitter_within_cap(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            _make_client_error("ThrottlingException"),
+            _make_client_error("ThrottlingException"),
+            _make_bedrock_response({"ok": True}),
+        ]
+        set_client(stub)
+
+        with patch("backend.lib.bedrock_client.random.uniform", return_value=0.3) as mock_uniform:
+            invoke_claude("sys", "user")
+
+        assert [c.args for c in mock_uniform.call_args_list] == [(0, 1), (0, 2)]
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [0.3, 0.3]
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_backoff_is_capped_at_max_delay(self, mock_sleep):
+        from backend.lib.bedrock_client import _backoff_delay
+
+        with patch("backend.lib.bedrock_client.random.uniform", side_effect=_max_jitter):
+            assert _backoff_delay(10) == MAX_DELAY
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_exhausted_budget_stops_retrying(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = _make_client_error("ThrottlingException")
+        set_client(stub)
+
+        # Drain the budget: each failing call spends up to MAX_RETRIES - 1 tokens
+        calls = 0
+        while calls < RETRY_BUDGET_CAPACITY:
+            with pytest.raises(ClientError):
+                invoke_claude("sys", "user")
+            calls += 1
+
+        stub.invoke_model.reset_mock()
+        mock_sleep.reset_mock()
+        with pytest.raises(ClientError):
+            invoke_claude("sys", "user")
+
+        assert stub.invoke_model.call_count == 1
+        mock_sleep.assert_not_called()
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_success_refills_budget(self, mock_sleep):
+        stub = MagicMock()
+        set_client(stub)
+
+        stub.invoke_model.side_effect = _make_client_error("ThrottlingException")
+        for _ in range(int(RETRY_BUDGET_CAPACITY)):
+            with pytest.raises(ClientError):
+                invoke_claude("sys", "user")
+
+        stub.invoke_model.side_effect = None
+        stub.invoke_model.return_value = _make_bedrock_response({"ok": True})
+        # RETRY_REFUND per success; a few extra calls absorb float rounding
+        for _ in range(12):
+            invoke_claude("sys", "user")
+
+        stub.invoke_model.side_effect = [
+            _make_client_error("ThrottlingException"),
+            _make_bedrock_response({"ok": True}),
+        ]
+        assert invoke_claude("sys", "user") == {"ok": True}
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_does_not_sleep_past_lambda_deadline(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = _make_client_error("ThrottlingException")
+        set_client(stub)
+
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 2500
+        set_deadline(context)
+
+        with patch("backend.lib.bedrock_client.random.uniform", return_value=1.0):
+            with pytest.raises(ClientError):
+                invoke_claude("sys", "user")
+
+        assert stub.invoke_model.call_count == 1
+        mock_sleep.assert_not_called()
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_retries_when_deadline_allows(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            _make_client_error("ThrottlingException"),
+            _make_bedrock_response({"ok": True}),
+        ]
+        set_client(stub)
+
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 55_000
+        set_deadline(context)
+
+        assert invoke_claude("sys", "user") == {"ok": True}
+        assert mock_sleep.call_count == 1
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_read_timeout_is_retried(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            ReadTimeoutError(endpoint_url="https://x"),
+            _make_bedrock_response({"ok": True}),
+        ]
+        set_client(stub)
+
+        assert invoke_claude("sys", "user") == {"ok": True}
+        assert stub.invoke_model.call_count == 2
+
+    def test_read_timeout_is_capped_by_deadline(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        set_deadline(context, max_seconds=29)
+
+        with patch("backend.lib.bedrock_client.boto3") as mock_boto3:
+            get_client("ap-northeast-1")
+
+        # 残り約27秒（安全マージン控除後）を5秒刻みで切り下げる
+        assert mock_boto3.client.call_args[1]["config"].read_timeout == 25
+
+    def test_set_deadline_caps_remaining_time(self):
+        from backend.lib.bedrock_client import remaining_time
+
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        set_deadline(context, max_seconds=29)
+
+        assert 26 < remaining_time() <= 27
+
+    def test_set_deadline_ignores_missing_context(self):
+        from backend.lib.bedrock_client import remaining_time
+
+        set_deadline(None)
+        assert remaining_time() is None
+
+    def test_set_deadline_without_context_uses_max_seconds(self):
+        from backend.lib.bedrock_client import remaining_time
+
+        set_deadline(None, max_seconds=60)
+
+        assert 57 < remaining_time() <= 58
+
+    def test_botocore_retries_are_disabled(self):
+        assert CLIENT_CONFIG.retries == {"max_attempts": 1, "mode": "standard"}
+
+
+class TestInvokeClaudeStream:
+    """Streaming variant yields text deltas from invoke_model_with_response_stream."""
+
+    @staticmethod
+    def _chunk(data: dict) -> dict:
+        return {"chunk": {"bytes": json.dumps(data).encode()}}
+
+    def test_yields_text_deltas_only(self):
+        stub = MagicMock()
+        stub.invoke_model_with_response_stream.return_value = {"body": iter([
+            self._chunk({"type": "message_start", "message": {}}),
+            self._chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}}),
+            self._chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "lo"}}),
+            self._chunk({"type": "message_stop"}),
+        ])}
+        set_client(stub)
+
+        assert list(invoke_claude_stream("sys", "user")) == ["Hel", "lo"]
+        call_kwargs = stub.invoke_model_with_response_stream.call_args[1]
+        assert call_kwargs["modelId"] == MODEL_ID
+        assert json.loads(call_kwargs["body"])["system"][0]["text"] == "sys"
+
+    @patch("backend.lib.bedrock_client.time.sleep")
+    def test_retries_stream_start_on_throttling(self, mock_sleep):
+        stub = MagicMock()
+        stub.invoke_model_with_response_stream.side_effect = [
+            _make_client_error("ThrottlingException"),
+            {"body": iter([self._chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "ok"}})])},
+        ]
+        set_client(stub)
+
+        assert list(invoke_claude_stream("sys", "user")) == ["ok"]
+        assert stub.invoke_model_with_response_stream.call_count == 2
+
+
+class TestEndpointFailover:
+    """Multi-region / multi-model routing through bedrock_router."""
+
+    ENDPOINTS = "ap-northeast-1:model-a,us-east-1:model-b"
+
+    def _clients_by_region(self, mock_boto3):
+        clients = {}
+
+        def make_client(service, region_name, config):
+            clients.setdefault(region_name, MagicMock())
+            return clients[region_name]
+
+        mock_boto3.client.side_effect = make_client
+        return clients
+
+    def test_fails_over_to_next_region_without_sleeping(self):
+        with patch.dict(os.environ, {"BEDROCK_ENDPOINTS": self.ENDPOINTS}), \
+                patch("backend.lib.bedrock_client.boto3") as mock_boto3, \
+                patch("backend.lib.bedrock_client.time.sleep") as mock_sleep:
+            clients = self._clients_by_region(mock_boto3)
+            get_client("ap-northeast-1").invoke_model.side_effect = _make_client_error("ThrottlingException")
+            get_client("us-east-1").invoke_model.return_value = _make_bedrock_response({"ok": True})
+
+            assert invoke_claude("sys", "user") == {"ok": True}
+
+            assert clients["us-east-1"].invoke_model.call_args[1]["modelId"] == "model-b"
+            mock_sleep.assert_not_called()
+
+    def test_role_config_fails_over_to_region_specific_profile(self):
+        from backend.lib.model_config import get_call_config
+
+        env = {"BEDROCK_ENDPOINTS": "ap-northeast-1:apac.model,us-east-1:us.model"}
+        with patch.dict(os.environ, env), \
+                patch("backend.lib.bedrock_client.boto3") as mock_boto3, \
+                patch("backend.lib.bedrock_client.time.sleep"):
+            clients = self._clients_by_region(mock_boto3)
+            get_client("ap-northeast-1").invoke_model.side_effect = _make_client_error("ThrottlingException")
+            get_client("us-east-1").invoke_model.return_value = _make_bedrock_response({"ok": True})
+            config = {k: v for k, v in get_call_config(4, "grader").items() if k != "tool"}
+
+            assert invoke_claude("sys", "user", **config) == {"ok": True}
+
+            assert clients["ap-northeast-1"].invoke_model.call_args[1]["modelId"] == "apac.model"
+            assert clients["us-east-1"].invoke_model.call_args[1]["modelId"] == "us.model"
+
+    def test_connection_error_fails_over_to_next_region(self):
+        with patch.dict(os.environ, {"BEDROCK_ENDPOINTS": self.ENDPOINTS}), \
+                patch("backend.lib.bedrock_client.boto3") as mock_boto3, \
+                patch("backend.lib.bedrock_client.time.sleep") as mock_sleep:
+            clients = self._clients_by_region(mock_boto3)
+            get_client("ap-northeast-1").invoke_model.side_effect = EndpointConnectionError(endpoint_url="https://x")
+            get_client("us-east-1").invoke_model.return_value = _make_bedrock_response({"ok": True})
+
+            assert invoke_claude("sys", "user") == {"ok": True}
+
+            clients["us-east-1"].invoke_model.assert_called_once()
+            mock_sleep.assert_not_called()
+
+    def test_non_retryable_error_does_not_fail_over(self):
+        with patch.dict(os.environ, {"BEDROCK_ENDPOINTS": self.ENDPOINTS}), \
+                patch("backend.lib.bedrock_client.boto3") as mock_boto3:
+            clients = self._clients_by_region(mock_boto3)
+            get_client("ap-northeast-1").invoke_model.side_effect = _make_client_error("ValidationException")
+
+            with pytest.raises(ClientError):
+                invoke_claude("sys", "user")
+
+            assert "us-east-1" not in clients
+
+    def test_reviewer_fallback_model_is_tried_last(self):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            _make_client_error("ThrottlingException"),
+            _make_bedrock_response({"ok": True}),
+        ]
+        set_client(stub)
+
+        assert invoke_claude("sys", "user", fallback_model_id="small-model") == {"ok": True}
+
+        model_ids = [c[1]["modelId"] for c in stub.invoke_model.call_args_list]
+        assert model_ids == [MODEL_ID, "small-model"]
+
+    def test_reviewer_fallback_model_reads_env(self):
+        from backend.lib.bedrock_client import get_reviewer_fallback_model_id
+
+        with patch.dict(os.environ, {"BEDROCK_REVIEWER_FALLBACK_MODEL_ID": "small-model"}):
+            assert get_reviewer_fallback_model_id() == "small-model"
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_reviewer_fallback_model_id() is None
+
+
+class TestCallSiteOverrides:
+    """model_id / temperature supplied per call site (see model_config)."""
+
+    def test_model_id_and_temperature_are_sent(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({"ok": True})
+        set_client(stub)
+
+        invoke_claude("sys", "user", max_tokens=128, model_id="small-model", temperature=0.0)
+
+        call_kwargs = stub.invoke_model.call_args[1]
+        body = json.loads(call_kwargs["body"])
+        assert call_kwargs["modelId"] == "small-model"
+        assert body["max_tokens"] == 128
+        assert body["temperature"] == 0.0
+
+
+class TestStructuredOutput:
+    """A tool definition forces tool_use output that parse_json_response returns as-is."""
+
+    TOOL = {"name": "submit_grade", "description": "d", "input_schema": {"type": "object"}}
+
+    def test_tool_is_forced_with_tool_choice(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({"content": []})
+        set_client(stub)
+
+        invoke_claude("sys", "user", tool=self.TOOL)
+
+        body = json.loads(stub.invoke_model.call_args[1]["body"])
+        assert body["tools"] == [self.TOOL]
+        assert body["tool_choice"] == {"type": "tool", "name": "submit_grade"}
+
+    def test_no_tool_keeps_plain_request(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = _make_bedrock_response({"content": []})
+        set_client(stub)
+
+        invoke_claude("sys", "user")
+
+        body = json.loads(stub.invoke_model.call_args[1]["body"])
+        assert "tools" not in body
+        assert "tool_choice" not in body
+
+    def test_parse_json_response_prefers_tool_input(self):
+        result = {"content": [
+            {"type": "text", "text": "Here is the grade:"},
+            {"type": "tool_use", "name": "submit_grade", "input": {"passed": True, "score": 90}},
+        ]}
+        assert parse_json_response(result) == {"passed": True, "score": 90}
+
+    def test_parse_json_response_falls_back_to_fenced_text(self):
+        result = {"content": [{"type": "text", "text": '```json\n{"score": 1}\n```'}]}
+        assert parse_json_response(result) == {"score": 1}
+
+    def test_parse_json_response_raises_on_invalid_text(self):
+        with pytest.raises(json.JSONDecodeError):
+            parse_json_response({"content": [{"type": "text", "text": "not json"}]})
+
+    def test_stream_yields_tool_input_json_deltas(self):
+        chunk = TestInvokeClaudeStream._chunk
+        stub = MagicMock()
+        stub.invoke_model_with_response_stream.return_value = {"body": iter([
+            chunk({"type": "content_block_delta", "delta": {"type": "input_json_delta", "partial_json": '{"feed'}}),
+            chunk({"type": "content_block_delta", "delta": {"type": "input_json_delta", "partial_json": 'back": "x"}'}}),
+        ])}
+        set_client(stub)
+
+        assert "".join(invoke_claude_stream("sys", "user", tool=self.TOOL)) == '{"feedback": "x"}'
+
+
+class TestMaxTokensContinuation:
+    """Text responses truncated by max_tokens are continued with an assistant prefill."""
+
+    @staticmethod
+    def _text_response(text: str, stop_reason: str, output_tokens: int = 10) -> dict:
+        return _make_bedrock_response({
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "usage": {"input_tokens": 5, "output_tokens": output_tokens},
+        })
+
+    def test_stitches_continuations_until_complete(self):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            self._text_response('{"questions": [{"step": 1, ', "max_tokens"),
+            self._text_response('"prompt": "設問"}', "max_tokens"),
+            self._text_response("]}", "end_turn", output_tokens=2),
+        ]
+        set_client(stub)
+
+        result = invoke_claude("sys", "user")
+
+        assert json.loads(result["content"][0]["text"]) == {"questions": [{"step": 1, "prompt": "設問"}]}
+        assert result["stop_reason"] == "end_turn"
+        assert result["continuations"] == 2
+        assert result["usage"] == {"input_tokens": 15, "output_tokens": 22}
+        second = json.loads(stub.invoke_model.call_args_list[1][1]["body"])
+        # 末尾の空白を除いた部分出力がプレフィルとして渡される
+        assert second["messages"][-1] == {
+            "role": "assistant", "content": [{"type": "text", "text": '{"questions": [{"step": 1,'}],
+        }
+
+    def test_stops_at_continuation_cap(self):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [self._text_response("a", "max_tokens") for _ in range(3)]
+        set_client(stub)
+
+        with patch.dict(os.environ, {"BEDROCK_MAX_CONTINUATIONS": "1"}):
+            result = invoke_claude("sys", "user")
+
+        assert stub.invoke_model.call_count == 2
+        assert result["stop_reason"] == "max_tokens"
+        assert result["content"][0]["text"] == "aa"
+
+    def test_zero_disables_continuation(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = self._text_response("a", "max_tokens")
+        set_client(stub)
+
+        with patch.dict(os.environ, {"BEDROCK_MAX_CONTINUATIONS": "0"}):
+            result = invoke_claude("sys", "user")
+
+        stub.invoke_model.assert_called_once()
+        assert "continuations" not in result
+
+    def test_no_continuation_near_deadline(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = self._text_response("a", "max_tokens")
+        set_client(stub)
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 4000
+        set_deadline(context)
+
+        invoke_claude("sys", "user")
+
+        stub.invoke_model.assert_called_once()
+
+    TOOL = {"name": "submit_grade", "input_schema": {"type": "object"}}
+
+    @staticmethod
+    def _tool_response(stop_reason: str) -> dict:
+        return _make_bedrock_response({
+            "content": [{"type": "tool_use", "name": "submit_grade", "input": {"score": 1}}],
+            "stop_reason": stop_reason,
+        })
+
+    def test_truncated_tool_call_is_retried_with_larger_max_tokens(self):
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [self._tool_response("max_tokens"), self._tool_response("tool_use")]
+        set_client(stub)
+
+        result = invoke_claude("sys", "user", max_tokens=3000, tool=self.TOOL)
+
+        assert result["stop_reason"] == "tool_use"
+        bodies = [json.loads(c[1]["body"]) for c in stub.invoke_model.call_args_list]
+        assert [b["max_tokens"] for b in bodies] == [3000, 6000]
+        # ツール呼び出しはプレフィルで続けない
+        assert bodies[1]["messages"] == bodies[0]["messages"]
+
+    def test_tool_retry_is_capped(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = self._tool_response("max_tokens")
+        set_client(stub)
+
+        invoke_claude("sys", "user", max_tokens=6000, tool=self.TOOL)
+
+        assert stub.invoke_model.call_count == 2
+        assert json.loads(stub.invoke_model.call_args_list[1][1]["body"])["max_tokens"] == MAX_TOOL_RETRY_TOKENS
+
+    def test_tool_call_at_cap_is_not_retried(self):
+        stub = MagicMock()
+        stub.invoke_model.return_value = self._tool_response("max_tokens")
+        set_client(stub)
+
+        invoke_claude("sys", "user", max_tokens=MAX_TOOL_RETRY_TOKENS, tool=self.TOOL)
+
+        stub.invoke_model.assert_called_once()
+
+    def test_deployed_flags_continue_truncated_question_sets(self):
+        """With the serverless.yml flags the generator stays in text mode, so truncation is continued."""
+        stub = MagicMock()
+        stub.invoke_model.side_effect = [
+            self._text_response('{"questions": [', "max_tokens"),
+            self._text_response("]}", "end_turn"),
+        ]
+        set_client(stub)
+        deployed = {"BEDROCK_STRUCTURED_OUTPUT": "true", "BEDROCK_MAX_CONTINUATIONS": "2"}
+
+        with patch.dict(os.environ, deployed):
+            os.environ.pop("BEDROCK_STRUCTURED_OUTPUT_GENERATOR", None)
+            config = get_call_config(4, "generator")
+            result = invoke_claude("sys", "user", **config)
+
+        assert "tool" not in config
+        assert result["continuations"] == 1
+        assert json.loads(result["content"][0]["text"]) == {"questions": []}
+
+    def test_stream_continues_after_max_tokens(self):
+        chunk = TestInvokeClaudeStream._chunk
+        stub = MagicMock()
+        stub.invoke_model_with_response_stream.side_effect = [
+            {"body": iter([
+                chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "前半 "}}),
+                chunk({"type": "message_delta", "delta": {"stop_reason": "max_tokens"}}),
+            ])},
+            {"body": iter([
+                chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "後半"}}),
+                chunk({"type": "message_delta", "delta": {"stop_reason": "end_turn"}}),
+            ])},
+        ]
+        set_client(stub)
+
+        # 末尾の空白は返さずに保留し、返した出力とプレフィルを一致させる
+        assert list(invoke_claude_stream("sys", "user")) == ["前半", "後半"]
+        second = json.loads(stub.invoke_model_with_response_stream.call_args_list[1][1]["body"])
+        assert second["messages"][-1]["content"][0]["text"] == "前半"
+
+    def test_stream_flushes_trailing_whitespace_when_complete(self):
+        chunk = TestInvokeClaudeStream._chunk
+        stub = MagicMock()
+        stub.invoke_model_with_response_stream.return_value = {"body": iter([
+            chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "a "}}),
+            chunk({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "b\n"}}),
+            chunk({"type": "message_delta", "delta": {"stop_reason": "end_turn"}}),
+        ])}
+        set_client(stub)
+
+        assert list(invoke_claude_stream("sys", "user")) == ["a", " b", "\n"]
@@ -0,0 +1,77 @@
+"""Unit tests for backend/lib/bedrock_router.py"""
+
+from unittest.mock import patch
+
+from backend.lib.bedrock_router import (
+    COOLDOWN_SECONDS, DEFAULT_MODEL_ID, EWMA_ALPHA, FAILURE_THRESHOLD,
+    EndpointRouter, get_configured_endpoints, parse_endpoints,
+)
+
+TOKYO = ("ap-northeast-1", "global.anthropic.claude-sonnet-4-6")
+VIRGINIA = ("us-east-1", "us.anthropic.claude-sonnet-4-6")
+
+
+class TestParseEndpoints:
+    def test_parses_ordered_region_model_pairs(self):
+        raw = "ap-northeast-1:global.anthropic.claude-sonnet-4-6, us-east-1:us.anthropic.claude-sonnet-4-6"
+        assert parse_endpoints(raw) == [TOKYO, VIRGINIA]
+
+    def test_model_id_may_contain_colons(self):
+        raw = "us-west-2:global.anthropic.claude-haiku-4-5-20251001-v1:0"
+        assert parse_endpoints(raw) == [("us-west-2", "global.anthropic.claude-haiku-4-5-20251001-v1:0")]
+
+    def test_missing_model_uses_bedrock_model_id(self):
+        with patch.dict("os.environ", {"BEDROCK_MODEL_ID": "custom-model"}):
+            assert parse_endpoints("us-east-1") == [("us-east-1", "custom-model")]
+
+    def test_defaults_to_single_endpoint(self):
+        with patch.dict("os.environ", {}, clear=True):
+            assert get_configured_endpoints() == [("ap-northeast-1", DEFAULT_MODEL_ID)]
+
+    def test_reads_bedrock_endpoints_env(self):
+        with patch.dict("os.environ", {"BEDROCK_ENDPOINTS": "us-east-1:m1,eu-west-1:m2"}):
+            assert get_configured_endpoints() == [("us-east-1", "m1"), ("eu-west-1", "m2")]
+
+
+class TestEndpointRouter:
+    def test_unmeasured_endpoints_keep_configured_order(self):
+        router = EndpointRouter()
+        assert router.order([TOKYO, VIRGINIA]) == [TOKYO, VIRGINIA]
+
+    def test_prefers_fastest_measured_endpoint(self):
+        router = EndpointRouter()
+        router.record_success(TOKYO, 3.0)
+        router.record_success(VIRGINIA, 1.0)
+        assert router.order([TOKYO, VIRGINIA]) == [VIRGINIA, TOKYO]
+
+    def test_latency_is_ewma(self):
+        router = EndpointRouter()
+        router.record_success(TOKYO, 1.0)
+        router.record_success(TOKYO, 2.0)
+        expected = EWMA_ALPHA * 2.0 + (1 - EWMA_ALPHA) * 1.0
+        assert router.snapshot()[TOKYO]["ewma_latency"] == expected
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        router = EndpointRouter()
+        for _ in range(FAILURE_THRESHOLD):
+            router.record_failure(TOKYO)
+        assert router.order([TOKYO, VIRGINIA]) == [VIRGINIA, TOKYO]
+
+    def test_success_resets_failures(self):
+        router = EndpointRouter()
+        for _ in range(FAILURE_THRESHOLD - 1):
+            router.record_failure(TOKYO)
+        router.record_success(TOKYO, 1.0)
+        router.record_failure(TOKYO)
+        assert router.order([TOKYO, VIRGINIA])[0] == TOKYO
+
+    def test_circuit_half_opens_after_cooldown(self):
+        router = EndpointRouter()
+        with patch("backend.lib.bedrock_router.time.monotonic", return_value=100.0):
+            for _ in range(FAILURE_THRESHOLD):
+                router.record_failure(TOKYO)
+        with patch("backend.lib.bedrock_router.time.monotonic", return_value=100.0 + COOLDOWN_SECONDS + 1):
+            assert router.order([TOKYO, VIRGINIA]) == [TOKYO, VIRGINIA]
+            # ハーフオープン中の失敗は即座に再びサーキットを開く
+            router.record_failure(TOKYO)
+            assert router.order([TOKYO, VIRGINIA]) == [VIRGINIA, TOKYO]
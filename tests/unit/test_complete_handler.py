@@ -6,6 +6,7 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 from backend.handlers.complete_handler import handler, _validate_body
+from backend.lib.levels import build_levels
 
 
 def _api_event(body: dict) -> dict:
@@ -60,13 +61,32 @@ class TestHandler:
         assert "record_id" in data
 
     @patch("backend.handlers.complete_handler._get_dynamodb_resource")
-    def test_saves_to_results_and_progress_tables(self, mock_ddb):
-        mock_table = MagicMock()
-        mock_ddb.return_value.Table.return_value = mock_table
+    def test_saves_result_and_progress_in_one_transaction(self, mock_ddb):
+        mock_client = mock_ddb.return_value.meta.client
+
+        handler(_api_event(VALID_BODY), None)
 
+        assert mock_client.transact_write_items.call_count == 1
+        items = mock_client.transact_write_items.call_args[1]["TransactItems"]
+        assert items[0]["Put"]["TableName"] == "ai-levels-results"
+        assert items[0]["Put"]["Item"]["SK"] == {"S": "RESULT#lv1"}
+        assert items[1]["Update"]["TableName"] == "ai-levels-progress"
+        mock_ddb.return_value.Table.return_value.put_item.assert_not_called()
+
+    @patch("backend.handlers.complete_handler._get_dynamodb_resource")
+    def test_progress_update_only_sets_lv1_flag(self, mock_ddb):
         handler(_api_event(VALID_BODY), None)
 
-        assert mock_table.put_item.call_count == 2
+        update = mock_ddb.return_value.meta.client.transact_write_items.call_args[1]["TransactItems"][1]["Update"]
+        assert update["ExpressionAttributeNames"] == {"#flag": "lv1_passed"}
+        assert "lv2_passed" not in update["UpdateExpression"]
+
+    @patch("backend.handlers.complete_handler._get_dynamodb_resource")
+    def test_failed_attempt_does_not_downgrade_passed_level(self, mock_ddb):
+        handler(_api_event({**VALID_BODY, "final_passed": False}), None)
+
+        update = mock_ddb.return_value.meta.client.transact_write_items.call_args[1]["TransactItems"][1]["Update"]
+        assert "if_not_exists(#flag, :passed)" in update["UpdateExpression"]
 
     def test_returns_400_for_invalid_json(self):
         resp = handler({"body": "not json"}, None)
@@ -88,12 +108,10 @@ class TestHandler:
     def test_returns_500_on_dynamodb_error(self, mock_ddb):
         from botocore.exceptions import ClientError
 
-        mock_table = MagicMock()
-        mock_table.put_item.side_effect = ClientError(
+        mock_ddb.return_value.meta.client.transact_write_items.side_effect = ClientError(
             {"Error": {"Code": "InternalServerError", "Message": "fail"}},
-            "PutItem",
+            "TransactWriteItems",
         )
-        mock_ddb.return_value.Table.return_value = mock_table
 
         resp = handler(_api_event(VALID_BODY), None)
         assert resp["statusCode"] == 500
@@ -107,3 +125,41 @@ class TestHandler:
 
         resp = handler(_api_event(VALID_BODY), None)
         assert resp["headers"]["Access-Control-Allow-Origin"] == "*"
+
+
+class TestLevelsInResponse:
+    @patch("backend.handlers.complete_handler._get_dynamodb_resource")
+    def test_returns_levels_without_reading_back(self, mock_ddb):
+        mock_table = MagicMock()
+        mock_ddb.return_value.Table.return_value = mock_table
+
+        resp = handler(_api_event(VALID_BODY), None)
+
+        data = json.loads(resp["body"])
+        assert data["levels"] == build_levels(True, False, False, False)
+        mock_table.get_item.assert_not_called()
+
+    @patch("backend.handlers.lv3_complete_handler._get_dynamodb_resource")
+    def test_earlier_levels_are_passed(self, mock_ddb):
+        from backend.handlers.lv3_complete_handler import handler as lv3_handler
+
+        data = json.loads(lv3_handler(_api_event(VALID_BODY), None)["body"])
+
+        assert data["levels"] == build_levels(True, True, True, False)
+
+    @patch("backend.handlers.lv4_complete_handler._get_dynamodb_resource")
+    def test_last_level_passes_everything(self, mock_ddb):
+        from backend.handlers.lv4_complete_handler import handler as lv4_handler
+
+        data = json.loads(lv4_handler(_api_event(VALID_BODY), None)["body"])
+
+        assert data["levels"] == build_levels(True, True, True, True)
+
+    @patch("backend.handlers.lv2_complete_handler._get_dynamodb_resource")
+    def test_failed_completion_keeps_level_unpassed(self, mock_ddb):
+        from backend.handlers.lv2_complete_handler import handler as lv2_handler
+
+        data = json.loads(lv2_handler(_api_event({**VALID_BODY, "final_passed": False}), None)["body"])
+
+        assert data["saved"] is True
+        assert data["levels"] == build_levels(True, False, False, False)
@@ -0,0 +1,42 @@
+"""Unit tests for backend/lib/dynamodb.py"""
+
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from backend.lib.dynamodb import CLIENT_CONFIG, get_resource, reset_resource
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    reset_resource()
+    yield
+    reset_resource()
+
+
+class TestGetResource:
+    @patch("backend.lib.dynamodb.boto3")
+    def test_resource_is_created_once(self, mock_boto3):
+        get_resource()
+        get_resource()
+
+        mock_boto3.resource.assert_called_once_with("dynamodb", region_name="ap-northeast-1", config=CLIENT_CONFIG)
+
+    @patch("backend.lib.dynamodb.boto3")
+    def test_tables_are_cached_by_name(self, mock_boto3):
+        mock_boto3.resource.return_value.Table.side_effect = lambda name: MagicMock(name=name)
+
+        resource = get_resource()
+        progress = resource.Table("ai-levels-progress")
+
+        assert resource.Table("ai-levels-progress") is progress
+        assert resource.Table("ai-levels-results") is not progress
+        assert mock_boto3.resource.return_value.Table.call_count == 2
+
+    @patch("backend.lib.dynamodb.boto3")
+    def test_other_attributes_are_delegated(self, mock_boto3):
+        assert get_resource().meta is mock_boto3.resource.return_value.meta
+
+    def test_client_config_uses_standard_retries(self):
+        assert CLIENT_CONFIG.retries == {"max_attempts": 3, "mode": "standard"}
+        assert CLIENT_CONFIG.max_pool_connections == 10
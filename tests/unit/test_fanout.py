@@ -0,0 +1,171 @@
+"""Unit tests for backend/lib/fanout.py"""
+
+import json
+import re
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.handlers import lv4_generate_handler
+from backend.lib.bedrock_client import set_deadline
+from backend.lib.fanout import (
+    SKELETON_SYSTEM_PROMPT, STEP_SYSTEM_PROMPT, GenerationDeadlineError, build_step_prompt, generate_fanout,
+)
+
+STEP_TYPE_MAP = {1: "scenario", 2: "free_text", 3: "scenario"}
+
+
+@pytest.fixture(autouse=True)
+def _reset_deadline():
+    set_deadline(None)
+    yield
+    set_deadline(None)
+
+
+def _context(remaining_ms: int) -> MagicMock:
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = remaining_ms
+    return context
+
+
+def _validate(i, q):
+    if q.get("step") != i + 1 or q.get("type") != STEP_TYPE_MAP[i + 1]:
+        raise ValueError(f"Question {i} is invalid")
+    return {"step": q["step"], "type": q["type"], "prompt": q["prompt"], "context": q.get("context")}
+
+
+def _text(data: dict) -> dict:
+    return {"content": [{"text": json.dumps(data, ensure_ascii=False)}], "stop_reason": "end_turn"}
+
+
+def _fake_invoke(bad_steps=()):
+    """骨子の呼び出しとステップごとの呼び出しに応答するスタブ。bad_steps は不正な type を返す。"""
+    calls = []
+    lock = threading.Lock()
+
+    def invoke(system_prompt, user_prompt, **kwargs):
+        with lock:
+            calls.append((system_prompt, user_prompt))
+        m = re.search(r"ステップ(\d+)の設問のみ", user_prompt)
+        if m is None:
+            return _text({"scenario": "架空の製造業A社"})
+        step = int(m.group(1))
+        q_type = "multiple_choice" if step in bad_steps else STEP_TYPE_MAP[step]
+        return _text({"questions": [{"step": step, "type": q_type, "prompt": f"設問{step}", "context": "A社"}]})
+
+    return invoke, calls
+
+
+class TestGenerateFanout:
+    def test_generates_skeleton_then_each_step(self):
+        invoke, calls = _fake_invoke()
+        with patch("backend.lib.fanout.invoke_claude", side_effect=invoke):
+            questions = generate_fanout(3, "sys", "s1", STEP_TYPE_MAP, _validate)
+
+        assert [q["step"] for q in questions] == [1, 2, 3]
+        assert [q["type"] for q in questions] == ["scenario", "free_text", "scenario"]
+        assert len(calls) == 4
+        assert calls[0][0] == SKELETON_SYSTEM_PROMPT
+        assert "s1" in calls[0][1] and "sys" in calls[0][1]
+        assert all(system == STEP_SYSTEM_PROMPT for system, _ in calls[1:])
+        assert all("架空の製造業A社" in user and "sys" in user for _, user in calls[1:])
+
+    def test_invalid_step_is_retried_once(self):
+        invoke, calls = _fake_invoke(bad_steps={2})
+        attempts = {"n": 0}
+
+        def flaky(system_prompt, user_prompt, **kwargs):
+            if "ステップ2の設問のみ" in user_prompt:
+                attempts["n"] += 1
+                if attempts["n"] > 1:
+                    return _fake_invoke()[0](system_prompt, user_prompt)
+            return invoke(system_prompt, user_prompt)
+
+        with patch("backend.lib.fanout.invoke_claude", side_effect=flaky):
+            questions = generate_fanout(3, "sys", "s1", STEP_TYPE_MAP, _validate)
+
+        assert questions[1]["type"] == "free_text"
+        assert attempts["n"] == 2
+
+    def test_still_invalid_raises(self):
+        invoke, _ = _fake_invoke(bad_steps={3})
+        with patch("backend.lib.fanout.invoke_claude", side_effect=invoke):
+            with pytest.raises(ValueError, match="still invalid"):
+                generate_fanout(3, "sys", "s1", STEP_TYPE_MAP, _validate)
+
+    def test_step_retry_is_skipped_near_deadline(self):
+        invoke, calls = _fake_invoke(bad_steps={2})
+        set_deadline(_context(9000))
+
+        with patch("backend.lib.fanout.invoke_claude", side_effect=invoke):
+            with pytest.raises(GenerationDeadlineError):
+                generate_fanout(3, "sys", "s1", STEP_TYPE_MAP, _validate)
+
+        assert len(calls) == 4
+
+    def test_empty_skeleton_raises(self):
+        with patch("backend.lib.fanout.invoke_claude", return_value=_text({"scenario": ""})):
+            with pytest.raises(ValueError, match="skeleton"):
+                generate_fanout(3, "sys", "s1", STEP_TYPE_MAP, _validate)
+
+    def test_step_prompt_includes_spec_skeleton_and_type(self):
+        prompt = build_step_prompt("Lv3の仕様", "A社の概要", 5, "scenario")
+        assert "Lv3の仕様" in prompt
+        assert "A社の概要" in prompt
+        assert 'typeは"scenario"' in prompt
+
+
+class TestLv4FanoutIntegration:
+    def test_handler_falls_back_to_single_call(self):
+        questions = [
+            {"step": s, "type": t, "prompt": f"設問{s}", "options": None, "context": "文脈"}
+            for s, t in lv4_generate_handler.STEP_TYPE_MAP.items()
+        ]
+        with (
+            patch.dict("os.environ", {"GENERATE_FANOUT_ENABLED": "true"}),
+            patch("backend.lib.fanout.invoke_claude", return_value=_text({"scenario": ""})),
+            patch("backend.handlers.lv4_generate_handler.invoke_claude", return_value=_text({"questions": questions})) as single,
+        ):
+            result = lv4_generate_handler._generate_questions("s1")
+
+        single.assert_called_once()
+        assert len(result) == 6
+
+    def test_fanout_disabled_by_default(self):
+        with patch("backend.handlers.lv4_generate_handler.generate_fanout") as fanout, \
+                patch("backend.handlers.lv4_generate_handler.invoke_claude") as single:
+            single.return_value = _text({"questions": [
+                {"step": s, "type": t, "prompt": "p", "options": None, "context": "c"}
+                for s, t in lv4_generate_handler.STEP_TYPE_MAP.items()
+            ]})
+            lv4_generate_handler._generate_questions("s1")
+
+        fanout.assert_not_called()
+
+    def test_handler_returns_retryable_error_without_time_for_fallback(self):
+        with (
+            patch.dict("os.environ", {"GENERATE_FANOUT_ENABLED": "true"}),
+            patch("backend.lib.fanout.invoke_claude", return_value=_text({"scenario": ""})),
+            patch("backend.handlers.lv4_generate_handler.invoke_claude") as single,
+        ):
+            resp = lv4_generate_handler.handler({"body": json.dumps({"session_id": "s1"})}, _context(15000))
+
+        assert resp["statusCode"] == 503
+        single.assert_not_called()
+
+    def test_handler_caps_deadline_to_api_gateway_timeout(self):
+        questions = [
+            {"step": s, "type": t, "prompt": f"設問{s}", "options": None, "context": "文脈"}
+            for s, t in lv4_generate_handler.STEP_TYPE_MAP.items()
+        ]
+        with (
+            patch.dict("os.environ", {"GENERATE_FANOUT_ENABLED": "true"}),
+            patch("backend.lib.fanout.invoke_claude", return_value=_text({"scenario": ""})),
+            patch("backend.handlers.lv4_generate_handler.invoke_claude", return_value=_text({"questions": questions})) as single,
+        ):
+            # Lambdaの残り時間は60秒でも、API Gatewayの29秒から見て1回での生成に戻せる
+            resp = lv4_generate_handler.handler({"body": json.dumps({"session_id": "s1"})}, _context(60000))
+
+        assert resp["statusCode"] == 200
+        single.assert_called_once()
@@ -1,11 +1,13 @@
 """Unit tests for backend/handlers/gate_handler.py"""
 
 import json
+import os
 from unittest.mock import patch, MagicMock
 
 import pytest
 
 from backend.handlers.gate_handler import handler, _build_levels
+from backend.lib import gate_cache
 
 VALID_SESSION_ID = "a1b2c3d4-e5f6-4a7b-8c9d-0e1f2a3b4c5d"
 
@@ -113,3 +115,92 @@ class TestHandler:
 
         resp = handler(_api_event(VALID_SESSION_ID), None)
         assert resp["headers"]["Access-Control-Allow-Origin"] == "*"
+
+
+def _progress_table(item=None):
+    mock_table = MagicMock()
+    mock_table.get_item.return_value = {"Item": item} if item else {}
+    return mock_table
+
+
+class TestConditionalGet:
+    ITEM = {"lv1_passed": True, "updated_at": "2026-01-01T00:00:00+00:00"}
+
+    @patch("backend.handlers.gate_handler._get_dynamodb_resource")
+    def test_returns_etag_and_cache_headers(self, mock_ddb):
+        mock_ddb.return_value.Table.return_value = _progress_table(self.ITEM)
+
+        resp = handler(_api_event(VALID_SESSION_ID), None)
+
+        assert resp["headers"]["ETag"].startswith('"')
+        assert resp["headers"]["Cache-Control"] == "private, no-cache"
+        assert resp["headers"]["Access-Control-Expose-Headers"] == "ETag"
+
+    @patch("backend.handlers.gate_handler._get_dynamodb_resource")
+    def test_matching_if_none_match_returns_304(self, mock_ddb):
+        mock_ddb.return_value.Table.return_value = _progress_table(self.ITEM)
+        etag = handler(_api_event(VALID_SESSION_ID), None)["headers"]["ETag"]
+
+        event = {**_api_event(VALID_SESSION_ID), "headers": {"if-none-match": f"W/{etag}"}}
+        resp = handler(event, None)
+
+        assert resp["statusCode"] == 304
+        assert resp["body"] == ""
+        assert resp["headers"]["ETag"] == etag
+
+    @patch("backend.handlers.gate_handler._get_dynamodb_resource")
+    def test_etag_changes_when_progress_is_updated(self, mock_ddb):
+        mock_ddb.return_value.Table.return_value = _progress_table(self.ITEM)
+        etag = handler(_api_event(VALID_SESSION_ID), None)["headers"]["ETag"]
+
+        updated = {**self.ITEM, "lv2_passed": True, "updated_at": "2026-01-02T00:00:00+00:00"}
+        mock_ddb.return_value.Table.return_value = _progress_table(updated)
+        event = {**_api_event(VALID_SESSION_ID), "headers": {"If-None-Match": etag}}
+        resp = handler(event, None)
+
+        assert resp["statusCode"] == 200
+        assert json.loads(resp["body"])["levels"]["lv2"]["passed"] is True
+
+
+class TestGateCache:
+    @pytest.fixture(autouse=True)
+    def _enable_cache(self):
+        gate_cache.clear()
+        with patch.dict(os.environ, {"GATE_CACHE_TTL_SECONDS": "60"}):
+            yield
+        gate_cache.clear()
+
+    @patch("backend.handlers.gate_handler._get_dynamodb_resource")
+    def test_repeat_requests_skip_dynamodb(self, mock_ddb):
+        mock_table = _progress_table({"lv1_passed": True})
+        mock_ddb.return_value.Table.return_value = mock_table
+
+        handler(_api_event(VALID_SESSION_ID), None)
+        resp = handler(_api_event(VALID_SESSION_ID), None)
+
+        assert mock_table.get_item.call_count == 1
+        assert json.loads(resp["body"])["levels"]["lv2"]["unlocked"] is True
+
+    @patch("backend.handlers.gate_handler._get_dynamodb_resource")
+    def test_fresh_request_bypasses_cached_progress(self, mock_ddb):
+        mock_table = _progress_table({"lv1_passed": True})
+        mock_ddb.return_value.Table.return_value = mock_table
+        handler(_api_event(VALID_SESSION_ID), None)
+
+        # 別の関数（/lv2/complete）での書き込み
+        mock_table.get_item.return_value = {"Item": {"lv1_passed": True, "lv2_passed": True}}
+        stale = handler(_api_event(VALID_SESSION_ID), None)
+        event = _api_event(VALID_SESSION_ID)
+        event["queryStringParameters"]["fresh"] = "1"
+        fresh = handler(event, None)
+        cached = handler(_api_event(VALID_SESSION_ID), None)
+
+        assert json.loads(stale["body"])["levels"]["lv2"]["passed"] is False
+        assert json.loads(fresh["body"])["levels"]["lv2"]["passed"] is True
+        assert json.loads(cached["body"])["levels"]["lv2"]["passed"] is True
+        assert mock_table.get_item.call_count == 2
+
+    def test_ttl_zero_disables_cache(self):
+        with patch.dict(os.environ, {"GATE_CACHE_TTL_SECONDS": "0"}):
+            gate_cache.put(VALID_SESSION_ID, {"lv1_passed": True})
+        assert gate_cache.get(VALID_SESSION_ID) is None
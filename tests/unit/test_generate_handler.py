@@ -61,6 +61,19 @@ class TestHandler:
         assert resp["headers"]["Access-Control-Allow-Origin"] == "*"
 
 
+    @patch("backend.lib.question_store._get_dynamodb_resource")
+    @patch("backend.handlers.generate_handler.invoke_claude")
+    def test_returns_question_ids_when_store_enabled(self, mock_invoke, mock_ddb):
+        mock_invoke.return_value = _bedrock_response(VALID_QUESTIONS)
+
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "true"}):
+            resp = handler(_api_event({"session_id": "abc"}), None)
+
+        questions = json.loads(resp["body"])["questions"]
+        assert all(q["question_id"].endswith(f".{q['step']}") for q in questions)
+        mock_ddb.return_value.Table.return_value.put_item.assert_called_once()
+
+
 class TestParseQuestions:
     def test_valid_questions_parsed(self):
         result = _bedrock_response(VALID_QUESTIONS)
@@ -87,3 +100,60 @@ class TestParseQuestions:
         bad = [{"step": 1, "type": "free_text", "prompt": ""}]
         with pytest.raises(ValueError):
             _parse_questions(_bedrock_response(bad))
+
+    def test_multiple_choice_answer_key_is_parsed_for_the_store(self):
+        mc = {**VALID_QUESTIONS[0], "answer_index": 1, "rationales": ["why A", "why B"]}
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "true"}):
+            questions = _parse_questions(_bedrock_response([mc, *VALID_QUESTIONS[1:]]))
+
+        assert "answer_index" not in questions[0]
+        assert "rationales" not in questions[0]
+        assert questions[0]["answer_key"] == {"answer_index": 1, "rationales": ["why A", "why B"]}
+        assert "answer_key" not in questions[1]
+
+    def test_answer_key_omitted_without_question_store(self):
+        mc = {**VALID_QUESTIONS[0], "answer_index": 1, "rationales": ["why A", "why B"]}
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "false"}):
+            questions = _parse_questions(_bedrock_response([mc]))
+
+        assert "answer_key" not in questions[0]
+
+
+class TestAnswerKeyStaysServerSide:
+    @patch("backend.lib.question_store._get_dynamodb_resource")
+    @patch("backend.handlers.generate_handler.invoke_claude")
+    def test_key_is_stored_but_not_returned(self, mock_invoke, mock_ddb):
+        from backend.lib.question_store import clear_cache
+
+        clear_cache()
+        mc = {**VALID_QUESTIONS[0], "answer_index": 1, "rationales": ["why A", "why B"]}
+        mock_invoke.return_value = _bedrock_response([mc, *VALID_QUESTIONS[1:]])
+        table = mock_ddb.return_value.Table.return_value
+
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "true"}):
+            resp = handler(_api_event({"session_id": "abc-123"}), None)
+
+        assert resp["statusCode"] == 200
+        assert "why B" not in resp["body"]
+        assert "answer_key" not in resp["body"]
+        assert "why B" in table.put_item.call_args[1]["Item"]["questions_json"]
+        assert "answer_index" in mock_invoke.call_args[0][0]
+
+    @patch("backend.handlers.generate_handler.invoke_claude")
+    def test_key_is_not_requested_without_question_store(self, mock_invoke):
+        mock_invoke.return_value = _bedrock_response(VALID_QUESTIONS)
+
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "false"}):
+            handler(_api_event({"session_id": "abc-123"}), None)
+
+        assert mock_invoke.call_args[0][0] == SYSTEM_PROMPT
+        assert "answer_index" not in SYSTEM_PROMPT
+
+    @patch("backend.handlers.generate_handler.take_question_set")
+    def test_pooled_keys_are_not_returned_without_question_store(self, mock_take):
+        mock_take.return_value = [{**VALID_QUESTIONS[0], "answer_key": {"answer_index": 1, "rationales": ["a", "b"]}}]
+
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "false"}):
+            resp = handler(_api_event({"session_id": "abc-123"}), None)
+
+        assert "answer_key" not in resp["body"]
@@ -0,0 +1,177 @@
+"""Unit tests for backend/lib/grade_cache.py"""
+
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from backend.lib.grade_cache import (
+    cached_explanation,
+    cached_grade,
+    clear_cache,
+    lookup,
+    make_cache_key,
+    make_explanation_key,
+    store,
+)
+
+QUESTION = {"step": 1, "type": "free_text", "prompt": "AIの活用例を挙げてください"}
+GRADE = {"passed": True, "score": 80}
+REVIEW = {"feedback": "良い回答です", "explanation": "具体例が的確です"}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_cache()
+    with patch.dict(os.environ, {"GRADE_CACHE_ENABLED": "true", "GRADE_CACHE_DYNAMODB": "false"}):
+        yield
+    clear_cache()
+
+
+class TestMakeCacheKey:
+    def test_key_ignores_dict_ordering(self):
+        reordered = {"prompt": QUESTION["prompt"], "type": "free_text", "step": 1}
+        assert make_cache_key(1, 1, QUESTION, "回答") == make_cache_key(1, 1, reordered, "回答")
+
+    def test_key_depends_on_level_step_and_answer(self):
+        base = make_cache_key(1, 1, QUESTION, "回答")
+        assert make_cache_key(2, 1, QUESTION, "回答") != base
+        assert make_cache_key(1, 2, QUESTION, "回答") != base
+        assert make_cache_key(1, 1, QUESTION, "別の回答") != base
+
+
+class TestCachedGrade:
+    def test_second_call_is_served_from_cache(self):
+        compute = MagicMock(return_value=(GRADE, REVIEW))
+
+        with patch("backend.lib.grade_cache.resolve_passed", return_value=True):
+            first = cached_grade(1, 1, QUESTION, "回答", compute)
+            second = cached_grade(1, 1, QUESTION, "回答", compute)
+
+        assert compute.call_count == 1
+        assert first == second == (GRADE, REVIEW)
+
+    def test_passed_is_recomputed_from_current_threshold(self):
+        store(3, "k", {"passed": True, "score": 55}, REVIEW)
+
+        with patch("backend.lib.grade_cache.resolve_passed", return_value=False) as mock_resolve:
+            grade_result, _ = lookup(3, "k")
+
+        mock_resolve.assert_called_once_with(level=3, score=55)
+        assert grade_result == {"passed": False, "score": 55}
+
+    def test_disabled_cache_always_computes(self):
+        compute = MagicMock(return_value=(GRADE, REVIEW))
+        with patch.dict(os.environ, {"GRADE_CACHE_ENABLED": "false"}):
+            cached_grade(1, 1, QUESTION, "回答", compute)
+            cached_grade(1, 1, QUESTION, "回答", compute)
+        assert compute.call_count == 2
+
+    def test_failed_compute_is_not_cached(self):
+        compute = MagicMock(side_effect=[ValueError("bad"), (GRADE, REVIEW)])
+        with pytest.raises(ValueError):
+            cached_grade(1, 1, QUESTION, "回答", compute)
+        with patch("backend.lib.grade_cache.resolve_passed", return_value=True):
+            assert cached_grade(1, 1, QUESTION, "回答", compute) == (GRADE, REVIEW)
+
+    def test_lru_evicts_oldest_entry(self):
+        with patch.dict(os.environ, {"GRADE_CACHE_MAX_ENTRIES": "1"}):
+            store(1, "a", GRADE, REVIEW)
+            store(1, "b", GRADE, REVIEW)
+        with patch("backend.lib.grade_cache.resolve_passed", return_value=True):
+            assert lookup(1, "a") is None
+            assert lookup(1, "b") is not None
+
+
+class TestDynamoDBTier:
+    @pytest.fixture(autouse=True)
+    def _enable_dynamodb(self):
+        with patch.dict(os.environ, {"GRADE_CACHE_DYNAMODB": "true"}):
+            yield
+
+    @patch("backend.lib.grade_cache._get_dynamodb_resource")
+    def test_store_writes_item_with_ttl(self, mock_ddb):
+        table = MagicMock()
+        mock_ddb.return_value.Table.return_value = table
+
+        store(1, "k", GRADE, REVIEW)
+
+        item = table.put_item.call_args[1]["Item"]
+        assert item["PK"] == "GRADE#k"
+        assert item["score"] == 80
+        assert item["expires_at"] > time.time()
+
+    @patch("backend.lib.grade_cache._get_dynamodb_resource")
+    def test_lookup_falls_back_to_dynamodb(self, mock_ddb):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {
+            "PK": "GRADE#k", "score": 80, **REVIEW, "expires_at": int(time.time()) + 60,
+        }}
+        mock_ddb.return_value.Table.return_value = table
+
+        with patch("backend.lib.grade_cache.resolve_passed", return_value=True):
+            assert lookup(1, "k") == (GRADE, REVIEW)
+            # 2回目はプロセス内LRUから返す
+            lookup(1, "k")
+
+        assert table.get_item.call_count == 1
+
+    @patch("backend.lib.grade_cache._get_dynamodb_resource")
+    def test_expired_item_is_a_miss(self, mock_ddb):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {
+            "PK": "GRADE#k", "score": 80, **REVIEW, "expires_at": int(time.time()) - 1,
+        }}
+        mock_ddb.return_value.Table.return_value = table
+
+        assert lookup(1, "k") is None
+
+    @patch("backend.lib.grade_cache._get_dynamodb_resource")
+    def test_dynamodb_errors_degrade_to_miss(self, mock_ddb):
+        mock_ddb.return_value.Table.return_value.get_item.side_effect = Exception("boom")
+        assert lookup(1, "k") is None
+
+
+class TestCachedExplanation:
+    @pytest.fixture(autouse=True)
+    def _enable_explanation_cache(self):
+        with patch.dict(os.environ, {"EXPLANATION_CACHE_ENABLED": "true"}):
+            yield
+
+    def test_explanation_is_generated_once_per_question(self):
+        compute = MagicMock(return_value="解説")
+
+        assert cached_explanation(1, QUESTION, compute) == "解説"
+        assert cached_explanation(1, QUESTION, compute) == "解説"
+        assert compute.call_count == 1
+
+    def test_key_depends_on_level_and_question_only(self):
+        base = make_explanation_key(1, QUESTION)
+        assert make_explanation_key(2, QUESTION) != base
+        assert make_explanation_key(1, {**QUESTION, "prompt": "別の設問"}) != base
+        assert make_explanation_key(1, {**QUESTION, "answer_key": "v1.token"}) == base
+
+    def test_disabled_always_computes(self):
+        compute = MagicMock(return_value="解説")
+
+        with patch.dict(os.environ, {"EXPLANATION_CACHE_ENABLED": "false"}):
+            cached_explanation(1, QUESTION, compute)
+            cached_explanation(1, QUESTION, compute)
+
+        assert compute.call_count == 2
+
+    @patch("backend.lib.grade_cache._get_dynamodb_resource")
+    def test_shared_tier_is_used_across_containers(self, mock_ddb):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {
+            "PK": "EXPLANATION#x", "explanation": "共有された解説", "expires_at": int(time.time()) + 60,
+        }}
+        mock_ddb.return_value.Table.return_value = table
+        compute = MagicMock()
+
+        with patch.dict(os.environ, {"GRADE_CACHE_DYNAMODB": "true"}):
+            assert cached_explanation(3, QUESTION, compute) == "共有された解説"
+
+        compute.assert_not_called()
+        assert table.get_item.call_args[1]["Key"]["PK"] == f"EXPLANATION#{make_explanation_key(3, QUESTION)}"
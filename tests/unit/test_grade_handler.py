@@ -1,11 +1,12 @@
 """Unit tests for backend/handlers/grade_handler.py"""
 
 import json
+import os
 from unittest.mock import patch
 
 import pytest
 
-from backend.handlers.grade_handler import handler, _parse_grade_result
+from backend.handlers.grade_handler import handler, _parse_grade_result, _parse_combined_result
 
 
 def _bedrock_grade_response(passed, score):
@@ -67,6 +68,39 @@ class TestHandler:
         resp = handler({"body": "not json"}, None)
         assert resp["statusCode"] == 400
 
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_parallel_mode_reviews_without_score(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _bedrock_grade_response(True, 85)
+        mock_review.return_value = {"feedback": "Good", "explanation": "Because..."}
+
+        with patch.dict(os.environ, {"GRADE_MODE": "parallel"}):
+            resp = handler(_api_event(VALID_BODY), None)
+
+        assert resp["statusCode"] == 200
+        data = json.loads(resp["body"])
+        assert data["score"] == 85
+        assert data["feedback"] == "Good"
+        mock_review.assert_called_once_with(VALID_BODY["question"], VALID_BODY["answer"], None)
+
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_combined_mode_uses_single_bedrock_call(self, mock_invoke, mock_review):
+        mock_invoke.return_value = {"content": [{"text": json.dumps({
+            "passed": True, "score": 85, "feedback": "Good", "explanation": "Because...",
+        })}]}
+
+        with patch.dict(os.environ, {"GRADE_MODE": "combined"}):
+            resp = handler(_api_event(VALID_BODY), None)
+
+        assert resp["statusCode"] == 200
+        data = json.loads(resp["body"])
+        assert data["score"] == 85
+        assert data["feedback"] == "Good"
+        assert data["explanation"] == "Because..."
+        assert mock_invoke.call_count == 1
+        mock_review.assert_not_called()
+
     @patch("backend.handlers.grade_handler.invoke_claude")
     def test_returns_500_on_bedrock_failure(self, mock_invoke):
         mock_invoke.side_effect = RuntimeError("boom")
@@ -99,3 +133,122 @@ class TestParseGradeResult:
     def test_raises_on_score_out_of_range(self):
         with pytest.raises(ValueError, match="score"):
             _parse_grade_result(_bedrock_grade_response(True, 150))
+
+
+    def test_tool_use_result(self):
+        result = {"content": [{"type": "tool_use", "name": "submit_grade", "input": {"passed": False, "score": 20}}]}
+        assert _parse_grade_result(result) == {"passed": False, "score": 20}
+
+
+class TestParseCombinedResult:
+    def test_valid_result(self):
+        grade, review = _parse_combined_result({"content": [{"text": json.dumps({
+            "passed": False, "score": 20, "feedback": "F", "explanation": "E",
+        })}]})
+        assert grade == {"passed": False, "score": 20}
+        assert review == {"feedback": "F", "explanation": "E"}
+
+    def test_raises_on_missing_feedback(self):
+        with pytest.raises(ValueError, match="feedback"):
+            _parse_combined_result({"content": [{"text": json.dumps({
+                "passed": True, "score": 80, "explanation": "E",
+            })}]})
+
+
+class TestGradeCache:
+    """Identical (question, answer) pairs are served from the grade cache."""
+
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_retry_does_not_call_bedrock_again(self, mock_invoke, mock_review):
+        from backend.lib.grade_cache import clear_cache
+
+        mock_invoke.return_value = _bedrock_grade_response(True, 80)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+        clear_cache()
+
+        with patch.dict(os.environ, {"GRADE_CACHE_ENABLED": "true", "GRADE_MODE": "serial"}):
+            first = handler(_api_event(VALID_BODY), None)
+            second = handler(_api_event(VALID_BODY), None)
+        clear_cache()
+
+        assert json.loads(first["body"]) == json.loads(second["body"])
+        assert mock_invoke.call_count == 1
+        assert mock_review.call_count == 1
+
+
+class TestLocalMultipleChoice:
+    """Stored multiple-choice questions with an answer key are graded without Bedrock."""
+
+    QUESTION = {"step": 1, "type": "multiple_choice", "prompt": "Q?", "options": ["A", "B"], "context": None}
+
+    @pytest.fixture(autouse=True)
+    def stored_question(self):
+        from backend.lib.answer_key import attach_answer_key
+
+        with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "true"}):
+            self.stored = attach_answer_key(self.QUESTION, 0, ["A is right", "B is wrong"])
+            with patch("backend.handlers.grade_handler.load_question", side_effect=lambda **kw: self.stored):
+                yield
+
+    def _body(self, answer):
+        return {"session_id": "abc-123", "step": 1, "question_id": "set.1", "answer": answer}
+
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_correct_choice_graded_locally(self, mock_invoke, mock_review):
+        resp = handler(_api_event(self._body("A")), None)
+
+        data = json.loads(resp["body"])
+        assert resp["statusCode"] == 200
+        assert data["passed"] is True
+        assert data["score"] == 100
+        assert "A is right" in data["feedback"]
+        mock_invoke.assert_not_called()
+        mock_review.assert_not_called()
+
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_wrong_choice_returns_rationale(self, mock_invoke, mock_review):
+        resp = handler(_api_event(self._body("B")), None)
+
+        data = json.loads(resp["body"])
+        assert data["passed"] is False
+        assert data["score"] == 0
+        assert "B is wrong" in data["feedback"]
+        assert "A is right" in data["explanation"]
+        mock_invoke.assert_not_called()
+
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_invalid_key_falls_back_to_claude(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _bedrock_grade_response(True, 70)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+        body = self._body("A")
+        self.stored = {**self.stored, "answer_key": "v1.tampered"}
+
+        with patch.dict(os.environ, {"GRADE_MODE": "serial"}):
+            resp = handler(_api_event(body), None)
+
+        assert json.loads(resp["body"])["score"] == 70
+        prompt = mock_invoke.call_args[0][1]
+        assert "answer_key" not in prompt
+
+
+class TestClientAnswerKeyIsIgnored:
+    @patch("backend.handlers.grade_handler.generate_feedback")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_forged_key_without_question_store_is_graded_by_claude(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _bedrock_grade_response(False, 10)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+        question = {
+            "step": 1, "type": "multiple_choice", "prompt": "Q?", "options": ["A", "B"], "context": None,
+            "answer_key": {"answer_index": 0, "rationales": ["forged", "forged"]},
+        }
+        body = {"session_id": "abc-123", "step": 1, "question": question, "answer": "A"}
+
+        with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "false", "GRADE_MODE": "serial"}):
+            resp = handler(_api_event(body), None)
+
+        assert json.loads(resp["body"])["score"] == 10
+        mock_invoke.assert_called_once()
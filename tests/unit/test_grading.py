@@ -0,0 +1,112 @@
+"""Unit tests for backend/lib/grading.py"""
+
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from backend.lib.grading import get_grade_mode, run_grade_pipeline, validate_grade, validate_review
+
+
+class TestGetGradeMode:
+    def test_default_is_serial(self):
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_grade_mode() == "serial"
+
+    def test_parallel(self):
+        with patch.dict(os.environ, {"GRADE_MODE": "parallel"}):
+            assert get_grade_mode() == "parallel"
+
+    def test_case_and_whitespace_insensitive(self):
+        with patch.dict(os.environ, {"GRADE_MODE": " Parallel "}):
+            assert get_grade_mode() == "parallel"
+
+    def test_combined(self):
+        with patch.dict(os.environ, {"GRADE_MODE": "combined"}):
+            assert get_grade_mode() == "combined"
+
+    def test_invalid_value_falls_back_to_serial(self):
+        with patch.dict(os.environ, {"GRADE_MODE": "turbo"}):
+            assert get_grade_mode() == "serial"
+
+
+class TestRunGradePipeline:
+    def test_serial_passes_grade_result_to_reviewer(self):
+        received = []
+
+        def review_fn(grade):
+            received.append(grade)
+            return {"feedback": "f", "explanation": "e"}
+
+        with patch.dict(os.environ, {"GRADE_MODE": "serial"}):
+            grade, review = run_grade_pipeline(
+                lambda: {"passed": True, "score": 80}, review_fn,
+            )
+
+        assert grade == {"passed": True, "score": 80}
+        assert review == {"feedback": "f", "explanation": "e"}
+        assert received == [{"passed": True, "score": 80}]
+
+    def test_parallel_runs_grader_and_reviewer_concurrently(self):
+        # Both functions wait on a barrier: it only releases if they overlap.
+        barrier = threading.Barrier(2, timeout=5)
+        received = []
+
+        def grade_fn():
+            barrier.wait()
+            return {"passed": False, "score": 20}
+
+        def review_fn(grade):
+            received.append(grade)
+            barrier.wait()
+            return {"feedback": "f", "explanation": "e"}
+
+        with patch.dict(os.environ, {"GRADE_MODE": "parallel"}):
+            grade, review = run_grade_pipeline(grade_fn, review_fn)
+
+        assert grade == {"passed": False, "score": 20}
+        assert review == {"feedback": "f", "explanation": "e"}
+        assert received == [None]
+
+    def test_parallel_propagates_grader_error(self):
+        def grade_fn():
+            raise ValueError("bad grade")
+
+        with patch.dict(os.environ, {"GRADE_MODE": "parallel"}):
+            with pytest.raises(ValueError, match="bad grade"):
+                run_grade_pipeline(grade_fn, lambda grade: {"feedback": "f", "explanation": "e"})
+
+    def test_combined_makes_single_call(self):
+        def fail():
+            raise AssertionError("grader/reviewer must not be called in combined mode")
+
+        combined = ({"passed": True, "score": 90}, {"feedback": "f", "explanation": "e"})
+        with patch.dict(os.environ, {"GRADE_MODE": "combined"}):
+            grade, review = run_grade_pipeline(fail, lambda grade: fail(), lambda: combined)
+
+        assert grade == {"passed": True, "score": 90}
+        assert review == {"feedback": "f", "explanation": "e"}
+
+    def test_combined_without_combined_fn_falls_back_to_serial(self):
+        with patch.dict(os.environ, {"GRADE_MODE": "combined"}):
+            grade, review = run_grade_pipeline(
+                lambda: {"passed": True, "score": 50},
+                lambda grade: {"feedback": str(grade["score"]), "explanation": "e"},
+            )
+
+        assert review["feedback"] == "50"
+
+
+class TestValidators:
+    def test_validate_grade_drops_extra_fields(self):
+        data = {"passed": True, "score": 70, "feedback": "x"}
+        assert validate_grade(data) == {"passed": True, "score": 70}
+
+    def test_validate_grade_rejects_score_out_of_range(self):
+        with pytest.raises(ValueError, match="score"):
+            validate_grade({"passed": True, "score": 101})
+
+    def test_validate_review_requires_non_empty_strings(self):
+        with pytest.raises(ValueError, match="explanation"):
+            validate_review({"feedback": "f", "explanation": "  "})
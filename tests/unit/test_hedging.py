@@ -0,0 +1,139 @@
+"""Unit tests for backend/lib/hedging.py"""
+
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from backend.lib import hedging
+from backend.lib.hedging import MIN_SAMPLES, call_hedged, hedge_delay, record_latency
+
+SITE = "lv3.grader"
+
+
+@pytest.fixture(autouse=True)
+def _reset_hedging():
+    hedging.reset()
+    with patch.dict(os.environ, {"BEDROCK_HEDGE_CALL_SITES": SITE, "BEDROCK_HEDGE_MAX_RATE": "1.0"}):
+        yield
+    hedging.reset()
+
+
+def _warm_up(latency: float = 0.01) -> None:
+    for _ in range(MIN_SAMPLES):
+        record_latency(SITE, latency)
+
+
+class TestHedgeDelay:
+    def test_none_until_enough_samples(self):
+        record_latency(SITE, 0.5)
+        assert hedge_delay(SITE) is None
+
+    def test_uses_configured_percentile(self):
+        for i in range(1, 101):
+            record_latency(SITE, i / 100)
+        with patch.dict(os.environ, {"BEDROCK_HEDGE_PERCENTILE": "90"}):
+            assert hedge_delay(SITE) == 0.9
+
+
+class TestCallHedged:
+    def test_records_latency_without_hedging_when_cold(self):
+        assert call_hedged(SITE, lambda: "ok") == "ok"
+        assert len(hedging._latencies[SITE]) == 1
+
+    def test_fast_primary_is_not_hedged(self):
+        _warm_up(1.0)
+        calls = []
+        assert call_hedged(SITE, lambda: calls.append(1) or "ok") == "ok"
+        assert len(calls) == 1
+
+    def test_slow_primary_is_hedged_and_second_result_wins(self):
+        _warm_up(0.01)
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        try:
+            assert call_hedged(SITE, call) == "fast"
+        finally:
+            release.set()
+        assert len(calls) == 2
+
+    def test_hedge_win_records_latency_including_hedge_delay(self):
+        _warm_up(0.05)
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        try:
+            assert call_hedged(SITE, call) == "fast"
+        finally:
+            release.set()
+        # 2本目は即座に返るが、記録するのはヘッジまでの待ち時間を含む全体の時間
+        assert hedging._latencies[SITE][-1] >= 0.05
+
+    def test_hedge_rate_cap_prevents_second_request(self):
+        _warm_up(0.01)
+        calls = []
+
+        def call():
+            calls.append(1)
+            threading.Event().wait(0.05)
+            return "ok"
+
+        with patch.dict(os.environ, {"BEDROCK_HEDGE_MAX_RATE": "0"}):
+            assert call_hedged(SITE, call) == "ok"
+        assert len(calls) == 1
+
+    def test_disallowed_hedge_waits_for_primary(self):
+        _warm_up(0.01)
+        calls = []
+
+        def call():
+            calls.append(1)
+            threading.Event().wait(0.05)
+            return "ok"
+
+        assert call_hedged(SITE, call, allow_hedge=False) == "ok"
+        assert len(calls) == 1
+
+    def test_unlisted_call_site_is_never_hedged(self):
+        for _ in range(MIN_SAMPLES):
+            record_latency("lv1.grader", 0.001)
+        calls = []
+
+        def call():
+            calls.append(1)
+            threading.Event().wait(0.02)
+            return "ok"
+
+        assert call_hedged("lv1.grader", call) == "ok"
+        assert len(calls) == 1
+
+    def test_error_in_one_leg_uses_the_other(self):
+        _warm_up(0.01)
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(0.1)
+                raise RuntimeError("primary failed")
+            release.wait(0.2)
+            return "hedge"
+
+        assert call_hedged(SITE, call) == "hedge"
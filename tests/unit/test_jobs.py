@@ -0,0 +1,143 @@
+"""Unit tests for async grade jobs (backend/lib/jobs.py, grade worker and GET /jobs/{id})."""
+
+import json
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from backend.handlers.grade_worker_handler import handler as worker_handler, process_message
+from backend.handlers.job_status_handler import handler as status_handler
+from backend.handlers.lv4_grade_handler import handler as lv4_grade_handler
+from backend.lib import jobs
+
+GRADE_BODY = {
+    "session_id": "sess",
+    "step": 1,
+    "question": {"step": 1, "type": "scenario", "prompt": "Q?"},
+    "answer": "回答",
+}
+
+
+def _grade_response(passed, score):
+    return {"content": [{"text": json.dumps({"passed": passed, "score": score})}]}
+
+
+def _job_status(job_id: str) -> tuple[int, dict]:
+    resp = status_handler({"pathParameters": {"id": job_id}}, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+@pytest.fixture(autouse=True)
+def _local_jobs():
+    jobs.local_store.clear()
+    with patch.dict(os.environ, {"GRADE_ASYNC_ENABLED": "true", "GRADE_CACHE_ENABLED": "false"}):
+        yield
+    jobs.local_queue.drain()
+    jobs.local_store.clear()
+
+
+class TestLocalAsyncGrade:
+    @patch("backend.handlers.lv4_grade_handler.generate_lv4_feedback")
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_enqueue_then_poll_result(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _grade_response(True, 80)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+
+        resp = lv4_grade_handler({"body": json.dumps(GRADE_BODY)}, None)
+
+        assert resp["statusCode"] == 202
+        job_id = json.loads(resp["body"])["job_id"]
+
+        jobs.local_queue.drain(timeout=5)
+        status, data = _job_status(job_id)
+
+        assert status == 200
+        assert data["status"] == "succeeded"
+        assert data["result"]["score"] == 80
+        assert data["result"]["feedback"] == "fb"
+        assert mock_invoke.call_count == 1
+
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_failed_grade_is_reported(self, mock_invoke):
+        mock_invoke.side_effect = RuntimeError("boom")
+
+        job_id = json.loads(lv4_grade_handler({"body": json.dumps(GRADE_BODY)}, None)["body"])["job_id"]
+        jobs.local_queue.drain(timeout=5)
+
+        _, data = _job_status(job_id)
+        assert data["status"] == "failed"
+        assert data["status_code"] == 500
+        assert "result" not in data
+
+    def test_validation_errors_are_returned_synchronously(self):
+        resp = lv4_grade_handler({"body": json.dumps({**GRADE_BODY, "answer": ""})}, None)
+        assert resp["statusCode"] == 400
+        assert jobs.local_store.get("anything") is None
+
+    @patch("backend.handlers.lv4_grade_handler.generate_lv4_feedback")
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_enqueue_failure_grades_synchronously(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _grade_response(True, 80)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+
+        with patch("backend.handlers.lv4_grade_handler.create_job", side_effect=Exception("queue down")):
+            resp = lv4_grade_handler({"body": json.dumps(GRADE_BODY)}, None)
+
+        assert resp["statusCode"] == 200
+        assert json.loads(resp["body"])["score"] == 80
+
+
+class TestWorker:
+    @patch("backend.handlers.lv4_grade_handler.generate_lv4_feedback")
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_duplicate_delivery_runs_grade_once(self, mock_invoke, mock_review):
+        mock_invoke.return_value = _grade_response(True, 80)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+        with patch.object(jobs.local_queue, "send"):
+            job_id = jobs.create_job(4, GRADE_BODY)
+
+        record = {"body": json.dumps({"job_id": job_id})}
+        worker_handler({"Records": [record, record]}, None)
+
+        assert mock_invoke.call_count == 1
+        assert _job_status(job_id)[1]["status"] == "succeeded"
+
+    def test_unknown_job_is_skipped(self):
+        process_message({"job_id": "missing"})
+        worker_handler({"Records": [{"body": "not json"}]}, None)
+
+
+class TestJobStatusHandler:
+    def test_unknown_job_returns_404(self):
+        assert _job_status("missing")[0] == 404
+
+    def test_missing_id_returns_400(self):
+        assert status_handler({"pathParameters": None}, None)["statusCode"] == 400
+
+
+class TestAwsBackends:
+    @patch("backend.lib.jobs._get_sqs_client")
+    def test_sqs_queue_sends_job_id(self, mock_sqs):
+        jobs.SqsQueue("https://sqs.example/queue").send({"job_id": "abc"})
+
+        kwargs = mock_sqs.return_value.send_message.call_args[1]
+        assert kwargs["QueueUrl"] == "https://sqs.example/queue"
+        assert json.loads(kwargs["MessageBody"]) == {"job_id": "abc"}
+
+    @patch("backend.lib.jobs._get_dynamodb_resource")
+    def test_dynamodb_claim_is_conditional(self, mock_ddb):
+        table = MagicMock()
+        mock_ddb.return_value.Table.return_value = table
+
+        assert jobs.DynamoDBJobStore().claim("abc", 1000.0) is True
+        kwargs = table.update_item.call_args[1]
+        assert kwargs["Key"] == {"PK": "JOB#abc"}
+        assert "#status = :queued" in kwargs["ConditionExpression"]
+        assert kwargs["ExpressionAttributeValues"][":stale"] == 1000 - jobs.STALE_RUNNING_SECONDS
+
+        table.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException", "Message": "taken"}}, "UpdateItem",
+        )
+        assert jobs.DynamoDBJobStore().claim("abc", 1000.0) is False
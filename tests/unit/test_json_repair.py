@@ -0,0 +1,53 @@
+"""Unit tests for backend/lib/json_repair.py"""
+
+import pytest
+
+from backend.lib.json_repair import extract_json_object, find_outermost_object
+
+
+class TestFindOutermostObject:
+    def test_ignores_surrounding_prose(self):
+        text = '生成しました。\n{"a": {"b": 1}}\n以上です。{"c": 2}'
+        assert find_outermost_object(text) == '{"a": {"b": 1}}'
+
+    def test_braces_inside_strings_are_not_counted(self):
+        text = '{"prompt": "例: {x} と }"} trailing'
+        assert find_outermost_object(text) == '{"prompt": "例: {x} と }"}'
+
+    def test_escaped_quote_inside_string(self):
+        text = '{"prompt": "彼は\\"}\\"と言った"}'
+        assert find_outermost_object(text) == text
+
+    def test_no_object_raises(self):
+        with pytest.raises(ValueError, match="No JSON object"):
+            find_outermost_object("JSONはありません")
+
+    def test_unclosed_object_raises(self):
+        with pytest.raises(ValueError, match="not closed"):
+            find_outermost_object('{"questions":[{"step":1')
+
+
+class TestExtractJsonObject:
+    def test_code_fence_and_trailing_prose(self):
+        text = '```json\n{"questions": [{"step": 1}]}\n```\n補足: 以上です。'
+        assert extract_json_object(text) == {"questions": [{"step": 1}]}
+
+    def test_trailing_commas(self):
+        text = '{"questions": [{"step": 1, "options": null,}, ],}'
+        assert extract_json_object(text) == {"questions": [{"step": 1, "options": None}]}
+
+    def test_comma_before_bracket_inside_string_is_kept(self):
+        text = '{"prompt": "a, ]", "x": [1,],}'
+        assert extract_json_object(text) == {"prompt": "a, ]", "x": [1]}
+
+    def test_raw_newline_and_tab_inside_string(self):
+        text = '{"context": "1行目\n2行目\tタブ"}'
+        assert extract_json_object(text) == {"context": "1行目\n2行目\tタブ"}
+
+    def test_python_literals_outside_strings(self):
+        text = '{"options": None, "flag": True, "note": "None True"}'
+        assert extract_json_object(text) == {"options": None, "flag": True, "note": "None True"}
+
+    def test_unrepairable_raises_value_error(self):
+        with pytest.raises(ValueError, match="Could not repair"):
+            extract_json_object('{"a": 1 "b": 2}')
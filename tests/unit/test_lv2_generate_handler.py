@@ -146,3 +146,48 @@ class TestHandlerMaxTokens:
         assert call_args[1].get("max_tokens") == 4096 or (
             len(call_args[0]) >= 3 and call_args[0][2] == 4096
         )
+
+
+# ---------------------------------------------------------------------------
+# 一部ステップの不備からの復旧
+# ---------------------------------------------------------------------------
+class TestHandlerRepair:
+    """handler should repair a set with a few bad steps instead of failing."""
+
+    @patch("backend.handlers.lv2_generate_handler.invoke_claude")
+    def test_trailing_prose_is_recovered_locally(self, mock_invoke):
+        text = json.dumps({"questions": _valid_questions()}, ensure_ascii=False) + "\n以上が設問です。"
+        mock_invoke.return_value = {"content": [{"text": text}], "stop_reason": "end_turn"}
+
+        resp = handler(_api_event({"session_id": "test-session"}), None)
+
+        assert resp["statusCode"] == 200
+        assert len(json.loads(resp["body"])["questions"]) == 4
+        mock_invoke.assert_called_once()
+
+    @patch("backend.handlers.lv2_generate_handler.invoke_claude")
+    def test_only_invalid_step_is_regenerated(self, mock_invoke):
+        bad = _valid_questions(overrides={3: {"type": "multiple_choice"}})
+        fixed = [_make_question(3, "scenario", "再生成した設問", "成果物サンプル")]
+        mock_invoke.side_effect = [_bedrock_response(bad), _bedrock_response(fixed)]
+
+        resp = handler(_api_event({"session_id": "test-session"}), None)
+
+        assert resp["statusCode"] == 200
+        questions = json.loads(resp["body"])["questions"]
+        assert [q["step"] for q in questions] == [1, 2, 3, 4]
+        assert questions[2]["prompt"] == "再生成した設問"
+        assert questions[0]["prompt"] == "業務プロセス設計の設問"
+        repair_prompt = mock_invoke.call_args_list[1][0][1]
+        assert "ステップ 3 のみ" in repair_prompt
+        assert "業務プロセス設計の設問" in repair_prompt
+
+    @patch("backend.handlers.lv2_generate_handler.invoke_claude")
+    def test_still_invalid_after_regeneration_returns_500(self, mock_invoke):
+        bad = _valid_questions(overrides={3: {"type": "multiple_choice"}})
+        mock_invoke.side_effect = [_bedrock_response(bad), _bedrock_response(bad)]
+
+        resp = handler(_api_event({"session_id": "test-session"}), None)
+
+        assert resp["statusCode"] == 500
+        assert mock_invoke.call_count == 2
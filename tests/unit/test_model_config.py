@@ -0,0 +1,113 @@
+"""Unit tests for backend/lib/model_config.py"""
+
+from unittest.mock import patch
+
+import pytest
+
+from backend.lib.model_config import get_call_config
+
+
+@pytest.fixture(autouse=True)
+def _clear_env():
+    with patch.dict("os.environ", {}, clear=True):
+        yield
+
+
+class TestGetCallConfig:
+    def test_grader_uses_small_output_budget_and_zero_temperature(self):
+        config = get_call_config(1, "grader")
+        assert config == {
+            "model_id": None, "max_tokens": 128, "temperature": 0.0, "call_site": "lv1.grader",
+        }
+
+    def test_lv2_generator_keeps_4096_max_tokens(self):
+        assert get_call_config(2, "generator")["max_tokens"] == 4096
+        assert get_call_config(3, "generator")["max_tokens"] == 2048
+
+    def test_model_is_left_to_endpoints_without_override(self):
+        with patch.dict("os.environ", {"BEDROCK_MODEL_ID": "base-model"}):
+            assert get_call_config(4, "generator")["model_id"] is None
+
+    def test_fallback_equal_to_default_model_is_omitted(self):
+        env = {"BEDROCK_MODEL_ID": "base-model", "BEDROCK_REVIEWER_FALLBACK_MODEL_ID": "base-model"}
+        with patch.dict("os.environ", env):
+            assert "fallback_model_id" not in get_call_config(1, "reviewer")
+
+    def test_region_specific_endpoint_models_are_used_per_role(self):
+        from backend.lib.bedrock_client import _candidate_endpoints
+
+        env = {"BEDROCK_ENDPOINTS": "ap-northeast-1:apac.model,us-east-1:us.model"}
+        with patch.dict("os.environ", env):
+            for role in ("generator", "grader", "reviewer", "combined"):
+                config = get_call_config(3, role)
+                assert sorted(_candidate_endpoints(config["model_id"], None)) == [
+                    ("ap-northeast-1", "apac.model"), ("us-east-1", "us.model"),
+                ]
+
+    def test_role_env_overrides_defaults(self):
+        env = {"BEDROCK_GRADER_MODEL_ID": "small-model", "BEDROCK_GRADER_MAX_TOKENS": "64"}
+        with patch.dict("os.environ", env):
+            config = get_call_config(3, "grader")
+        assert config["model_id"] == "small-model"
+        assert config["max_tokens"] == 64
+
+    def test_level_env_takes_precedence_over_role_env(self):
+        env = {"BEDROCK_GENERATOR_MAX_TOKENS": "3000", "BEDROCK_LV4_GENERATOR_MAX_TOKENS": "6000"}
+        with patch.dict("os.environ", env):
+            assert get_call_config(4, "generator")["max_tokens"] == 6000
+            assert get_call_config(3, "generator")["max_tokens"] == 3000
+
+    def test_invalid_number_falls_back_to_default(self):
+        with patch.dict("os.environ", {"BEDROCK_REVIEWER_TEMPERATURE": "hot"}):
+            assert get_call_config(1, "reviewer")["temperature"] == 0.7
+
+    def test_reviewer_includes_fallback_model(self):
+        with patch.dict("os.environ", {"BEDROCK_REVIEWER_FALLBACK_MODEL_ID": "small-model"}):
+            assert get_call_config(1, "reviewer")["fallback_model_id"] == "small-model"
+            assert "fallback_model_id" not in get_call_config(1, "grader")
+
+    def test_unknown_role_raises(self):
+        with pytest.raises(ValueError):
+            get_call_config(1, "judge")
+
+
+class TestStructuredOutput:
+    def test_no_tool_unless_enabled(self):
+        assert "tool" not in get_call_config(1, "grader")
+
+    @pytest.mark.parametrize("role, name", [
+        ("generator", "submit_questions"),
+        ("grader", "submit_grade"),
+        ("reviewer", "submit_review"),
+        ("combined", "submit_grade_and_review"),
+    ])
+    def test_tool_per_role(self, role, name):
+        with patch.dict("os.environ", {"BEDROCK_STRUCTURED_OUTPUT": "true", "BEDROCK_STRUCTURED_OUTPUT_GENERATOR": "true"}):
+            tool = get_call_config(3, role)["tool"]
+        assert tool["name"] == name
+        assert tool["input_schema"]["type"] == "object"
+
+    def test_output_overrides_reviewer_schema(self):
+        with patch.dict("os.environ", {"BEDROCK_STRUCTURED_OUTPUT": "true"}):
+            tool = get_call_config(2, "reviewer", output="feedback")["tool"]
+        assert tool["input_schema"]["required"] == ["feedback"]
+
+    def test_question_set_schema_is_level_specific(self):
+        with patch.dict("os.environ", {"BEDROCK_STRUCTURED_OUTPUT": "true", "BEDROCK_STRUCTURED_OUTPUT_GENERATOR": "true"}):
+            lv1 = get_call_config(1, "generator")["tool"]["input_schema"]
+            lv4 = get_call_config(4, "generator")["tool"]["input_schema"]
+        assert "answer_index" in lv1["properties"]["questions"]["items"]["properties"]
+        assert lv4["properties"]["questions"]["minItems"] == lv4["properties"]["questions"]["maxItems"] == 6
+        assert "multiple_choice" not in lv4["properties"]["questions"]["items"]["properties"]["type"]["enum"]
+
+    def test_repair_schema_does_not_fix_question_count(self):
+        with patch.dict("os.environ", {"BEDROCK_STRUCTURED_OUTPUT": "true", "BEDROCK_STRUCTURED_OUTPUT_GENERATOR": "true"}):
+            tool = get_call_config(4, "generator", output="repair")["tool"]
+        assert tool["name"] == "submit_questions"
+        assert "maxItems" not in tool["input_schema"]["properties"]["questions"]
+
+    def test_generator_stays_text_unless_opted_in(self):
+        with patch.dict("os.environ", {"BEDROCK_STRUCTURED_OUTPUT": "true"}):
+            assert "tool" not in get_call_config(4, "generator")
+            assert "tool" not in get_call_config(4, "generator", output="repair")
+            assert "tool" in get_call_config(4, "grader")
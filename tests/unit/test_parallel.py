@@ -0,0 +1,35 @@
+"""Unit tests for backend/lib/parallel.py"""
+
+import threading
+
+import pytest
+
+from backend.lib.parallel import MAX_WORKERS, run_parallel, submit
+
+
+def test_results_keep_argument_order():
+    assert run_parallel(lambda: 1, lambda: 2, lambda: 3) == [1, 2, 3]
+
+
+def test_first_exception_is_raised():
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        run_parallel(lambda: 1, fail)
+
+
+def test_nested_submit_does_not_deadlock_a_saturated_pool():
+    """Every pool worker waits on nested work (like the reviewer inside a grade job)."""
+    started = threading.Barrier(MAX_WORKERS)
+
+    def job():
+        # すべてのワーカーが埋まってから入れ子の処理を待つ
+        started.wait(timeout=5)
+        explanation = submit(lambda: "explanation")
+        return run_parallel(lambda: "grade", lambda: submit(lambda: "deep").result()) + [explanation.result()]
+
+    futures = [submit(job) for _ in range(MAX_WORKERS)]
+
+    results = [f.result(timeout=5) for f in futures]
+    assert results == [["grade", "deep", "explanation"]] * MAX_WORKERS
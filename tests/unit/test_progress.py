@@ -0,0 +1,86 @@
+"""Unit tests for backend/lib/progress.py"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+from backend.lib.progress import (
+    TRANSACTION_MAX_ATTEMPTS, build_progress_update, build_transact_items, save_result_and_progress,
+)
+
+SESSION_ID = "550e8400-e29b-41d4-a716-446655440000"
+RESULT_ITEM = {"PK": f"SESSION#{SESSION_ID}", "SK": "RESULT#lv3", "session_id": SESSION_ID, "total_score": 80}
+
+
+def _cancelled(code: str) -> ClientError:
+    return ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException", "Message": "cancelled"},
+            "CancellationReasons": [{"Code": "None"}, {"Code": code}],
+        },
+        "TransactWriteItems",
+    )
+
+
+class TestBuildProgressUpdate:
+    def test_pass_overwrites_flag(self):
+        params = build_progress_update(SESSION_ID, 3, True, "2026-01-01T00:00:00+00:00")
+        assert params["Key"] == {"PK": f"SESSION#{SESSION_ID}", "SK": "PROGRESS"}
+        assert params["ExpressionAttributeNames"] == {"#flag": "lv3_passed"}
+        assert params["UpdateExpression"].startswith("SET #flag = :passed,")
+
+    def test_fail_keeps_existing_flag(self):
+        params = build_progress_update(SESSION_ID, 3, False, "2026-01-01T00:00:00+00:00")
+        assert params["UpdateExpression"].startswith("SET #flag = if_not_exists(#flag, :passed),")
+        assert "ConditionExpression" not in params
+
+
+class TestBuildTransactItems:
+    def test_put_and_update_are_serialized(self):
+        items = build_transact_items("results", "progress", RESULT_ITEM, 3, True, "t")
+        assert items[0]["Put"] == {
+            "TableName": "results",
+            "Item": {
+                "PK": {"S": f"SESSION#{SESSION_ID}"},
+                "SK": {"S": "RESULT#lv3"},
+                "session_id": {"S": SESSION_ID},
+                "total_score": {"N": "80"},
+            },
+        }
+        assert items[1]["Update"]["ExpressionAttributeValues"][":passed"] == {"BOOL": True}
+
+
+class TestSaveResultAndProgress:
+    @patch("backend.lib.progress.time.sleep")
+    def test_retries_transaction_conflict_with_same_token(self, mock_sleep):
+        dynamodb = MagicMock()
+        client = dynamodb.meta.client
+        client.transact_write_items.side_effect = [_cancelled("TransactionConflict"), {}]
+
+        save_result_and_progress(dynamodb, "results", "progress", RESULT_ITEM, 3, True, "t")
+
+        tokens = [c[1]["ClientRequestToken"] for c in client.transact_write_items.call_args_list]
+        assert len(tokens) == 2 and tokens[0] == tokens[1]
+        assert mock_sleep.call_count == 1
+
+    @patch("backend.lib.progress.time.sleep")
+    def test_gives_up_after_max_attempts(self, mock_sleep):
+        dynamodb = MagicMock()
+        dynamodb.meta.client.transact_write_items.side_effect = _cancelled("TransactionConflict")
+
+        with pytest.raises(ClientError):
+            save_result_and_progress(dynamodb, "results", "progress", RESULT_ITEM, 3, True, "t")
+
+        assert dynamodb.meta.client.transact_write_items.call_count == TRANSACTION_MAX_ATTEMPTS
+
+    @patch("backend.lib.progress.time.sleep")
+    def test_other_cancellations_are_not_retried(self, mock_sleep):
+        dynamodb = MagicMock()
+        dynamodb.meta.client.transact_write_items.side_effect = _cancelled("ValidationError")
+
+        with pytest.raises(ClientError):
+            save_result_and_progress(dynamodb, "results", "progress", RESULT_ITEM, 3, True, "t")
+
+        assert dynamodb.meta.client.transact_write_items.call_count == 1
+        mock_sleep.assert_not_called()
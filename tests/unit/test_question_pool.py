@@ -0,0 +1,210 @@
+"""Unit tests for backend/lib/question_pool.py and the pool refill handler."""
+
+import json
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+from botocore.exceptions import ClientError
+
+from backend.lib.question_pool import pop_question_set, request_refill, take_question_set
+from backend.handlers.pool_refill_handler import handler as refill_handler
+
+QUESTIONS = [{"step": 1, "type": "free_text", "prompt": "Q?", "options": None, "context": None}]
+
+
+def _pool_item(sk: str = "SET#1", expires_in: int = 3600) -> dict:
+    return {
+        "PK": "LEVEL#lv1", "SK": sk, "questions_json": json.dumps(QUESTIONS),
+        "expires_at": int(time.time()) + expires_in,
+    }
+
+
+def _conditional_failure() -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "gone"}},
+        "DeleteItem",
+    )
+
+
+class TestPopQuestionSet:
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_returns_claimed_set(self, mock_ddb):
+        table = MagicMock()
+        table.query.return_value = {"Items": [_pool_item()]}
+        table.delete_item.return_value = {"Attributes": _pool_item()}
+        mock_ddb.return_value.Table.return_value = table
+
+        assert pop_question_set(1) == (QUESTIONS, 0)
+        assert table.delete_item.call_args[1]["ConditionExpression"] == "attribute_exists(PK)"
+        # ロック項目は払い出し対象にしない
+        assert table.query.call_args[1]["ExpressionAttributeValues"][":prefix"] == "SET#"
+
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_skips_set_claimed_by_another_request(self, mock_ddb):
+        table = MagicMock()
+        table.query.return_value = {"Items": [_pool_item("SET#1"), _pool_item("SET#2")]}
+        table.delete_item.side_effect = [_conditional_failure(), {"Attributes": _pool_item("SET#2")}]
+        mock_ddb.return_value.Table.return_value = table
+
+        assert pop_question_set(1) == (QUESTIONS, 0)
+        assert table.delete_item.call_count == 2
+
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_returns_none_when_empty(self, mock_ddb):
+        table = MagicMock()
+        table.query.return_value = {"Items": []}
+        mock_ddb.return_value.Table.return_value = table
+
+        assert pop_question_set(1) == (None, 0)
+
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_filters_expired_sets_in_query(self, mock_ddb):
+        table = MagicMock()
+        table.query.return_value = {"Items": [_pool_item("SET#2")]}
+        table.delete_item.return_value = {"Attributes": _pool_item("SET#2")}
+        mock_ddb.return_value.Table.return_value = table
+
+        assert pop_question_set(1) == (QUESTIONS, 0)
+        kwargs = table.query.call_args[1]
+        assert kwargs["FilterExpression"] == "attribute_not_exists(expires_at) OR expires_at > :now"
+        assert abs(kwargs["ExpressionAttributeValues"][":now"] - int(time.time())) <= 1
+
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_keeps_reading_past_pages_of_expired_sets(self, mock_ddb):
+        table = MagicMock()
+        # 期限切れだけの先頭ページはフィルタで空になるが、続きのページに有効なセットがある
+        table.query.side_effect = [
+            {"Items": [], "LastEvaluatedKey": {"PK": "LEVEL#lv1", "SK": "SET#7"}},
+            {"Items": [_pool_item("SET#8"), _pool_item("SET#9")]},
+        ]
+        table.delete_item.return_value = {"Attributes": _pool_item("SET#8")}
+        mock_ddb.return_value.Table.return_value = table
+
+        assert pop_question_set(1) == (QUESTIONS, 1)
+        assert table.query.call_count == 2
+        assert table.query.call_args[1]["ExclusiveStartKey"] == {"PK": "LEVEL#lv1", "SK": "SET#7"}
+        assert table.delete_item.call_args[1]["Key"]["SK"] == "SET#8"
+
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_estimates_remaining_from_candidates(self, mock_ddb):
+        table = MagicMock()
+        table.query.return_value = {"Items": [_pool_item(f"SET#{i}") for i in range(4)]}
+        table.delete_item.return_value = {"Attributes": _pool_item()}
+        mock_ddb.return_value.Table.return_value = table
+
+        with patch.dict(os.environ, {"QUESTION_POOL_LOW_WATER": "5"}):
+            assert pop_question_set(1) == (QUESTIONS, 3)
+        # 残数が低水位線を超えるかを判定できるだけの候補を読む
+        assert table.query.call_args[1]["Limit"] == 7
+        table.query.assert_called_once()
+
+
+class TestRequestRefill:
+    @patch("backend.lib.question_pool.POOL_REFILL_FUNCTION", "refill-fn")
+    @patch("backend.lib.question_pool._get_lambda_client")
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_invokes_refill_when_lock_is_acquired(self, mock_ddb, mock_lambda):
+        table = MagicMock()
+        mock_ddb.return_value.Table.return_value = table
+
+        request_refill(2)
+
+        lock = table.put_item.call_args[1]
+        assert lock["Item"]["SK"] == "REFILL_LOCK"
+        assert "attribute_not_exists(PK)" in lock["ConditionExpression"]
+        mock_lambda.return_value.invoke.assert_called_once()
+
+    @patch("backend.lib.question_pool.POOL_REFILL_FUNCTION", "refill-fn")
+    @patch("backend.lib.question_pool._get_lambda_client")
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_refill_in_progress_is_not_requested_again(self, mock_ddb, mock_lambda):
+        table = MagicMock()
+        table.put_item.side_effect = _conditional_failure()
+        mock_ddb.return_value.Table.return_value = table
+
+        request_refill(2)
+
+        mock_lambda.return_value.invoke.assert_not_called()
+
+
+class TestTakeQuestionSet:
+    @patch("backend.lib.question_pool._get_dynamodb_resource")
+    def test_disabled_pool_does_not_touch_dynamodb(self, mock_ddb):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "false"}):
+            assert take_question_set(1) is None
+        mock_ddb.assert_not_called()
+
+    @patch("backend.lib.question_pool.request_refill")
+    @patch("backend.lib.question_pool.pop_question_set", return_value=(QUESTIONS, 2))
+    def test_requests_refill_when_low(self, _pop, mock_refill):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true", "QUESTION_POOL_LOW_WATER": "5"}):
+            assert take_question_set(3) == QUESTIONS
+        mock_refill.assert_called_once_with(3)
+
+    @patch("backend.lib.question_pool.request_refill")
+    @patch("backend.lib.question_pool.pop_question_set", return_value=(QUESTIONS, 6))
+    def test_no_refill_when_pool_is_healthy(self, _pop, mock_refill):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true", "QUESTION_POOL_LOW_WATER": "5"}):
+            take_question_set(1)
+        mock_refill.assert_not_called()
+
+    @patch("backend.lib.question_pool.request_refill")
+    @patch("backend.lib.question_pool.pop_question_set", return_value=(None, 0))
+    def test_empty_pool_falls_back_and_requests_refill(self, _pop, mock_refill):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true"}):
+            assert take_question_set(2) is None
+        mock_refill.assert_called_once_with(2)
+
+    @patch("backend.lib.question_pool.pop_question_set", side_effect=RuntimeError("ddb down"))
+    def test_pool_errors_fall_back_to_live_generation(self, _pop):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true"}):
+            assert take_question_set(1) is None
+
+
+class TestGenerateHandlerUsesPool:
+    @patch("backend.handlers.generate_handler.invoke_claude")
+    @patch("backend.handlers.generate_handler.take_question_set", return_value=QUESTIONS)
+    def test_pool_hit_skips_bedrock(self, _take, mock_invoke):
+        from backend.handlers.generate_handler import handler
+
+        resp = handler({"body": json.dumps({"session_id": "s-1"})}, None)
+
+        assert resp["statusCode"] == 200
+        assert json.loads(resp["body"])["questions"] == QUESTIONS
+        mock_invoke.assert_not_called()
+
+
+@patch("backend.handlers.pool_refill_handler.release_refill_lock")
+class TestRefillHandler:
+    @patch("backend.handlers.pool_refill_handler.put_question_set")
+    @patch("backend.handlers.pool_refill_handler.count_question_sets", return_value=18)
+    def test_refills_requested_level_up_to_target(self, _count, mock_put, mock_release):
+        generator = MagicMock(return_value=QUESTIONS)
+        with (
+            patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true", "QUESTION_POOL_TARGET_SIZE": "20"}),
+            patch.dict("backend.handlers.pool_refill_handler.GENERATORS", {4: generator}),
+        ):
+            result = refill_handler({"level": 4}, None)
+
+        assert result == {"refilled": {"lv4": 2}}
+        assert mock_put.call_count == 2
+        mock_put.assert_called_with(4, QUESTIONS)
+        mock_release.assert_called_once_with(4)
+
+    @patch("backend.handlers.pool_refill_handler.put_question_set")
+    @patch("backend.handlers.pool_refill_handler.count_question_sets", return_value=0)
+    def test_invalid_generation_is_not_pooled(self, _count, mock_put, _release):
+        generator = MagicMock(side_effect=ValueError("bad set"))
+        with (
+            patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "true"}),
+            patch.dict("backend.handlers.pool_refill_handler.GENERATORS", {2: generator}),
+        ):
+            result = refill_handler({"level": 2}, None)
+
+        assert result == {"refilled": {"lv2": 0}}
+        mock_put.assert_not_called()
+
+    def test_disabled_pool_is_noop(self, _release):
+        with patch.dict(os.environ, {"QUESTION_POOL_ENABLED": "false"}):
+            assert refill_handler({}, None) == {"refilled": {}}
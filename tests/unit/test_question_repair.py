@@ -0,0 +1,80 @@
+"""Unit tests for backend/lib/question_repair.py"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend.lib.question_repair import build_step_repair_prompt, recover_questions
+
+
+def _validate(i, q):
+    if q.get("step") != i + 1 or q.get("type") != "free_text":
+        raise ValueError(f"Question {i} is invalid")
+    return {"step": q["step"], "type": q["type"], "prompt": q["prompt"]}
+
+
+def _q(step, q_type="free_text", prompt=None):
+    return {"step": step, "type": q_type, "prompt": prompt or f"設問{step}"}
+
+
+def _response(questions, suffix=""):
+    text = json.dumps({"questions": questions}, ensure_ascii=False) + suffix
+    return {"content": [{"text": text}], "stop_reason": "end_turn"}
+
+
+def test_all_steps_recovered_locally_without_regeneration():
+    regenerate = MagicMock()
+
+    result = recover_questions(_response([_q(1), _q(2), _q(3)], "\n以上。"), 3, _validate, regenerate)
+
+    assert [q["step"] for q in result] == [1, 2, 3]
+    regenerate.assert_not_called()
+
+
+def test_invalid_and_missing_steps_are_regenerated_with_valid_context():
+    regenerate = MagicMock(return_value=_response([_q(2, prompt="新2"), _q(4, prompt="新4")]))
+
+    result = recover_questions(_response([_q(1), _q(2, "scenario"), _q(3)]), 4, _validate, regenerate)
+
+    assert [q["prompt"] for q in result] == ["設問1", "新2", "設問3", "新4"]
+    steps, valid = regenerate.call_args[0]
+    assert steps == [2, 4]
+    assert [q["step"] for q in valid] == [1, 3]
+
+
+def test_regenerated_output_for_valid_steps_is_ignored():
+    regenerate = MagicMock(return_value=_response([_q(1, prompt="上書き"), _q(2, prompt="新2")]))
+
+    result = recover_questions(_response([_q(1), _q(2, "scenario"), _q(3)]), 3, _validate, regenerate)
+
+    assert result[0]["prompt"] == "設問1"
+    assert result[1]["prompt"] == "新2"
+
+
+def test_too_many_invalid_steps_raises_without_regeneration():
+    regenerate = MagicMock()
+
+    with pytest.raises(ValueError, match="Too many invalid steps"):
+        recover_questions(_response([_q(1), _q(2, "scenario"), _q(3, "scenario")]), 3, _validate, regenerate)
+    regenerate.assert_not_called()
+
+
+def test_still_invalid_after_regeneration_raises():
+    regenerate = MagicMock(return_value=_response([_q(2, "scenario")]))
+
+    with pytest.raises(ValueError, match="still invalid"):
+        recover_questions(_response([_q(1), _q(2, "scenario"), _q(3)]), 3, _validate, regenerate)
+
+
+def test_tool_use_response_is_used_directly():
+    result = {"content": [{"type": "tool_use", "name": "submit_questions", "input": {"questions": [_q(1)]}}]}
+
+    assert recover_questions(result, 1, _validate, MagicMock()) == [_q(1)]
+
+
+def test_repair_prompt_lists_steps_and_valid_questions():
+    prompt = build_step_repair_prompt([2, 5], [_q(1, prompt="既存の設問")])
+
+    assert "ステップ 2、5 のみ" in prompt
+    assert "既存の設問" in prompt
@@ -0,0 +1,200 @@
+"""Unit tests for backend/lib/question_store.py and question_id handling in grade handlers."""
+
+import json
+import os
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from backend.lib.question_store import clear_cache, load_question, save_question_set
+
+QUESTIONS = [
+    {"step": 1, "type": "scenario", "prompt": "Q1?", "options": None, "context": "長いシナリオ"},
+    {"step": 2, "type": "free_text", "prompt": "Q2?", "options": None, "context": None},
+]
+
+
+def _grade_response(passed, score):
+    return {"content": [{"text": json.dumps({"passed": passed, "score": score})}]}
+
+
+@pytest.fixture(autouse=True)
+def _enabled_store():
+    clear_cache()
+    with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "true", "GRADE_CACHE_ENABLED": "false"}):
+        yield
+    clear_cache()
+
+
+@pytest.fixture
+def table():
+    table = MagicMock()
+    with patch("backend.lib.question_store._get_dynamodb_resource") as mock_ddb:
+        mock_ddb.return_value.Table.return_value = table
+        yield table
+
+
+def _stored_item(table) -> dict:
+    return table.put_item.call_args[1]["Item"]
+
+
+class TestSaveQuestionSet:
+    def test_assigns_question_ids_and_persists_with_ttl(self, table):
+        questions = save_question_set(4, "sess", QUESTIONS)
+
+        set_id = questions[0]["question_id"].rsplit(".", 1)[0]
+        assert [q["question_id"] for q in questions] == [f"{set_id}.1", f"{set_id}.2"]
+        item = _stored_item(table)
+        assert item["PK"] == f"QSET#{set_id}"
+        assert item["level"] == "lv4"
+        assert json.loads(item["questions_json"]) == QUESTIONS
+        assert item["expires_at"] > time.time()
+
+    def test_disabled_store_returns_questions_unchanged(self, table):
+        with patch.dict(os.environ, {"QUESTION_STORE_ENABLED": "false"}):
+            assert save_question_set(4, "sess", QUESTIONS) == QUESTIONS
+        table.put_item.assert_not_called()
+
+    def test_write_failure_raises(self, table):
+        table.put_item.side_effect = Exception("boom")
+        with pytest.raises(Exception, match="boom"):
+            save_question_set(4, "sess", QUESTIONS)
+
+    @patch("backend.handlers.lv4_generate_handler.take_question_set")
+    def test_generate_fails_when_set_cannot_be_stored(self, mock_take, table):
+        from backend.handlers.lv4_generate_handler import handler
+
+        mock_take.return_value = QUESTIONS
+        table.put_item.side_effect = Exception("boom")
+
+        resp = handler({"body": json.dumps({"session_id": "sess"})}, None)
+
+        assert resp["statusCode"] == 500
+
+
+class TestLoadQuestion:
+    def test_loads_from_dynamodb_then_process_cache(self, table):
+        question_id = save_question_set(4, "sess", QUESTIONS)[1]["question_id"]
+        item = _stored_item(table)
+        table.get_item.return_value = {"Item": item}
+        clear_cache()
+
+        assert load_question(4, question_id, "sess") == QUESTIONS[1]
+        assert load_question(4, question_id, "sess") == QUESTIONS[1]
+        assert table.get_item.call_count == 1
+        assert table.get_item.call_args[1]["ConsistentRead"] is True
+
+    @pytest.mark.parametrize("level, session_id", [(3, "sess"), (4, "other-session")])
+    def test_rejects_other_level_or_session(self, table, level, session_id):
+        question_id = save_question_set(4, "sess", QUESTIONS)[0]["question_id"]
+        assert load_question(level, question_id, session_id) is None
+
+    def test_expired_set_is_not_found(self, table):
+        table.get_item.return_value = {"Item": {
+            "PK": "QSET#abc", "level": "lv4", "session_id": "sess",
+            "questions_json": json.dumps(QUESTIONS), "expires_at": int(time.time()) - 1,
+        }}
+        assert load_question(4, "abc.1", "sess") is None
+
+    @pytest.mark.parametrize("question_id", ["", "abc", "abc.x", 123, None])
+    def test_malformed_ids_are_not_found(self, table, question_id):
+        assert load_question(4, question_id, "sess") is None
+
+    def test_lookup_errors_degrade_to_not_found(self, table):
+        table.get_item.side_effect = Exception("boom")
+        assert load_question(4, "abc.1", "sess") is None
+
+
+class TestGradeByQuestionId:
+    @patch("backend.handlers.lv4_grade_handler.generate_lv4_feedback")
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_grades_stored_question_and_ignores_client_copy(self, mock_invoke, mock_review, table):
+        from backend.handlers.lv4_grade_handler import handler
+
+        mock_invoke.return_value = _grade_response(True, 80)
+        mock_review.return_value = {"feedback": "fb", "explanation": "ex"}
+        question_id = save_question_set(4, "sess", QUESTIONS)[0]["question_id"]
+        body = {
+            "session_id": "sess",
+            "step": 1,
+            "question_id": question_id,
+            "question": {"step": 1, "type": "scenario", "prompt": "tampered"},
+            "answer": "回答",
+        }
+
+        resp = handler({"body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 200
+        prompt = mock_invoke.call_args[0][1]
+        assert "長いシナリオ" in prompt
+        assert "tampered" not in prompt
+
+    def test_unknown_question_id_returns_404(self, table):
+        from backend.handlers.lv4_grade_handler import handler
+
+        table.get_item.return_value = {}
+        body = {"session_id": "sess", "step": 1, "question_id": "missing.1", "answer": "回答"}
+
+        resp = handler({"body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 404
+
+    def test_stream_handler_resolves_question_id(self, table):
+        from backend.handlers.stream_handler import handler
+
+        table.get_item.return_value = {}
+        body = {"session_id": "sess", "step": 1, "question_id": "missing.1", "answer": "回答"}
+
+        resp = handler({"rawPath": "/lv4/grade", "body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 404
+
+    @pytest.mark.parametrize("module, level", [
+        ("grade_handler", 1), ("lv2_grade_handler", 2), ("lv3_grade_handler", 3), ("lv4_grade_handler", 4),
+    ])
+    def test_client_question_without_id_is_rejected(self, table, module, level):
+        import importlib
+
+        handler = importlib.import_module(f"backend.handlers.{module}").handler
+        body = {"session_id": "sess", "step": 1, "question": QUESTIONS[0], "answer": "回答"}
+
+        resp = handler({"body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 400
+        assert json.loads(resp["body"])["error"] == "question_id is required"
+
+    def test_stream_handler_rejects_client_question_without_id(self, table):
+        from backend.handlers.stream_handler import handler
+
+        body = {"session_id": "sess", "step": 1, "question": QUESTIONS[0], "answer": "回答"}
+
+        resp = handler({"rawPath": "/lv4/grade", "body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 400
+        assert json.loads(resp["body"])["error"] == "question_id is required"
+
+    @pytest.mark.parametrize("module, level", [
+        ("grade_handler", 1), ("lv2_grade_handler", 2), ("lv3_grade_handler", 3), ("lv4_grade_handler", 4),
+    ])
+    def test_question_id_for_another_step_is_rejected(self, table, module, level):
+        import importlib
+
+        handler = importlib.import_module(f"backend.handlers.{module}").handler
+        body = {"session_id": "sess", "step": 1, "question_id": "set.2", "answer": "回答"}
+
+        resp = handler({"body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 400
+        assert json.loads(resp["body"])["error"] == "question_id does not match step"
+        table.get_item.assert_not_called()
+
+    def test_stream_handler_rejects_question_id_for_another_step(self, table):
+        from backend.handlers.stream_handler import handler
+
+        body = {"session_id": "sess", "step": 1, "question_id": "set.2", "answer": "回答"}
+
+        resp = handler({"rawPath": "/lv4/grade", "body": json.dumps(body)}, None)
+
+        assert resp["statusCode"] == 400
+        assert json.loads(resp["body"])["error"] == "question_id does not match step"
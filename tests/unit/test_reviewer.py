@@ -1,6 +1,7 @@
 """Unit tests for backend/lib/reviewer.py"""
 
 import json
+import os
 from unittest.mock import patch
 
 import pytest
@@ -56,3 +57,59 @@ class TestGenerateFeedback:
 
         with pytest.raises(ValueError, match="explanation"):
             generate_feedback(QUESTION, ANSWER, GRADE)
+
+    @patch("backend.lib.reviewer.invoke_claude")
+    def test_score_agnostic_prompt_when_grade_result_is_none(self, mock_invoke):
+        mock_invoke.return_value = _bedrock_response({
+            "feedback": "フィードバック",
+            "explanation": "解説",
+        })
+
+        generate_feedback(QUESTION, ANSWER, None)
+
+        user_prompt = mock_invoke.call_args[0][1]
+        assert "未確定" in user_prompt
+        assert "score" not in user_prompt
+
+
+class TestExplanationCache:
+    """With EXPLANATION_CACHE_ENABLED the per-answer call only produces feedback."""
+
+    @pytest.fixture(autouse=True)
+    def _enable(self):
+        from backend.lib.grade_cache import clear_cache
+
+        clear_cache()
+        with patch.dict(os.environ, {"EXPLANATION_CACHE_ENABLED": "true"}):
+            yield
+        clear_cache()
+
+    @staticmethod
+    def _respond(system_prompt, user_prompt, **kwargs):
+        if "解説エージェント" in system_prompt:
+            return _bedrock_response({"explanation": "共通の解説"})
+        return _bedrock_response({"feedback": f"FB:{user_prompt.count('回答')}"})
+
+    @patch("backend.lib.reviewer.invoke_claude")
+    def test_explanation_generated_once_and_reused(self, mock_invoke):
+        mock_invoke.side_effect = self._respond
+
+        first = generate_feedback(QUESTION, ANSWER, GRADE)
+        second = generate_feedback(QUESTION, "別の回答", GRADE)
+
+        assert first["explanation"] == second["explanation"] == "共通の解説"
+        assert first["feedback"].startswith("FB:")
+        system_prompts = [c[0][0] for c in mock_invoke.call_args_list]
+        assert sum("解説エージェント" in p for p in system_prompts) == 1
+        assert len(system_prompts) == 3
+
+    @patch("backend.lib.reviewer.invoke_claude")
+    def test_feedback_prompt_does_not_ask_for_explanation(self, mock_invoke):
+        mock_invoke.side_effect = self._respond
+
+        generate_feedback(QUESTION, ANSWER, GRADE)
+
+        feedback_calls = [c for c in mock_invoke.call_args_list if "解説エージェント" not in c[0][0]]
+        assert '"explanation"' not in feedback_calls[0][0][0]
+        explanation_calls = [c for c in mock_invoke.call_args_list if "解説エージェント" in c[0][0]]
+        assert ANSWER not in explanation_calls[0][0][1]
@@ -0,0 +1,219 @@
+"""Unit tests for backend/handlers/stream_handler.py"""
+
+import json
+from unittest.mock import patch
+
+from backend.handlers.stream_handler import handler
+
+
+def _bedrock_grade_response(passed, score):
+    return {"content": [{"text": json.dumps({"passed": passed, "score": score})}]}
+
+
+def _api_event(path: str, body: dict) -> dict:
+    return {"rawPath": path, "body": json.dumps(body)}
+
+
+def _events(resp) -> list[dict]:
+    return [json.loads(line) for line in resp["body"].splitlines() if line]
+
+
+VALID_BODY = {
+    "session_id": "abc-123",
+    "step": 1,
+    "question": {"step": 1, "type": "free_text", "prompt": "Q?"},
+    "answer": "My answer",
+}
+
+REVIEW_CHUNKS = ['{"feedback": "Go', 'od", "explan', 'ation": "Because..."}']
+
+
+class TestHandler:
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_emits_grade_before_review_deltas(self, mock_invoke, mock_stream):
+        mock_invoke.return_value = _bedrock_grade_response(True, 85)
+        mock_stream.return_value = iter(REVIEW_CHUNKS)
+
+        resp = handler(_api_event("/lv1/grade", VALID_BODY), None)
+
+        assert resp["statusCode"] == 200
+        events = _events(resp)
+        assert events[0] == {"event": "grade", "session_id": "abc-123", "step": 1, "passed": True, "score": 85}
+        deltas = [e for e in events if e["event"] == "delta"]
+        assert "".join(e["text"] for e in deltas if e["field"] == "feedback") == "Good"
+        assert "".join(e["text"] for e in deltas if e["field"] == "explanation") == "Because..."
+        assert events[-1]["event"] == "result"
+        assert events[-1]["feedback"] == "Good"
+        assert events[-1]["explanation"] == "Because..."
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    @patch("backend.handlers.lv4_grade_handler.invoke_claude")
+    def test_routes_by_level(self, mock_invoke, mock_stream):
+        mock_invoke.return_value = _bedrock_grade_response(True, 70)
+        mock_stream.return_value = iter(REVIEW_CHUNKS)
+
+        resp = handler(_api_event("/lv4/grade", {**VALID_BODY, "step": 6}), None)
+
+        assert _events(resp)[-1]["event"] == "result"
+        assert "組織横断" in mock_invoke.call_args[0][0]
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_multiple_choice_with_answer_key_skips_bedrock(self, mock_invoke, mock_stream):
+        from backend.lib.answer_key import attach_answer_key
+
+        with patch.dict("os.environ", {"QUESTION_STORE_ENABLED": "true"}):
+            question = attach_answer_key(
+                {"step": 1, "type": "multiple_choice", "prompt": "Q?", "options": ["A", "B"], "context": None},
+                1,
+                ["A is wrong", "B is right"],
+            )
+            body = {"session_id": VALID_BODY["session_id"], "step": 1, "question_id": "set.1", "answer": "B"}
+            with patch("backend.handlers.stream_handler.load_question", return_value=question):
+                resp = handler(_api_event("/lv1/grade", body), None)
+
+        events = _events(resp)
+        assert [e["event"] for e in events] == ["grade", "result"]
+        assert events[-1]["score"] == 100
+        assert "B is right" in events[-1]["feedback"]
+        mock_invoke.assert_not_called()
+        mock_stream.assert_not_called()
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    @patch("backend.lib.lv3_reviewer.invoke_claude")
+    @patch("backend.handlers.lv3_grade_handler.invoke_claude")
+    def test_streams_feedback_only_with_cached_explanation(self, mock_grade, mock_explain, mock_stream):
+        from backend.lib.grade_cache import clear_cache
+
+        mock_grade.return_value = _bedrock_grade_response(True, 70)
+        mock_explain.return_value = {"content": [{"text": json.dumps({"explanation": "共通の解説"})}]}
+        mock_stream.side_effect = lambda *a, **k: iter(['{"feedback": "Go', 'od"}'])
+        clear_cache()
+
+        with patch.dict("os.environ", {"EXPLANATION_CACHE_ENABLED": "true"}):
+            first = _events(handler(_api_event("/lv3/grade", {**VALID_BODY, "step": 5}), None))
+            second = _events(handler(_api_event("/lv3/grade", {**VALID_BODY, "step": 5, "answer": "Other"}), None))
+        clear_cache()
+
+        for events in (first, second):
+            assert events[-1]["event"] == "result"
+            assert events[-1]["feedback"] == "Good"
+            assert events[-1]["explanation"] == "共通の解説"
+            assert {"event": "delta", "field": "explanation", "text": "共通の解説"} in events
+        assert mock_explain.call_count == 1
+        assert "解説エージェント" not in mock_stream.call_args[0][0]
+
+    def test_returns_400_for_step_out_of_range(self):
+        resp = handler(_api_event("/lv2/grade", {**VALID_BODY, "step": 5}), None)
+        assert resp["statusCode"] == 400
+
+    def test_returns_404_for_unknown_path(self):
+        resp = handler(_api_event("/lv9/grade", VALID_BODY), None)
+        assert resp["statusCode"] == 404
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    @patch("backend.handlers.grade_handler.invoke_claude")
+    def test_emits_error_event_on_invalid_review(self, mock_invoke, mock_stream):
+        mock_invoke.return_value = _bedrock_grade_response(True, 85)
+        mock_stream.return_value = iter(['{"feedback": "trunc'])
+
+        resp = handler(_api_event("/lv1/grade", VALID_BODY), None)
+
+        events = _events(resp)
+        assert events[0]["event"] == "grade"
+        assert events[-1]["event"] == "error"
+
+
+LV2_QUESTIONS = [
+    {"step": 1, "type": "scenario", "prompt": "設問1", "options": None, "context": "業務シナリオ"},
+    {"step": 2, "type": "free_text", "prompt": "設問2", "options": None, "context": "文脈"},
+    {"step": 3, "type": "scenario", "prompt": "設問3", "options": None, "context": "成果物"},
+    {"step": 4, "type": "free_text", "prompt": "設問4", "options": None, "context": "振り返り"},
+]
+
+
+def _chunks(text: str, size: int = 16) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestGenerateStream:
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    def test_emits_each_question_then_result(self, mock_stream):
+        doc = json.dumps({"questions": LV2_QUESTIONS}, ensure_ascii=False)
+        mock_stream.return_value = iter(_chunks(doc))
+
+        resp = handler(_api_event("/lv2/generate", {"session_id": "abc-123"}), None)
+
+        assert resp["statusCode"] == 200
+        events = _events(resp)
+        assert [e["event"] for e in events] == ["question"] * 4 + ["result"]
+        assert [e["question"]["step"] for e in events[:4]] == [1, 2, 3, 4]
+        assert events[-1] == {"event": "result", "session_id": "abc-123", "questions": LV2_QUESTIONS}
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    def test_first_question_is_emitted_before_stream_finishes(self, mock_stream):
+        from backend.handlers.stream_handler import stream_generate_events
+
+        doc = json.dumps({"questions": LV2_QUESTIONS}, ensure_ascii=False)
+        consumed = []
+
+        def chunks(*args, **kwargs):
+            for chunk in _chunks(doc):
+                consumed.append(chunk)
+                yield chunk
+
+        mock_stream.side_effect = chunks
+        first = next(stream_generate_events(2, {"session_id": "abc-123"}))
+
+        assert first == {"event": "question", "question": LV2_QUESTIONS[0]}
+        assert len("".join(consumed)) < len(doc)
+
+    @patch("backend.handlers.lv2_generate_handler.invoke_claude")
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    def test_invalid_step_is_repaired_after_stream(self, mock_stream, mock_invoke):
+        bad = [dict(q) for q in LV2_QUESTIONS]
+        bad[2]["type"] = "multiple_choice"
+        mock_stream.return_value = iter(_chunks(json.dumps({"questions": bad}, ensure_ascii=False)))
+        mock_invoke.return_value = {"content": [{"text": json.dumps({"questions": [LV2_QUESTIONS[2]]})}]}
+
+        events = _events(handler(_api_event("/lv2/generate", {"session_id": "abc-123"}), None))
+
+        assert [e["question"]["step"] for e in events if e["event"] == "question"] == [1, 2, 3, 4]
+        assert events[-1]["questions"] == LV2_QUESTIONS
+        mock_invoke.assert_called_once()
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    def test_emits_error_event_when_unrecoverable(self, mock_stream):
+        mock_stream.return_value = iter(['{"questions": [', "not json"])
+
+        events = _events(handler(_api_event("/lv4/generate", {"session_id": "abc-123"}), None))
+
+        assert events == [{"event": "error", "error": "テスト生成に失敗しました。リトライしてください。"}]
+
+    @patch("backend.handlers.stream_handler.invoke_claude_stream")
+    def test_stream_runs_under_function_timeout_deadline(self, mock_stream):
+        from backend.lib.bedrock_client import remaining_time, set_deadline
+
+        doc = json.dumps({"questions": LV2_QUESTIONS}, ensure_ascii=False)
+        seen = []
+
+        def chunks(*args, **kwargs):
+            seen.append(remaining_time())
+            yield from _chunks(doc)
+
+        mock_stream.side_effect = chunks
+        try:
+            handler(_api_event("/lv2/generate", {"session_id": "abc-123"}), None)
+        finally:
+            set_deadline(None)
+
+        assert seen[0] is not None and 55 < seen[0] <= 58
+
+    def test_returns_400_without_session_id(self):
+        resp = handler(_api_event("/lv3/generate", {}), None)
+        assert resp["statusCode"] == 400
+
+    def test_lv1_generate_is_not_routed(self):
+        resp = handler(_api_event("/lv1/generate", {"session_id": "abc-123"}), None)
+        assert resp["statusCode"] == 404
@@ -0,0 +1,73 @@
+"""Unit tests for backend/lib/stream_json.py"""
+
+import json
+
+import pytest
+
+from backend.lib.stream_json import ArrayItemStream, StringFieldStream
+
+
+def _collect(text: str, chunk_size: int) -> dict:
+    parser = StringFieldStream()
+    fields = {}
+    for i in range(0, len(text), chunk_size):
+        for field, delta in parser.feed(text[i:i + chunk_size]):
+            fields[field] = fields.get(field, "") + delta
+    return fields
+
+
+class TestStringFieldStream:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 1000])
+    def test_reassembles_values_across_chunk_boundaries(self, chunk_size):
+        doc = json.dumps({"feedback": "良い回答です", "explanation": "解説\n2行目"}, ensure_ascii=False)
+        assert _collect(doc, chunk_size) == {"feedback": "良い回答です", "explanation": "解説\n2行目"}
+
+    @pytest.mark.parametrize("chunk_size", [1, 3])
+    def test_decodes_escapes_and_surrogate_pairs(self, chunk_size):
+        doc = json.dumps({"feedback": 'say "hi" \\ 😀 \t'}, ensure_ascii=True)
+        assert _collect(doc, chunk_size) == {"feedback": 'say "hi" \\ 😀 \t'}
+
+    def test_skips_code_fence_and_non_string_values(self):
+        doc = '```json\n{"score": 80, "nested": {"feedback": "x"}, "feedback": "ok"}\n```'
+        assert _collect(doc, 4) == {"feedback": "ok"}
+
+    def test_emits_partial_value_before_string_closes(self):
+        parser = StringFieldStream()
+        assert parser.feed('{"feedback": "良い') == [("feedback", "良い")]
+        assert parser.feed('回答", "explanation": "') == [("feedback", "回答")]
+        assert parser.feed("解説") == [("explanation", "解説")]
+
+
+def _items(text: str, chunk_size: int) -> list[dict]:
+    parser = ArrayItemStream("questions")
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i:i + chunk_size]))
+    return items
+
+
+class TestArrayItemStream:
+    QUESTIONS = [
+        {"step": 1, "type": "scenario", "prompt": "設問 {x}", "options": None, "context": "A社\n概要"},
+        {"step": 2, "type": "free_text", "prompt": 'say "hi" ]', "options": ["a", "b"], "context": None},
+    ]
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+    def test_emits_each_item_across_chunk_boundaries(self, chunk_size):
+        doc = json.dumps({"questions": self.QUESTIONS}, ensure_ascii=False)
+        assert _items(doc, chunk_size) == self.QUESTIONS
+
+    def test_emits_item_as_soon_as_it_closes(self):
+        parser = ArrayItemStream("questions")
+        assert parser.feed('```json\n{"questions": [{"step": 1}, {"st') == [{"step": 1}]
+        assert parser.feed('ep": 2}') == [{"step": 2}]
+        assert parser.feed("]}\n```") == []
+
+    def test_ignores_other_fields_and_nested_objects(self):
+        doc = '{"meta": [{"step": 0}], "questions": [{"step": 1, "extra": {"step": 9}}], "tail": [{"x": 1}]}'
+        assert _items(doc, 4) == [{"step": 1, "extra": {"step": 9}}]
+
+    def test_tolerates_raw_newlines_in_strings(self):
+        assert _items('{"questions": [{"context": "1行目\n2行目"}]}', 5) == [
+            {"context": "1行目\n2行目"},
+        ]